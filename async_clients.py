@@ -0,0 +1,309 @@
+"""
+Asyncio counterparts of http_clients.py and downloads.py (needs aiohttp)
+- One pooled aiohttp.ClientSession per upstream, opened on first use inside the event loop
+- Same retry policy, rate limiting, 429 / Retry-After handling and circuit breaker as UpstreamClient
+- Streamed, verified, resumable downloads that never block the loop on the network
+"""
+
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+
+import aiohttp
+
+from downloads import (
+    CHUNK_SIZE, DownloadError, _discard, _expected_total, _hash_existing, _is_encoded, _request_headers
+)
+from http_clients import UPSTREAM_RESPONSES, UPSTREAM_SECONDS
+from rate_limit import parse_retry_after
+
+
+log = logging.getLogger(__name__)
+
+# Methods whose retry can't repeat a paid side effect (same set as urllib3's Retry)
+IDEMPOTENT_METHODS = frozenset(('HEAD', 'GET', 'PUT', 'DELETE', 'OPTIONS', 'TRACE'))
+
+
+class UpstreamResponse:
+    """
+    A fully read upstream reply with the parts of requests.Response the backend uses
+    """
+
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class ThreadedBody:
+    """
+    Async request body that reads a blocking iterable (such as
+    image_upload.Base64JsonBody) on a worker thread, one chunk at a time.
+    Iterating again starts over, so the body can be resent on retry.
+    """
+
+    def __init__(self, iterable, executor=None):
+        self.iterable = iterable
+        self.executor = executor
+
+    def __len__(self):
+        return len(self.iterable)
+
+    async def __aiter__(self):
+        loop = asyncio.get_running_loop()
+        iterator = iter(self.iterable)
+        while True:
+            chunk = await loop.run_in_executor(self.executor, next, iterator, None)
+            if chunk is None:
+                return
+            yield chunk
+
+
+class AsyncUpstreamClient:
+    """
+    UpstreamClient for coroutines, on a pooled aiohttp.ClientSession.
+
+    request() / get() / post() return an UpstreamResponse with the body read;
+    stream() is an async context manager yielding the open aiohttp response
+    for large bodies. Connection errors are retried for every method; read
+    errors and retry_statuses only for idempotent ones. pool_size caps the
+    concurrent connections per host.
+    """
+
+    def __init__(self, name, base_url=None, pool_size=10, timeout=30,
+                 connect_timeout=5, retries=3, backoff_factor=0.5,
+                 retry_statuses=(500, 502, 503, 504), headers=None,
+                 rate_limiter=None, max_throttle_retries=5, circuit_breaker=None):
+        self.name = name
+        self.base_url = base_url.rstrip('/') if base_url else None
+        self.pool_size = pool_size
+        self.timeout = aiohttp.ClientTimeout(total=None, connect=connect_timeout, sock_read=timeout)
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.retry_statuses = tuple(retry_statuses)
+        self.headers = headers
+        self.rate_limiter = rate_limiter
+        self.max_throttle_retries = max_throttle_retries
+        self.circuit_breaker = circuit_breaker
+        self._session = None
+
+    @property
+    def session(self):
+        # aiohttp sessions belong to the loop they were created on
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=0, limit_per_host=self.pool_size),
+                timeout=self.timeout,
+                headers=self.headers
+            )
+        return self._session
+
+    def url(self, path):
+        if path.startswith(('http://', 'https://')) or not self.base_url:
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    async def request(self, method, path, rate_class=None, rate_limit_wait=None, **kwargs):
+        response = await self._open(method, path, rate_class, rate_limit_wait, **kwargs)
+        try:
+            content = await response.read()
+        finally:
+            response.release()
+        return UpstreamResponse(response.status, response.headers, content)
+
+    @asynccontextmanager
+    async def stream(self, method, path, rate_class=None, rate_limit_wait=None, **kwargs):
+        response = await self._open(method, path, rate_class, rate_limit_wait, **kwargs)
+        try:
+            yield response
+        finally:
+            response.release()
+
+    async def _open(self, method, path, rate_class, rate_limit_wait=None, **kwargs):
+        bucket = f"{self.name}:{rate_class or 'default'}"
+
+        for attempt in range(self.max_throttle_retries + 1):
+            if self.rate_limiter:
+                await self.rate_limiter.acquire_async(bucket, timeout=rate_limit_wait)
+
+            response = await self._send(method, path, **kwargs)
+            if response.status != 429 or attempt == self.max_throttle_retries:
+                return response
+
+            # A 429 means the upstream did not act on the request, so even a
+            # POST can be sent again once the Retry-After has passed
+            delay = parse_retry_after(response.headers.get('Retry-After'), default=2 ** attempt)
+            response.release()
+            log.warning(f"⏳ {self.name} rate limited (429), retrying",
+                        extra={'upstream': self.name, 'retry_in': round(delay, 1)})
+            if not (self.rate_limiter and self.rate_limiter.penalize(bucket, delay)):
+                await asyncio.sleep(delay)
+
+        return response
+
+    async def _send(self, method, path, **kwargs):
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+
+        for attempt in range(self.retries + 1):
+            if attempt:
+                await asyncio.sleep(self.backoff_factor * 2 ** (attempt - 1))
+
+            if self.circuit_breaker:
+                self.circuit_breaker.before_call()
+
+            started = time.monotonic()
+            response = None
+            cancelled = False
+            try:
+                response = await self.session.request(method, self.url(path), **kwargs)
+            except asyncio.CancelledError:
+                cancelled = True
+                raise
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                UPSTREAM_RESPONSES.inc(upstream=self.name, code='error')
+                # A refused connection never reached the upstream, so any method may retry
+                if attempt < self.retries and (idempotent or isinstance(e, aiohttp.ClientConnectorError)):
+                    continue
+                raise
+            finally:
+                # Every call let through ends its half-open trial, whatever it raised;
+                # a cancelled one only hands the trial back
+                if self.circuit_breaker:
+                    if cancelled:
+                        self.circuit_breaker.release()
+                    else:
+                        self.circuit_breaker.record(response is not None and response.status < 500,
+                                                    time.monotonic() - started)
+
+            elapsed = time.monotonic() - started
+            UPSTREAM_RESPONSES.inc(upstream=self.name, code=response.status)
+            UPSTREAM_SECONDS.observe(elapsed, upstream=self.name)
+
+            if idempotent and response.status in self.retry_statuses and attempt < self.retries:
+                response.release()
+                continue
+            return response
+
+    async def get(self, path, **kwargs):
+        return await self.request('GET', path, **kwargs)
+
+    async def post(self, path, **kwargs):
+        return await self.request('POST', path, **kwargs)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+
+def _write_chunk(f, chunk, hashers):
+    f.write(chunk)
+    for hasher in hashers:
+        hasher.update(chunk)
+
+
+async def stream_download(client, url, dest_path, expected_sha256=None,
+                          max_attempts=3, chunk_size=CHUNK_SIZE, executor=None, **request_kwargs):
+    """
+    downloads.stream_download() for an AsyncUpstreamClient: same .part file,
+    Range resume, size / Content-MD5 / SHA-256 checks, cleanup and return value.
+    File writes, hashing and re-hashing a resumed .part file run on executor
+    (like ThreadedBody reads), never on the event loop.
+    """
+    part_path = f"{dest_path}.part"
+    try:
+        return await _stream_download(client, url, dest_path, part_path, expected_sha256,
+                                      max_attempts, chunk_size, executor, request_kwargs)
+    except BaseException:
+        # Includes cancellation of the awaiting job
+        _discard(part_path)
+        raise
+
+
+async def _stream_download(client, url, dest_path, part_path, expected_sha256,
+                           max_attempts, chunk_size, executor, request_kwargs):
+    loop = asyncio.get_running_loop()
+    last_error = None
+
+    for attempt in range(1, max_attempts + 1):
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        encoded = False
+
+        try:
+            async with client.stream('GET', url, headers=_request_headers(offset), **request_kwargs) as response:
+                if response.status == 416:
+                    # Our partial file doesn't match the remote object; start over
+                    _discard(part_path)
+                    last_error = DownloadError("Range not satisfiable, restarting download")
+                    continue
+
+                if response.status not in (200, 206):
+                    raise DownloadError(f"Download failed ({response.status}) for {url}")
+
+                if response.status == 200:
+                    offset = 0
+
+                sha256 = hashlib.sha256()
+                md5 = hashlib.md5()
+                if offset:
+                    await loop.run_in_executor(executor, _hash_existing, part_path, (sha256, md5))
+
+                encoded = _is_encoded(response)
+                expected_size = _expected_total(response, offset)
+                content_md5 = None if encoded else response.headers.get('Content-MD5')
+                status = response.status
+
+                f = await loop.run_in_executor(executor, open, part_path, 'ab' if offset else 'wb')
+                try:
+                    async for chunk in response.content.iter_chunked(chunk_size):
+                        await loop.run_in_executor(executor, _write_chunk, f, chunk, (sha256, md5))
+                finally:
+                    await loop.run_in_executor(executor, f.close)
+
+            size = os.path.getsize(part_path)
+
+        except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError) as e:
+            # Keep the .part file so the next attempt resumes where this one
+            # stopped, unless it holds decoded bytes a Range can't address
+            if encoded:
+                _discard(part_path)
+            last_error = e
+            log.warning(f"⚠️ Download interrupted: {e}", extra={'url': url, 'attempt': attempt, 'max_attempts': max_attempts})
+            continue
+
+        if expected_size is not None and size < expected_size:
+            last_error = DownloadError(f"Incomplete download: got {size} of {expected_size} bytes")
+            log.warning(f"⚠️ {last_error}", extra={'url': url, 'attempt': attempt, 'max_attempts': max_attempts})
+            continue
+
+        if expected_size is not None and size != expected_size:
+            raise DownloadError(f"Size mismatch: got {size} bytes, expected {expected_size}")
+
+        # Content-MD5 describes the whole object, so it's only checked on full replies
+        if content_md5 and status == 200:
+            if base64.b64encode(md5.digest()).decode('ascii') != content_md5:
+                raise DownloadError("Content-MD5 mismatch")
+
+        digest = sha256.hexdigest()
+        if expected_sha256 and digest != expected_sha256.lower():
+            raise DownloadError(f"SHA-256 mismatch: expected {expected_sha256}, got {digest}")
+
+        os.replace(part_path, dest_path)
+        return {
+            'path': dest_path,
+            'size': size,
+            'sha256': digest
+        }
+
+    raise DownloadError(f"Download failed after {max_attempts} attempts: {last_error}")
@@ -0,0 +1,13 @@
+"""
+Asyncio serving mode of the AI Image Generator backend (needs aiohttp)
+- The application lives in text_to_3d.aio; this keeps the old entry point working
+
+    python backend_async.py --port 5000
+"""
+
+from text_to_3d.aio import create_async_app, main
+
+app = create_async_app()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,415 @@
+"""
+Benchmark harness for the backend
+- Starts the fake OpenAI / Meshy upstream and a backend process pointed at it
+  (or drives an already running backend with --backend-url)
+- Drives /api/generate-image, /api/convert-to-3d and /api/text-to-3d at a target concurrency
+- Reports p50 / p95 / p99 latency, throughput, backend RSS and upstream call counts
+
+    python benchmark.py --scenario pipeline --requests 40 --concurrency 8 --task-duration 5
+    python benchmark.py --server async --scenario convert --requests 500 --concurrency 100
+    python benchmark.py --scenario text-to-3d --requests 40 --concurrency 8 --task-duration 5
+    python benchmark.py --webhooks --webhook-drop-rate 0.1 --requests 40 --concurrency 8
+    python benchmark.py --server gunicorn --backend-env WEB_CONCURRENCY=4 --requests 40 --concurrency 16
+"""
+
+import argparse
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import fake_upstream
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+SCENARIOS = ('generate', 'convert', 'pipeline', 'text-to-3d')
+SERVERS = ('flask', 'async', 'gunicorn')
+
+# Generous enough that the backend's own rate limits don't cap a local run;
+# pass --backend-env RATE_LIMITS=... to benchmark with production limits
+BENCH_RATE_LIMITS = "openai:generation=1000/1000,meshy:create=1000/1000,meshy:status=1000/1000,assets:download=1000/1000"
+
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile of a list of numbers (None if empty)
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def process_rss(pid):
+    """
+    Resident set size of a process and its children (e.g. gunicorn workers)
+    in bytes (psutil if installed, else /proc), or None
+    """
+    if psutil is not None:
+        try:
+            process = psutil.Process(pid)
+            return sum(p.memory_info().rss for p in [process, *process.children(recursive=True)])
+        except psutil.Error:
+            return None
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            rss = next(int(line.split()[1]) * 1024 for line in f if line.startswith('VmRSS:'))
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            children = [int(child) for child in f.read().split()]
+    except (OSError, StopIteration):
+        return None
+    return rss + sum(process_rss(child) or 0 for child in children)
+
+
+class RssSampler:
+    """
+    Samples a process's RSS in the background; keeps the first, peak and last value
+    """
+
+    def __init__(self, pid, interval=0.25):
+        self.pid = pid
+        self.interval = interval
+        self.samples = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.summary()
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss = process_rss(self.pid)
+            if rss is not None:
+                self.samples.append(rss)
+            self._stop.wait(self.interval)
+
+    def summary(self):
+        if not self.samples:
+            return None
+        return {'start': self.samples[0], 'peak': max(self.samples), 'end': self.samples[-1]}
+
+
+class Recorder:
+    """
+    Latencies and errors per operation, collected from the worker threads
+    """
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def record(self, operation, seconds=None, error=None):
+        with self._lock:
+            if error is None:
+                self.latencies.setdefault(operation, []).append(seconds)
+            else:
+                self.errors.setdefault(operation, []).append(str(error)[:200])
+
+    def summary(self, elapsed):
+        operations = {}
+        for operation in sorted(set(self.latencies) | set(self.errors)):
+            latencies = self.latencies.get(operation, [])
+            errors = self.errors.get(operation, [])
+            operations[operation] = {
+                'ok': len(latencies),
+                'errors': len(errors),
+                'p50': percentile(latencies, 50),
+                'p95': percentile(latencies, 95),
+                'p99': percentile(latencies, 99),
+                'max': max(latencies) if latencies else None,
+                'throughput': len(latencies) / elapsed if elapsed else None,
+                'sample_errors': sorted(set(errors))[:5]
+            }
+        return operations
+
+
+class BackendClient:
+    """
+    The calls a browser would make, each timed into a Recorder
+    """
+
+    def __init__(self, base_url, recorder, poll_interval=0.2, timeout=600):
+        self.base_url = base_url.rstrip('/')
+        self.recorder = recorder
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=64, pool_maxsize=64)
+        self.session.mount('http://', adapter)
+
+    def generate(self, prompt, fresh=True):
+        started = time.monotonic()
+        try:
+            response = self.session.post(f"{self.base_url}/api/generate-image",
+                                         json={'idea': prompt, 'fresh': fresh}, timeout=self.timeout)
+            data = response.json()
+            if response.status_code != 200 or not data.get('success'):
+                raise RuntimeError(f"{response.status_code}: {data.get('error')}")
+        except Exception as e:
+            self.recorder.record('generate', error=e)
+            return None
+        self.recorder.record('generate', time.monotonic() - started)
+        return data
+
+    def convert(self, image_url):
+        """
+        Queue a conversion and wait for its job, timing until the model URL is known
+        """
+        return self.run_job('convert', '/api/convert-to-3d', {'image_path': image_url})
+
+    def text_to_3d(self, prompt, fresh=True):
+        """
+        Queue a one-shot text-to-3D job and wait for it, timing until the model URL is known
+        """
+        return self.run_job('text-to-3d', '/api/text-to-3d', {'idea': prompt, 'fresh': fresh})
+
+    def run_job(self, operation, path, body):
+        started = time.monotonic()
+        try:
+            response = self.session.post(f"{self.base_url}{path}", json=body, timeout=self.timeout)
+            data = response.json()
+            if response.status_code not in (200, 202) or not data.get('success'):
+                raise RuntimeError(f"{response.status_code}: {data.get('error')}")
+            self.recorder.record(f'{operation}-submit', time.monotonic() - started)
+
+            while data.get('job_id') and not data.get('model_url'):
+                if time.monotonic() - started > self.timeout:
+                    raise TimeoutError(f"Job {data['job_id']} not done after {self.timeout}s")
+                time.sleep(self.poll_interval)
+                job = self.session.get(f"{self.base_url}/api/jobs/{data['job_id']}", timeout=30).json()
+                if job['status'] == 'failed':
+                    raise RuntimeError(job.get('error'))
+                if job['status'] == 'succeeded':
+                    data = job
+        except Exception as e:
+            self.recorder.record(operation, error=e)
+            return None
+        self.recorder.record(operation, time.monotonic() - started)
+        return data['model_url']
+
+    def metrics(self):
+        try:
+            return self.session.get(f"{self.base_url}/metrics", timeout=10).text
+        except requests.RequestException:
+            return None
+
+    def close(self):
+        # Idle keep-alive connections would hold up a gunicorn worker's graceful shutdown
+        self.session.close()
+
+
+def run_scenario(client, scenario, count, concurrency, run_id):
+    """
+    Run `count` operations of a scenario on `concurrency` threads; returns elapsed seconds.
+    The convert scenario generates its images first, untimed.
+    """
+    prompts = [f"benchmark {run_id} item {index}" for index in range(count)]
+    images = []
+    if scenario == 'convert':
+        setup = Recorder()
+        setup_client = BackendClient(client.base_url, setup, client.poll_interval, client.timeout)
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            images = [data['image_url'] for data in pool.map(setup_client.generate, prompts) if data]
+        setup_client.close()
+        print(f"🧪 Generated {len(images)} images for the conversion run")
+
+    def operation(index):
+        if scenario == 'generate':
+            client.generate(prompts[index])
+        elif scenario == 'convert':
+            if index < len(images):
+                client.convert(images[index])
+        elif scenario == 'text-to-3d':
+            client.text_to_3d(prompts[index])
+        else:
+            started = time.monotonic()
+            data = client.generate(prompts[index])
+            if data and client.convert(data['image_url']):
+                client.recorder.record('pipeline', time.monotonic() - started)
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(operation, range(count)))
+    return time.monotonic() - started
+
+
+def start_backend(upstream_url, port, workdir, extra_env, server='flask'):
+    """
+    Run the backend (backend_final.py under Flask's server, backend_async.py, or
+    text_to_3d.wsgi under gunicorn) in its own process with its data under workdir
+    """
+    repo = os.path.dirname(os.path.abspath(__file__))
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join(filter(None, [repo, os.environ.get('PYTHONPATH')])),
+        OPENAI_API_URL=upstream_url,
+        MESHY_API_URL=upstream_url,
+        OPENAI_API_KEY='benchmark',
+        MESHY_API_KEY='benchmark',
+        DATA_FOLDER=os.path.join(workdir, 'data'),
+        RATE_LIMITS=BENCH_RATE_LIMITS,
+        MESHY_POLL_MIN_INTERVAL='0.5',
+        MESHY_POLL_MAX_INTERVAL='2',
+        LOG_LEVEL='WARNING'
+    )
+    env.update(extra_env)
+
+    if server == 'async':
+        command = [sys.executable, '-m', 'backend_async', '--host', '127.0.0.1', '--port', str(port)]
+    elif server == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '-c', os.path.join(repo, 'gunicorn.conf.py'),
+                   '--bind', f'127.0.0.1:{port}', 'text_to_3d.wsgi:app']
+    else:
+        command = [sys.executable, '-m', 'flask', '--app', 'backend_final', 'run',
+                   '--host', '127.0.0.1', '--port', str(port), '--no-reload', '--no-debugger']
+    process = subprocess.Popen(command, cwd=workdir, env=env)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Backend exited with code {process.returncode}")
+        try:
+            if requests.get(f"{base_url}/api/health", timeout=1).ok:
+                return process, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Backend did not become healthy within 60s")
+
+
+def format_seconds(value):
+    return '-' if value is None else f"{value * 1000:.0f}ms" if value < 10 else f"{value:.1f}s"
+
+
+def print_report(report):
+    print("\n" + "=" * 78)
+    server = f" ({report['server']})" if report.get('server') else ''
+    print(f"📊 {report['scenario']}{server}: {report['requests']} requests, concurrency {report['concurrency']}, "
+          f"{report['elapsed']:.1f}s")
+    print("=" * 78)
+    print(f"{'operation':<16}{'ok':>6}{'err':>6}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}{'ops/s':>10}")
+    for name, op in report['operations'].items():
+        throughput = '-' if op['throughput'] is None else f"{op['throughput']:.2f}"
+        print(f"{name:<16}{op['ok']:>6}{op['errors']:>6}{format_seconds(op['p50']):>10}"
+              f"{format_seconds(op['p95']):>10}{format_seconds(op['p99']):>10}"
+              f"{format_seconds(op['max']):>10}{throughput:>10}")
+        for error in op['sample_errors']:
+            print(f"    ⚠️ {error}")
+
+    rss = report.get('rss')
+    if rss:
+        print(f"\n💾 Backend RSS: start {rss['start'] / 2**20:.0f} MB, "
+              f"peak {rss['peak'] / 2**20:.0f} MB, end {rss['end'] / 2**20:.0f} MB")
+    upstream = report.get('upstream')
+    if upstream:
+        print("\n📡 Upstream calls:")
+        for key, count in sorted(upstream['calls'].items()):
+            print(f"    {key:<28}{count:>8}")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the backend against the fake OpenAI / Meshy upstream")
+    parser.add_argument('--scenario', choices=SCENARIOS, default='pipeline')
+    parser.add_argument('--requests', type=int, default=20, help='operations to run')
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--poll-interval', type=float, default=0.2, help='seconds between job status checks')
+    parser.add_argument('--timeout', type=float, default=600, help='seconds before an operation counts as failed')
+    parser.add_argument('--server', choices=SERVERS, default='flask',
+                        help='backend to start: backend_final.py (flask), backend_async.py (async) '
+                             'or text_to_3d.wsgi with gunicorn.conf.py (gunicorn)')
+    parser.add_argument('--backend-url', help='benchmark a running backend instead of starting one')
+    parser.add_argument('--backend-pid', type=int, help='pid of a running backend, for RSS sampling')
+    parser.add_argument('--upstream-url', help='stats URL base of a running fake upstream (with --backend-url)')
+    parser.add_argument('--backend-env', action='append', default=[], metavar='NAME=VALUE',
+                        help='extra environment for the started backend (repeatable)')
+    parser.add_argument('--webhooks', action='store_true',
+                        help='have the fake upstream push Meshy task statuses to the started backend')
+    parser.add_argument('--json', help='also write the report as JSON to this file')
+    fake_upstream.add_arguments(parser)
+    args = parser.parse_args()
+
+    extra_env = dict(item.split('=', 1) for item in args.backend_env)
+    upstream = backend = client = None
+    workdir = tempfile.TemporaryDirectory(prefix='backend-bench-')
+
+    try:
+        if args.backend_url:
+            base_url, pid, upstream_url = args.backend_url, args.backend_pid, args.upstream_url
+        else:
+            port = free_port()
+            if args.webhooks:
+                args.webhook_url = f"http://127.0.0.1:{port}/api/webhooks/meshy"
+                args.webhook_secret = extra_env.setdefault('MESHY_WEBHOOK_SECRET', uuid.uuid4().hex)
+            upstream = fake_upstream.from_arguments(args)
+            upstream_url = upstream.start()
+            backend, base_url = start_backend(upstream_url, port, workdir.name, extra_env, args.server)
+            pid = backend.pid
+            print(f"🧪 Fake upstream on {upstream_url}, backend on {base_url} (pid {pid})")
+
+        if upstream_url:
+            requests.post(f"{upstream_url}/_reset", timeout=10)
+
+        recorder = Recorder()
+        client = BackendClient(base_url, recorder, args.poll_interval, args.timeout)
+        sampler = RssSampler(pid).start() if pid else None
+
+        elapsed = run_scenario(client, args.scenario, args.requests, args.concurrency, uuid.uuid4().hex[:8])
+
+        report = {
+            'scenario': args.scenario,
+            'server': None if args.backend_url else args.server,
+            'requests': args.requests,
+            'concurrency': args.concurrency,
+            'elapsed': elapsed,
+            'operations': recorder.summary(elapsed),
+            'rss': sampler.stop() if sampler else None,
+            'upstream': requests.get(f"{upstream_url}/_stats", timeout=10).json() if upstream_url else None
+        }
+        print_report(report)
+
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(dict(report, metrics=client.metrics()), f, indent=2)
+            print(f"📝 Report written to {args.json}")
+
+    finally:
+        if client:
+            client.close()
+        if backend:
+            backend.terminate()
+            backend.wait(timeout=30)
+        if upstream:
+            upstream.close()
+        workdir.cleanup()
+
+
+if __name__ == '__main__':
+    main()
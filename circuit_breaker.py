@@ -0,0 +1,145 @@
+"""
+Per-upstream circuit breaker
+- Tracks error rate and slow calls over a rolling window
+- Open: calls fail fast with CircuitOpenError instead of waiting out timeouts
+- Half-open: after a cool-down a few trial calls decide whether to close again;
+  trials that never report back reopen the circuit after another cool-down
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+
+log = logging.getLogger(__name__)
+
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    A call counts as failed if it raised, returned a 5xx, or took longer than
+    slow_call_seconds. The circuit opens when at least min_calls were made in
+    the last window_seconds and the failure rate reached failure_rate.
+    """
+
+    def __init__(self, name, failure_rate=0.5, min_calls=10, window_seconds=60,
+                 slow_call_seconds=30, open_seconds=30, half_open_calls=1):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.state = CLOSED
+        self._calls = deque()
+        self._opened_at = 0.0
+        self._half_opened_at = 0.0
+        self._trials = 0
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def before_call(self):
+        """
+        Raise CircuitOpenError if the call must not go through
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._expire_trials(now)
+            if self.state == OPEN:
+                if now - self._opened_at < self.open_seconds:
+                    self.rejected += 1
+                    raise CircuitOpenError(self._open_message())
+                self.state = HALF_OPEN
+                self._half_opened_at = now
+                self._trials = 0
+
+            if self.state == HALF_OPEN:
+                if self._trials >= self.half_open_calls:
+                    self.rejected += 1
+                    raise CircuitOpenError(self._open_message())
+                self._trials += 1
+
+    def release(self):
+        """
+        A call let through by before_call() ended without telling anything
+        about the upstream (it was cancelled): give its trial slot back
+        """
+        with self._lock:
+            if self.state == HALF_OPEN and self._trials:
+                self._trials -= 1
+
+    def record(self, success, latency):
+        failed = not success or latency > self.slow_call_seconds
+        now = time.monotonic()
+
+        with self._lock:
+            if self.state == HALF_OPEN:
+                if failed:
+                    self._open(now)
+                else:
+                    # Trial call went through: start over with a clean window
+                    self.state = CLOSED
+                    self._calls.clear()
+                    log.info(f"✅ Circuit for {self.name} closed again", extra={'circuit': self.name})
+                return
+
+            self._calls.append((now, failed))
+            while self._calls and self._calls[0][0] < now - self.window_seconds:
+                self._calls.popleft()
+
+            failures = sum(1 for _, call_failed in self._calls if call_failed)
+            if (self.state == CLOSED and len(self._calls) >= self.min_calls
+                    and failures / len(self._calls) >= self.failure_rate):
+                self._open(now)
+
+    def available(self):
+        """
+        Whether a call would currently be let through (without using up a trial)
+        """
+        with self._lock:
+            self._expire_trials(time.monotonic())
+            if self.state == OPEN:
+                return time.monotonic() - self._opened_at >= self.open_seconds
+            if self.state == HALF_OPEN:
+                return self._trials < self.half_open_calls
+            return True
+
+    def stats(self):
+        with self._lock:
+            self._expire_trials(time.monotonic())
+            failures = sum(1 for _, call_failed in self._calls if call_failed)
+            retry_in = 0.0
+            if self.state == OPEN:
+                retry_in = max(0.0, self.open_seconds - (time.monotonic() - self._opened_at))
+            return {
+                'state': self.state,
+                'calls': len(self._calls),
+                'failures': failures,
+                'rejected': self.rejected,
+                'retry_in': round(retry_in, 1)
+            }
+
+    def _expire_trials(self, now):
+        # Trials that haven't reported back within open_seconds (their caller
+        # hangs or died) count as failed, so the circuit can't stay half-open
+        if (self.state == HALF_OPEN and self._trials >= self.half_open_calls
+                and now - self._half_opened_at >= self.open_seconds):
+            self._open(now)
+
+    def _open(self, now):
+        self.state = OPEN
+        self._opened_at = now
+        log.warning(f"🔌 Circuit for {self.name} opened; failing fast", extra={'circuit': self.name, 'open_seconds': self.open_seconds})
+
+    def _open_message(self):
+        return f"{self.name} is unavailable right now (circuit open), please retry shortly"
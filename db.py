@@ -0,0 +1,32 @@
+"""
+SQLite helpers shared by the on-disk indexes (caches, job store, history)
+- WAL journal so readers never block the writer
+- Short-lived connections, safe to use from any thread or process
+"""
+
+import os
+import sqlite3
+from contextlib import contextmanager
+
+
+@contextmanager
+def connect(db_path):
+    """
+    Open a connection, commit on success, roll back on error, always close
+    """
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
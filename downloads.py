@@ -0,0 +1,169 @@
+"""
+Streamed asset downloads straight to disk
+- Chunked transfer into a .part file, atomically renamed when complete
+- Content-Length and checksum verification (Content-MD5 or caller-supplied SHA-256)
+- Resumes an interrupted .part file with an HTTP Range request
+- Asks for the unencoded body (Accept-Encoding: identity) so byte counts and
+  Range offsets line up with what lands on disk
+- Any failure that ends the download removes the .part file
+"""
+
+import base64
+import hashlib
+import logging
+import os
+
+import requests
+
+
+log = logging.getLogger(__name__)
+
+
+class DownloadError(Exception):
+    """Raised when an asset cannot be downloaded or fails verification"""
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _hash_existing(path, hashers):
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            for hasher in hashers:
+                hasher.update(chunk)
+
+
+def _discard(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _is_encoded(response):
+    return response.headers.get('Content-Encoding', 'identity').strip().lower() not in ('', 'identity')
+
+
+def _request_headers(offset):
+    # The HTTP clients decode gzip bodies, but Content-Length / Content-Range
+    # count encoded bytes; only an unencoded body can be sized and resumed
+    headers = {'Accept-Encoding': 'identity'}
+    if offset:
+        headers['Range'] = f'bytes={offset}-'
+    return headers
+
+
+def _expected_total(response, offset):
+    if _is_encoded(response):
+        # The server compressed the body anyway: the lengths describe the
+        # encoded bytes, not the decoded ones written to disk
+        return None
+
+    # 206 replies carry the full size in Content-Range: bytes start-end/total
+    content_range = response.headers.get('Content-Range', '')
+    if '/' in content_range:
+        total = content_range.rsplit('/', 1)[1]
+        if total.isdigit():
+            return int(total)
+
+    length = response.headers.get('Content-Length')
+    if length is not None and length.isdigit():
+        return offset + int(length)
+    return None
+
+
+def stream_download(client, url, dest_path, expected_sha256=None,
+                    max_attempts=3, chunk_size=CHUNK_SIZE, **request_kwargs):
+    """
+    Download url into dest_path without buffering the body in memory.
+
+    client is an http_clients.UpstreamClient (or anything with a requests-like
+    get()); request_kwargs are passed on to client.get(). Returns a dict with
+    the final path, byte size and SHA-256 digest. The .part file is removed
+    whenever the download fails for good (including errors from client.get()
+    itself, such as an open circuit or a rate limit timeout).
+    """
+    part_path = f"{dest_path}.part"
+    try:
+        return _stream_download(client, url, dest_path, part_path, expected_sha256,
+                                max_attempts, chunk_size, request_kwargs)
+    except BaseException:
+        _discard(part_path)
+        raise
+
+
+def _stream_download(client, url, dest_path, part_path, expected_sha256,
+                     max_attempts, chunk_size, request_kwargs):
+    last_error = None
+
+    for attempt in range(1, max_attempts + 1):
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        encoded = False
+
+        try:
+            with client.get(url, headers=_request_headers(offset), stream=True, **request_kwargs) as response:
+                if response.status_code == 416:
+                    # Our partial file doesn't match the remote object; start over
+                    _discard(part_path)
+                    last_error = DownloadError("Range not satisfiable, restarting download")
+                    continue
+
+                if response.status_code not in (200, 206):
+                    raise DownloadError(f"Download failed ({response.status_code}) for {url}")
+
+                if response.status_code == 200:
+                    offset = 0
+
+                sha256 = hashlib.sha256()
+                md5 = hashlib.md5()
+                if offset:
+                    _hash_existing(part_path, (sha256, md5))
+
+                encoded = _is_encoded(response)
+                expected_size = _expected_total(response, offset)
+                content_md5 = None if encoded else response.headers.get('Content-MD5')
+
+                with open(part_path, 'ab' if offset else 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        if chunk:
+                            f.write(chunk)
+                            sha256.update(chunk)
+                            md5.update(chunk)
+
+            size = os.path.getsize(part_path)
+
+        except (requests.ConnectionError, requests.Timeout,
+                requests.exceptions.ChunkedEncodingError) as e:
+            # Keep the .part file so the next attempt resumes where this one
+            # stopped, unless it holds decoded bytes a Range can't address
+            if encoded:
+                _discard(part_path)
+            last_error = e
+            log.warning(f"⚠️ Download interrupted: {e}", extra={'url': url, 'attempt': attempt, 'max_attempts': max_attempts})
+            continue
+
+        if expected_size is not None and size < expected_size:
+            last_error = DownloadError(f"Incomplete download: got {size} of {expected_size} bytes")
+            log.warning(f"⚠️ {last_error}", extra={'url': url, 'attempt': attempt, 'max_attempts': max_attempts})
+            continue
+
+        if expected_size is not None and size != expected_size:
+            raise DownloadError(f"Size mismatch: got {size} bytes, expected {expected_size}")
+
+        # Content-MD5 describes the whole object, so it's only checked on full replies
+        if content_md5 and response.status_code == 200:
+            if base64.b64encode(md5.digest()).decode('ascii') != content_md5:
+                raise DownloadError("Content-MD5 mismatch")
+
+        digest = sha256.hexdigest()
+        if expected_sha256 and digest != expected_sha256.lower():
+            raise DownloadError(f"SHA-256 mismatch: expected {expected_sha256}, got {digest}")
+
+        os.replace(part_path, dest_path)
+        return {
+            'path': dest_path,
+            'size': size,
+            'sha256': digest
+        }
+
+    raise DownloadError(f"Download failed after {max_attempts} attempts: {last_error}")
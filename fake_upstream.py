@@ -0,0 +1,493 @@
+"""
+Local stand-in for the OpenAI and Meshy APIs, for benchmarks and offline development
+- DALL-E image generation with configurable latency, serving a generated PNG
+- Meshy image-to-3D tasks that move through PENDING / IN_PROGRESS along a
+  configurable progress curve and finish after a set duration
+- Synthetic GLB payloads of any size (a textured, displaced grid mesh)
+- Injected failures: 429s with Retry-After, 5xx errors, failed tasks
+- Optional signed status webhooks (on every status change and every few seconds
+  of progress), some of which can be dropped on purpose
+- Call counts per endpoint and status code on GET /_stats
+
+Point the backend at it with OPENAI_API_URL / MESHY_API_URL:
+    python fake_upstream.py --port 8900 --task-duration 20
+    OPENAI_API_URL=http://127.0.0.1:8900 MESHY_API_URL=http://127.0.0.1:8900 python backend_final.py
+
+With webhooks, the backend needs the same secret:
+    python fake_upstream.py --webhook-url http://127.0.0.1:5000/api/webhooks/meshy --webhook-secret s3cret
+    MESHY_WEBHOOK_SECRET=s3cret OPENAI_API_URL=... MESHY_API_URL=... python backend_final.py
+"""
+
+import argparse
+import heapq
+import itertools
+import json
+import math
+import random
+import re
+import struct
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import webhooks
+from glb import ARRAY_BUFFER, ELEMENT_ARRAY_BUFFER, FLOAT, UNSIGNED_INT, BinBuilder, write_glb
+
+
+PROGRESS_CURVES = {
+    'linear': lambda t: t,
+    'ease-in': lambda t: t * t,
+    'ease-out': lambda t: 1 - (1 - t) ** 2,
+    's-curve': lambda t: t * t * (3 - 2 * t),
+    # Races to 90% then crawls, like a slow texturing step
+    'stall': lambda t: 0.9 * min(1.0, t / 0.3) + 0.1 * max(0.0, (t - 0.3) / 0.7)
+}
+
+
+def _png_chunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+
+def make_png(size, seed=0):
+    """
+    A size x size RGB PNG of noise (so it doesn't compress away, like a real photo)
+    """
+    rng = random.Random(seed)
+    row_bytes = size * 3
+    raw = b''.join(b'\0' + rng.randbytes(row_bytes) for _ in range(size))
+
+    header = struct.pack('>IIBBBBB', size, size, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + _png_chunk(b'IHDR', header)
+            + _png_chunk(b'IDAT', zlib.compress(raw, 1)) + _png_chunk(b'IEND', b''))
+
+
+def tag_png(png, text):
+    """
+    Copy of a PNG with a tEXt chunk after IHDR, so every generated image has
+    distinct bytes (and so isn't deduplicated by the conversion cache)
+    """
+    ihdr_end = 8 + 25
+    return png[:ihdr_end] + _png_chunk(b'tEXt', b'Comment\0' + text.encode()) + png[ihdr_end:]
+
+
+def make_glb(target_bytes, texture=None):
+    """
+    A GLB of roughly target_bytes: a displaced grid (position, normal, uv,
+    uint32 indices) plus an optional embedded PNG texture
+    """
+    budget = max(0, target_bytes - (len(texture) if texture else 0))
+    # 32 bytes of attributes per vertex + 24 bytes of indices per grid cell
+    side = max(2, int(math.sqrt(budget / 56)))
+
+    positions, normals, uvs = [], [], []
+    for row in range(side):
+        for column in range(side):
+            u, v = column / (side - 1), row / (side - 1)
+            positions.append((u - 0.5, 0.1 * math.sin(u * 12) * math.cos(v * 12), v - 0.5))
+            normals.append((0.0, 1.0, 0.0))
+            uvs.append((u, v))
+
+    indices = []
+    for row in range(side - 1):
+        for column in range(side - 1):
+            a = row * side + column
+            b, c, d = a + 1, a + side, a + side + 1
+            indices.extend(((a, c, b), (b, c, d)))
+
+    builder = BinBuilder()
+    attributes = {
+        'POSITION': builder.add_accessor(positions, FLOAT, 'VEC3', target=ARRAY_BUFFER, bounds=True),
+        'NORMAL': builder.add_accessor(normals, FLOAT, 'VEC3', target=ARRAY_BUFFER),
+        'TEXCOORD_0': builder.add_accessor(uvs, FLOAT, 'VEC2', target=ARRAY_BUFFER)
+    }
+    flat_indices = [(index,) for triangle in indices for index in triangle]
+    index_accessor = builder.add_accessor(flat_indices, UNSIGNED_INT, 'SCALAR', target=ELEMENT_ARRAY_BUFFER)
+
+    material = {'pbrMetallicRoughness': {'metallicFactor': 0.0}}
+    gltf = {
+        'asset': {'version': '2.0', 'generator': 'fake_upstream'},
+        'scene': 0,
+        'scenes': [{'nodes': [0]}],
+        'nodes': [{'mesh': 0}],
+        'meshes': [{'primitives': [{'attributes': attributes, 'indices': index_accessor, 'material': 0}]}],
+        'materials': [material]
+    }
+    if texture:
+        image_view = builder.add_view(texture)
+        gltf['images'] = [{'bufferView': image_view, 'mimeType': 'image/png'}]
+        gltf['textures'] = [{'source': 0}]
+        material['pbrMetallicRoughness']['baseColorTexture'] = {'index': 0}
+
+    gltf['bufferViews'] = builder.buffer_views
+    gltf['accessors'] = builder.accessors
+    bin_chunk = builder.finish()
+    gltf['buffers'] = [{'byteLength': len(bin_chunk)}]
+    return write_glb(gltf, bin_chunk)
+
+
+class FakeUpstream:
+    """
+    The fake server's state and settings. Latencies are in seconds; rates are
+    probabilities per API call (asset downloads are never failed on purpose).
+    With a webhook_url, task statuses are also POSTed there, signed with
+    webhook_secret, when they change and every webhook_interval seconds of
+    progress (0: status changes only); webhook_drop_rate of them are lost.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, generation_latency=0.5, api_latency=0.05,
+                 latency_jitter=0.2, task_duration=10.0, queue_time=1.0, progress_curve='linear',
+                 image_size=1024, glb_bytes=2_000_000, glb_texture_size=512,
+                 throttle_rate=0.0, retry_after=1.0, error_rate=0.0, task_failure_rate=0.0, seed=None,
+                 webhook_url=None, webhook_secret=None, webhook_interval=2.0, webhook_drop_rate=0.0):
+        if progress_curve not in PROGRESS_CURVES:
+            raise ValueError(f"Unknown progress curve {progress_curve!r}, expected one of {sorted(PROGRESS_CURVES)}")
+        self.host = host
+        self.port = port
+        self.generation_latency = generation_latency
+        self.api_latency = api_latency
+        self.latency_jitter = latency_jitter
+        self.task_duration = task_duration
+        self.queue_time = queue_time
+        self.progress_curve = progress_curve
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+        self.error_rate = error_rate
+        self.task_failure_rate = task_failure_rate
+        self.webhook_url = webhook_url
+        self.webhook_secret = webhook_secret
+        self.webhook_interval = webhook_interval
+        self.webhook_drop_rate = webhook_drop_rate
+        self.random = random.Random(seed)
+
+        self.png = make_png(image_size, seed=seed or 0)
+        self.glb = make_glb(glb_bytes, texture=make_png(glb_texture_size, seed=1) if glb_texture_size else None)
+
+        self.tasks = {}
+        self.calls = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._webhooks = []
+        self._webhook_sequence = itertools.count()
+        self._webhook_ready = threading.Condition()
+        self._webhook_thread = None
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self._server.server_port}"
+
+    def start(self):
+        """
+        Serve from a background thread; returns the base URL
+        """
+        self._server = ThreadingHTTPServer((self.host, self.port), self._handler())
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name='fake-upstream', daemon=True).start()
+        return self.base_url
+
+    def serve_forever(self):
+        self._server = ThreadingHTTPServer((self.host, self.port), self._handler())
+        self._server.daemon_threads = True
+        print(f"🧪 Fake OpenAI / Meshy upstream on {self.base_url}")
+        self._server.serve_forever()
+
+    def close(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def count(self, endpoint, status):
+        with self._lock:
+            key = f"{endpoint} {status}"
+            self.calls[key] = self.calls.get(key, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            calls = dict(self.calls)
+        totals = {}
+        for key, count in calls.items():
+            endpoint = key.split(' ')[0]
+            totals[endpoint] = totals.get(endpoint, 0) + count
+        return {'calls': calls, 'totals': totals, 'tasks': len(self.tasks)}
+
+    def reset(self):
+        with self._lock:
+            self.calls.clear()
+            self.tasks.clear()
+
+    def delay(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds * self.random.uniform(1 - self.latency_jitter, 1 + self.latency_jitter))
+
+    def injected_failure(self):
+        """
+        None, or (status, headers) of a 429 / 5xx to answer instead
+        """
+        roll = self.random.random()
+        if roll < self.throttle_rate:
+            # Retry-After is whole seconds (RFC 9110); urllib3 rejects fractions
+            return 429, {'Retry-After': str(math.ceil(self.retry_after))}
+        if roll < self.throttle_rate + self.error_rate:
+            return self.random.choice((500, 502, 503)), {}
+        return None
+
+    def create_task(self, payload):
+        task_id = str(uuid.uuid4())
+        created_at = time.time()
+        with self._lock:
+            self.tasks[task_id] = {
+                'created_at': created_at,
+                'fails': self.random.random() < self.task_failure_rate,
+                'image_url': payload.get('image_url', '')[:100]
+            }
+        if self.webhook_url:
+            self.schedule_webhooks(task_id, created_at)
+        return task_id
+
+    def schedule_webhooks(self, task_id, created_at):
+        """
+        Queue a task's callbacks: when it starts, as it progresses, when it ends
+        """
+        started = created_at + self.queue_time
+        offsets = [0.0]
+        if self.webhook_interval > 0:
+            steps = math.ceil(self.task_duration / self.webhook_interval)
+            offsets += [step * self.webhook_interval for step in range(1, steps)]
+        # Just past the end, so task_status() already reports the final state
+        offsets.append(self.task_duration + 0.01)
+
+        with self._webhook_ready:
+            for offset in offsets:
+                heapq.heappush(self._webhooks, (started + offset, next(self._webhook_sequence), task_id))
+            if self._webhook_thread is None:
+                self._webhook_thread = threading.Thread(target=self._send_webhooks, name='fake-webhooks', daemon=True)
+                self._webhook_thread.start()
+            self._webhook_ready.notify()
+
+    def _send_webhooks(self):
+        while True:
+            with self._webhook_ready:
+                while not self._webhooks or self._webhooks[0][0] > time.time():
+                    self._webhook_ready.wait(self._webhooks[0][0] - time.time() if self._webhooks else None)
+                _, _, task_id = heapq.heappop(self._webhooks)
+
+            status = self.task_status(task_id)
+            if status is None:
+                continue
+            if self.random.random() < self.webhook_drop_rate:
+                self.count('meshy.webhook', 'dropped')
+                continue
+            threading.Thread(target=self.send_webhook, args=(status,), daemon=True).start()
+
+    def send_webhook(self, status):
+        """
+        POST one signed task status to the webhook URL
+        """
+        body = json.dumps(status).encode('utf-8')
+        request = urllib.request.Request(self.webhook_url, data=body, method='POST', headers={
+            'Content-Type': 'application/json',
+            webhooks.SIGNATURE_HEADER: webhooks.sign(self.webhook_secret or '', body)
+        })
+        try:
+            with urllib.request.urlopen(request, timeout=10) as response:
+                self.count('meshy.webhook', response.status)
+        except urllib.error.HTTPError as e:
+            self.count('meshy.webhook', e.code)
+        except OSError:
+            self.count('meshy.webhook', 'error')
+
+    def task_status(self, task_id):
+        with self._lock:
+            task = self.tasks.get(task_id)
+        if task is None:
+            return None
+
+        elapsed = time.time() - task['created_at']
+        created_ms = int(task['created_at'] * 1000)
+        status = {
+            'id': task_id,
+            'status': 'PENDING',
+            'progress': 0,
+            'created_at': created_ms,
+            'started_at': 0,
+            'finished_at': 0,
+            'model_urls': {},
+            'task_error': {'message': ''}
+        }
+        if elapsed < self.queue_time:
+            return status
+
+        running = elapsed - self.queue_time
+        status['started_at'] = created_ms + int(self.queue_time * 1000)
+        if running < self.task_duration:
+            fraction = PROGRESS_CURVES[self.progress_curve](running / self.task_duration)
+            status.update(status='IN_PROGRESS', progress=min(99, int(fraction * 100)))
+            return status
+
+        status['finished_at'] = status['started_at'] + int(self.task_duration * 1000)
+        if task['fails']:
+            status.update(status='FAILED', task_error={'message': 'Simulated task failure'})
+        else:
+            status.update(status='SUCCEEDED', progress=100, model_urls={'glb': f"{self.base_url}/assets/models/{task_id}.glb"})
+        return status
+
+    def _handler(self):
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def send(self, endpoint, status, body, content_type='application/json', headers=None):
+                upstream.count(endpoint, status)
+                if not isinstance(body, bytes):
+                    body = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if self.command != 'HEAD':
+                    self.wfile.write(body)
+
+            def fail(self, endpoint):
+                failure = upstream.injected_failure()
+                if failure is None:
+                    return False
+                status, headers = failure
+                self.send(endpoint, status, {'error': {'message': f'Simulated {status}'}}, headers=headers)
+                return True
+
+            def read_json(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                try:
+                    return json.loads(body or b'{}')
+                except ValueError:
+                    return {}
+
+            def send_asset(self, endpoint, data, content_type):
+                # Honour "Range: bytes=N-" so resumed downloads can be exercised too
+                match = re.match(r'bytes=(\d+)-$', self.headers.get('Range', ''))
+                if match and int(match.group(1)) < len(data):
+                    start = int(match.group(1))
+                    self.send(endpoint, 206, data[start:], content_type, {
+                        'Content-Range': f"bytes {start}-{len(data) - 1}/{len(data)}"
+                    })
+                else:
+                    self.send(endpoint, 200, data, content_type)
+
+            def do_POST(self):
+                payload = self.read_json()
+
+                if self.path == '/v1/images/generations':
+                    upstream.delay(upstream.generation_latency)
+                    if self.fail('openai.generate'):
+                        return
+                    image_id = uuid.uuid4()
+                    self.send('openai.generate', 200, {
+                        'created': int(time.time()),
+                        'data': [{
+                            'url': f"{upstream.base_url}/assets/images/{image_id}.png",
+                            'revised_prompt': payload.get('prompt', '')
+                        }]
+                    })
+                elif self.path == '/openapi/v1/image-to-3d':
+                    upstream.delay(upstream.api_latency)
+                    if self.fail('meshy.create'):
+                        return
+                    self.send('meshy.create', 202, {'result': upstream.create_task(payload)})
+                elif self.path == '/_reset':
+                    upstream.reset()
+                    self.send('control', 200, {'reset': True})
+                else:
+                    self.send('unknown', 404, {'message': 'Not found'})
+
+            def do_GET(self):
+                if self.path.startswith('/openapi/v1/image-to-3d/'):
+                    upstream.delay(upstream.api_latency)
+                    if self.fail('meshy.status'):
+                        return
+                    status = upstream.task_status(self.path.rsplit('/', 1)[1])
+                    if status is None:
+                        self.send('meshy.status', 404, {'message': 'Task not found'})
+                    else:
+                        self.send('meshy.status', 200, status)
+                elif self.path.startswith('/assets/images/'):
+                    image_id = self.path.rsplit('/', 1)[1]
+                    self.send_asset('assets.image', tag_png(upstream.png, image_id), 'image/png')
+                elif self.path.startswith('/assets/models/'):
+                    self.send_asset('assets.model', upstream.glb, 'model/gltf-binary')
+                elif self.path == '/_stats':
+                    self.send('control', 200, upstream.stats())
+                else:
+                    self.send('unknown', 404, {'message': 'Not found'})
+
+        return Handler
+
+
+def add_arguments(parser):
+    """
+    Fake upstream settings, shared with benchmark.py
+    """
+    group = parser.add_argument_group('fake upstream')
+    group.add_argument('--generation-latency', type=float, default=0.5, help='seconds per DALL-E call')
+    group.add_argument('--api-latency', type=float, default=0.05, help='seconds per Meshy API call')
+    group.add_argument('--latency-jitter', type=float, default=0.2, help='+/- fraction applied to latencies')
+    group.add_argument('--task-duration', type=float, default=10.0, help='seconds a Meshy task runs')
+    group.add_argument('--queue-time', type=float, default=1.0, help='seconds a Meshy task stays PENDING')
+    group.add_argument('--progress-curve', choices=sorted(PROGRESS_CURVES), default='linear')
+    group.add_argument('--image-size', type=int, default=1024, help='generated PNG width / height')
+    group.add_argument('--glb-mb', type=float, default=2.0, help='approximate GLB payload size in MB')
+    group.add_argument('--glb-texture-size', type=int, default=512, help='embedded texture size (0 = none)')
+    group.add_argument('--throttle-rate', type=float, default=0.0, help='probability of a 429 per API call')
+    group.add_argument('--retry-after', type=float, default=1.0, help='Retry-After seconds sent with 429s (rounded up)')
+    group.add_argument('--error-rate', type=float, default=0.0, help='probability of a 5xx per API call')
+    group.add_argument('--task-failure-rate', type=float, default=0.0, help='probability a Meshy task fails')
+    group.add_argument('--webhook-url', help='POST signed task statuses here (e.g. http://127.0.0.1:5000/api/webhooks/meshy)')
+    group.add_argument('--webhook-secret', help='HMAC secret for webhook signatures (MESHY_WEBHOOK_SECRET of the backend)')
+    group.add_argument('--webhook-interval', type=float, default=2.0,
+                       help='seconds between progress webhooks of a running task (0 = status changes only)')
+    group.add_argument('--webhook-drop-rate', type=float, default=0.0, help='probability a webhook is never sent')
+    group.add_argument('--seed', type=int, default=None)
+
+
+def from_arguments(args, host='127.0.0.1', port=0):
+    return FakeUpstream(
+        host=host,
+        port=port,
+        generation_latency=args.generation_latency,
+        api_latency=args.api_latency,
+        latency_jitter=args.latency_jitter,
+        task_duration=args.task_duration,
+        queue_time=args.queue_time,
+        progress_curve=args.progress_curve,
+        image_size=args.image_size,
+        glb_bytes=int(args.glb_mb * 1_000_000),
+        glb_texture_size=args.glb_texture_size,
+        throttle_rate=args.throttle_rate,
+        retry_after=args.retry_after,
+        error_rate=args.error_rate,
+        task_failure_rate=args.task_failure_rate,
+        seed=args.seed,
+        webhook_url=args.webhook_url,
+        webhook_secret=args.webhook_secret,
+        webhook_interval=args.webhook_interval,
+        webhook_drop_rate=args.webhook_drop_rate
+    )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    from_arguments(args, host=args.host, port=args.port).serve_forever()
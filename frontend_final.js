@@ -1,6 +1,9 @@
 // Global state
 let currentImageData = null;
 let generatedImages = [];
+let historyCursor = null;
+let historyQuery = '';
+let historySearchTimer = null;
 
 // DOM Elements
 const ideaInput = document.getElementById('ideaInput');
@@ -14,15 +17,30 @@ const closeBtn = document.querySelector('.close-btn');
 const download3DBtn = document.getElementById('download3DBtn');
 const downloadImageBtn = document.getElementById('downloadImageBtn');
 const modelStatus = document.getElementById('modelStatus');
+const historySearch = document.getElementById('historySearch');
+const loadMoreBtn = document.getElementById('loadMoreBtn');
 
 // API Configuration
 const API_BASE_URL = 'http://localhost:5000/api';
+const JOB_POLL_INTERVAL_MS = 3000;
+const HISTORY_PAGE_SIZE = 24;
+const HISTORY_SEARCH_DELAY_MS = 300;
 
 // Event Listeners
 generateBtn.addEventListener('click', generateImage);
 closeBtn.addEventListener('click', closeModal);
 download3DBtn.addEventListener('click', convertTo3D);
 downloadImageBtn.addEventListener('click', downloadImage);
+loadMoreBtn.addEventListener('click', () => loadHistory());
+
+// Search past creations by prompt, once the user stops typing
+historySearch.addEventListener('input', () => {
+    clearTimeout(historySearchTimer);
+    historySearchTimer = setTimeout(() => {
+        historyQuery = historySearch.value.trim();
+        loadHistory(true);
+    }, HISTORY_SEARCH_DELAY_MS);
+});
 
 // Close modal when clicking outside
 window.addEventListener('click', (e) => {
@@ -76,6 +94,7 @@ async function generateImage() {
             const imageData = {
                 id: data.image_id,
                 imageUrl: `http://localhost:5000${data.image_url}`,
+                thumbnailUrl: data.thumbnail_url ? `http://localhost:5000${data.thumbnail_url}` : null,
                 imagePath: data.image_path,  // Store for 3D conversion
                 prompt: data.prompt,
                 timestamp: new Date().toISOString()
@@ -83,7 +102,9 @@ async function generateImage() {
             
             addImageToGallery(imageData);
             
-            showStatus('✨ Image generated successfully! Click to view or convert to 3D.', 'success');
+            showStatus(data.cached
+                ? '♻️ Same prompt generated before — showing the saved image. Click to view or convert to 3D.'
+                : '✨ Image generated successfully! Click to view or convert to 3D.', 'success');
             
             // Clear input
             ideaInput.value = '';
@@ -100,15 +121,81 @@ async function generateImage() {
     }
 }
 
+/**
+ * Load one page of past generations from the backend.
+ * reset starts over from the newest (e.g. for a new search); otherwise the
+ * next page is appended after what is already shown.
+ */
+async function loadHistory(reset = false) {
+    if (reset) {
+        historyCursor = null;
+        generatedImages = [];
+        imageGallery.innerHTML = '';
+    }
+    
+    const params = new URLSearchParams({ limit: HISTORY_PAGE_SIZE });
+    if (historyCursor) params.set('cursor', historyCursor);
+    if (historyQuery) params.set('q', historyQuery);
+    
+    loadMoreBtn.disabled = true;
+    try {
+        const response = await fetch(`${API_BASE_URL}/generations?${params}`);
+        const data = await response.json();
+        
+        if (!data.success) {
+            throw new Error(data.error || 'Failed to load history');
+        }
+        
+        data.generations.forEach(generation => {
+            addImageToGallery(historyImageData(generation), { append: true });
+        });
+        
+        historyCursor = data.next_cursor;
+        loadMoreBtn.style.display = historyCursor ? 'block' : 'none';
+        
+        if (!imageGallery.children.length) {
+            imageGallery.innerHTML = `
+                <div class="empty-gallery">
+                    <p>${historyQuery ? '🔍 No creations match your search.' : '🎨 No images yet. Start by entering your idea above!'}</p>
+                </div>
+            `;
+        }
+    } catch (error) {
+        console.error('Error loading history:', error);
+    } finally {
+        loadMoreBtn.disabled = false;
+    }
+}
+
+/**
+ * Gallery entry for a generation returned by /api/generations
+ */
+function historyImageData(generation) {
+    return {
+        id: generation.image_id,
+        imageUrl: `http://localhost:5000${generation.image_url}`,
+        thumbnailUrl: generation.thumbnail_url ? `http://localhost:5000${generation.thumbnail_url}` : null,
+        imagePath: generation.image_path,
+        modelUrl: generation.model_url,
+        prompt: generation.prompt,
+        timestamp: generation.timestamp
+    };
+}
+
 /**
  * Add generated image to the gallery
  * FIXED: Properly removes empty state and shows multiple images
+ * append adds it after the existing items (older history pages)
  */
-function addImageToGallery(imageData) {
+function addImageToGallery(imageData, { append = false } = {}) {
     console.log('Adding image to gallery:', imageData);
     
     // Store in array
-    generatedImages.unshift(imageData);
+    if (append) {
+        generatedImages.push(imageData);
+    } else {
+        generatedImages.unshift(imageData);
+    }
     
     // CRITICAL: Remove the empty gallery message if it exists
     const emptyGallery = document.querySelector('.empty-gallery');
@@ -122,8 +209,14 @@ function addImageToGallery(imageData) {
     galleryItem.className = 'gallery-item';
     galleryItem.dataset.imageId = imageData.id;
     
+    // Gallery tiles load a small derivative (2x for high-DPI screens), not the full PNG
+    const thumbnailUrl = imageData.thumbnailUrl || imageData.imageUrl;
+    const thumbnailSrcset = imageData.thumbnailUrl
+        ? `${thumbnailUrl} 1x, ${thumbnailUrl.replace(/w=\d+/, 'w=512')} 2x`
+        : '';
+    
     galleryItem.innerHTML = `
-        <img src="${imageData.imageUrl}" alt="${imageData.prompt}" loading="lazy" crossorigin="anonymous">
+        <img src="${thumbnailUrl}" srcset="${thumbnailSrcset}" alt="${imageData.prompt}" loading="lazy" crossorigin="anonymous">
         <div class="gallery-item-overlay">
             <p class="gallery-item-prompt">${imageData.prompt}</p>
         </div>
@@ -132,8 +225,8 @@ function addImageToGallery(imageData) {
     // Add click handler
     galleryItem.addEventListener('click', () => openModal(imageData));
     
-    // Insert at beginning of gallery
-    if (imageGallery.firstChild) {
+    // Insert at beginning of gallery (history pages go at the end)
+    if (imageGallery.firstChild && !append) {
         imageGallery.insertBefore(galleryItem, imageGallery.firstChild);
     } else {
         imageGallery.appendChild(galleryItem);
@@ -189,7 +282,8 @@ async function convertTo3D() {
                 'Content-Type': 'application/json',
             },
             body: JSON.stringify({
-                image_path: currentImageData.imagePath
+                image_path: currentImageData.imagePath,
+                prompt: currentImageData.prompt
             })
         });
         
@@ -198,7 +292,12 @@ async function convertTo3D() {
             throw new Error(errorData.error || `HTTP error! status: ${response.status}`);
         }
         
-        const data = await response.json();
+        let data = await response.json();
+        
+        // The backend queues conversions and returns a job id to follow
+        if (data.job_id) {
+            data = await waitForJob(data.job_id);
+        }
         
         if (data.success) {
             const modelUrl = `http://localhost:5000${data.model_url}`;
@@ -230,6 +329,70 @@ async function convertTo3D() {
     }
 }
 
+/**
+ * Follow a background job until it finishes, showing live progress.
+ * Uses the Server-Sent Events stream and falls back to polling if it fails.
+ */
+function waitForJob(jobId) {
+    if (!window.EventSource) {
+        return pollJob(jobId);
+    }
+    
+    return new Promise((resolve, reject) => {
+        const events = new EventSource(`${API_BASE_URL}/jobs/${jobId}/events`);
+        
+        events.addEventListener('progress', (e) => {
+            showJobProgress(JSON.parse(e.data));
+        });
+        
+        events.addEventListener('done', (e) => {
+            events.close();
+            const job = JSON.parse(e.data);
+            if (job.status === 'succeeded') {
+                resolve(job);
+            } else {
+                reject(new Error(job.error || '3D conversion failed'));
+            }
+        });
+        
+        events.onerror = () => {
+            // Stream dropped (proxy, server restart...): carry on by polling
+            events.close();
+            console.warn('Progress stream lost, falling back to polling');
+            pollJob(jobId).then(resolve, reject);
+        };
+    });
+}
+
+/**
+ * Poll a background job until it finishes, showing progress as it goes
+ */
+async function pollJob(jobId) {
+    while (true) {
+        await new Promise(resolve => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+        
+        const response = await fetch(`${API_BASE_URL}/jobs/${jobId}`);
+        const job = await response.json();
+        
+        if (!response.ok || job.status === 'failed') {
+            throw new Error(job.error || `HTTP error! status: ${response.status}`);
+        }
+        
+        if (job.status === 'succeeded') {
+            return job;
+        }
+        
+        showJobProgress(job);
+    }
+}
+
+/**
+ * Show the status and progress of a running conversion job
+ */
+function showJobProgress(job) {
+    modelStatus.textContent = `🎭 Converting to 3D model... ${job.progress || 0}% (${job.status})`;
+}
+
 /**
  * Download the current image
  */
@@ -288,6 +451,7 @@ window.addEventListener('load', async () => {
         const data = await response.json();
         console.log('✅ Backend connected:', data);
         console.log('Gallery children on load:', imageGallery.children.length);
+        await loadHistory(true);
     } catch (error) {
         console.error('❌ Backend connection failed:', error);
         showStatus('⚠️ Backend not connected. Make sure Flask server is running on port 5000.', 'error');
@@ -0,0 +1,599 @@
+"""
+Minimal pure-Python glTF 2.0 binary (GLB) reader/writer
+- Parses the 12-byte header and the JSON / BIN chunks
+- Reads accessors (strided, normalized and sparse) into Python tuples
+- BinBuilder packs new buffer views and accessors into a single BIN chunk
+- inspect_glb validates a file's structure and summarizes its contents
+- inspect_glb_file does the same for a file on disk through a memory map
+"""
+
+import base64
+import json
+import mmap
+import os
+import struct
+
+
+class GLBError(Exception):
+    """Raised for files that are not valid (or not supported) GLB 2.0"""
+
+
+GLB_MAGIC = 0x46546C67  # b'glTF'
+CHUNK_JSON = 0x4E4F534A
+CHUNK_BIN = 0x004E4942
+
+BYTE = 5120
+UNSIGNED_BYTE = 5121
+SHORT = 5122
+UNSIGNED_SHORT = 5123
+UNSIGNED_INT = 5125
+FLOAT = 5126
+
+COMPONENT_FORMATS = {
+    BYTE: 'b',
+    UNSIGNED_BYTE: 'B',
+    SHORT: 'h',
+    UNSIGNED_SHORT: 'H',
+    UNSIGNED_INT: 'I',
+    FLOAT: 'f'
+}
+
+TYPE_SIZES = {
+    'SCALAR': 1,
+    'VEC2': 2,
+    'VEC3': 3,
+    'VEC4': 4,
+    'MAT2': 4,
+    'MAT3': 9,
+    'MAT4': 16
+}
+
+# Divisors that map normalized integers back to [-1, 1] / [0, 1]
+NORMALIZED_DIVISORS = {
+    BYTE: 127.0,
+    UNSIGNED_BYTE: 255.0,
+    SHORT: 32767.0,
+    UNSIGNED_SHORT: 65535.0
+}
+
+# glTF buffer target hints
+ARRAY_BUFFER = 34962
+ELEMENT_ARRAY_BUFFER = 34963
+
+
+def parse_glb(data):
+    """
+    Split GLB bytes into (gltf_json, bin_chunk). bin_chunk is b'' if absent.
+    data may be any buffer (e.g. a memoryview of an mmap); bin_chunk is then
+    a slice of it rather than a copy.
+    """
+    if len(data) < 20:
+        raise GLBError(f"File too small to be a GLB ({len(data)} bytes)")
+
+    magic, version, length = struct.unpack_from('<III', data, 0)
+    if magic != GLB_MAGIC:
+        raise GLBError("Missing glTF magic header")
+    if version != 2:
+        raise GLBError(f"Unsupported glTF container version {version}")
+    if length != len(data):
+        raise GLBError(f"Header says {length} bytes but file has {len(data)} (truncated?)")
+
+    gltf, bin_chunk = None, b''
+    offset = 12
+    while offset < length:
+        if offset + 8 > length:
+            raise GLBError("Truncated chunk header")
+        chunk_length, chunk_type = struct.unpack_from('<II', data, offset)
+        start, end = offset + 8, offset + 8 + chunk_length
+        if end > length:
+            raise GLBError("Chunk runs past the end of the file (truncated?)")
+
+        if chunk_type == CHUNK_JSON and gltf is None:
+            try:
+                gltf = json.loads(bytes(data[start:end]).decode('utf-8'))
+            except (UnicodeDecodeError, ValueError) as e:
+                raise GLBError(f"Invalid JSON chunk: {e}")
+            if not isinstance(gltf, dict):
+                raise GLBError("JSON chunk is not an object")
+        elif chunk_type == CHUNK_BIN and not bin_chunk:
+            bin_chunk = data[start:end]
+
+        offset = end
+
+    if gltf is None:
+        raise GLBError("No JSON chunk")
+    return gltf, bin_chunk
+
+
+def write_glb(gltf, bin_chunk):
+    """
+    Serialize (gltf_json, bin_chunk) back to GLB bytes, with 4-byte chunk padding
+    """
+    json_bytes = json.dumps(gltf, separators=(',', ':')).encode('utf-8')
+    json_bytes += b' ' * (-len(json_bytes) % 4)
+    bin_chunk = bytes(bin_chunk) + b'\0' * (-len(bin_chunk) % 4)
+
+    length = 12 + 8 + len(json_bytes) + (8 + len(bin_chunk) if bin_chunk else 0)
+    parts = [
+        struct.pack('<III', GLB_MAGIC, 2, length),
+        struct.pack('<II', len(json_bytes), CHUNK_JSON),
+        json_bytes
+    ]
+    if bin_chunk:
+        parts += [struct.pack('<II', len(bin_chunk), CHUNK_BIN), bin_chunk]
+    return b''.join(parts)
+
+
+def buffer_view_bytes(gltf, bin_chunk, view_index):
+    view = gltf['bufferViews'][view_index]
+    if view.get('buffer', 0) != 0 or 'uri' in gltf['buffers'][view.get('buffer', 0)]:
+        raise GLBError("Only the embedded GLB buffer is supported")
+    start = view.get('byteOffset', 0)
+    end = start + view['byteLength']
+    if end > len(bin_chunk):
+        raise GLBError(f"bufferView {view_index} runs past the BIN chunk")
+    return bin_chunk[start:end]
+
+
+def _read_elements(gltf, bin_chunk, view_index, byte_offset, count, component_type, components):
+    view = gltf['bufferViews'][view_index]
+    code = COMPONENT_FORMATS[component_type]
+    element = struct.Struct('<' + code * components)
+    stride = view.get('byteStride') or element.size
+
+    start = view.get('byteOffset', 0) + byte_offset
+    end = start + stride * (count - 1) + element.size if count else start
+    if end > view.get('byteOffset', 0) + view['byteLength'] or end > len(bin_chunk):
+        raise GLBError(f"Accessor data runs past bufferView {view_index}")
+
+    if stride == element.size:
+        return list(element.iter_unpack(bin_chunk[start:end]))
+    return [element.unpack_from(bin_chunk, start + i * stride) for i in range(count)]
+
+
+def read_accessor(gltf, bin_chunk, accessor_index, normalize=True):
+    """
+    Return an accessor's elements as a list of tuples. Normalized integer
+    data is converted to floats unless normalize=False; other data keeps
+    its stored type.
+    """
+    accessor = gltf['accessors'][accessor_index]
+    component_type = accessor['componentType']
+    components = TYPE_SIZES[accessor['type']]
+    count = accessor['count']
+
+    if component_type not in COMPONENT_FORMATS:
+        raise GLBError(f"Unknown componentType {component_type}")
+    if accessor['type'] in ('MAT2', 'MAT3') and component_type != FLOAT:
+        raise GLBError("Padded non-float matrix accessors are not supported")
+
+    if 'bufferView' in accessor:
+        values = _read_elements(
+            gltf, bin_chunk, accessor['bufferView'], accessor.get('byteOffset', 0),
+            count, component_type, components
+        )
+    else:
+        values = [(0,) * components] * count
+
+    sparse = accessor.get('sparse')
+    if sparse:
+        indices = sparse['indices']
+        sparse_indices = _read_elements(
+            gltf, bin_chunk, indices['bufferView'], indices.get('byteOffset', 0),
+            sparse['count'], indices['componentType'], 1
+        )
+        sparse_values = _read_elements(
+            gltf, bin_chunk, sparse['values']['bufferView'], sparse['values'].get('byteOffset', 0),
+            sparse['count'], component_type, components
+        )
+        for (index,), value in zip(sparse_indices, sparse_values):
+            values[index] = value
+
+    if normalize and accessor.get('normalized') and component_type in NORMALIZED_DIVISORS:
+        divisor = NORMALIZED_DIVISORS[component_type]
+        values = [tuple(max(c / divisor, -1.0) for c in value) for value in values]
+
+    return values
+
+
+class BinBuilder:
+    """
+    Accumulates buffer views and accessors for a new BIN chunk
+    """
+
+    def __init__(self):
+        self.data = bytearray()
+        self.buffer_views = []
+        self.accessors = []
+
+    def add_view(self, payload, target=None, stride=None):
+        self.data += b'\0' * (-len(self.data) % 4)
+        view = {'buffer': 0, 'byteOffset': len(self.data), 'byteLength': len(payload)}
+        if target:
+            view['target'] = target
+        if stride:
+            view['byteStride'] = stride
+        self.data += payload
+        self.buffer_views.append(view)
+        return len(self.buffer_views) - 1
+
+    def add_accessor(self, values, component_type, accessor_type, normalized=False,
+                     target=None, bounds=False):
+        """
+        Pack values (tuples) into a new bufferView + accessor; returns the accessor index.
+        Vertex attributes (target=ARRAY_BUFFER) are padded to a 4-byte stride as glTF requires.
+        """
+        components = TYPE_SIZES[accessor_type]
+        code = COMPONENT_FORMATS[component_type]
+        element_size = struct.calcsize('<' + code * components)
+        padding = -element_size % 4 if target == ARRAY_BUFFER else 0
+        element = struct.Struct('<' + code * components + 'x' * padding)
+
+        payload = b''.join(element.pack(*value) for value in values)
+        stride = element.size if padding else None
+        view_index = self.add_view(payload, target=target, stride=stride)
+
+        accessor = {
+            'bufferView': view_index,
+            'componentType': component_type,
+            'count': len(values),
+            'type': accessor_type
+        }
+        if normalized:
+            accessor['normalized'] = True
+        if bounds and values:
+            accessor['min'] = [min(value[i] for value in values) for i in range(components)]
+            accessor['max'] = [max(value[i] for value in values) for i in range(components)]
+
+        self.accessors.append(accessor)
+        return len(self.accessors) - 1
+
+    def finish(self):
+        self.data += b'\0' * (-len(self.data) % 4)
+        return bytes(self.data)
+
+
+# ==================== VALIDATION / INSPECTION ====================
+
+def image_dimensions(data):
+    """
+    (width, height) from a PNG, JPEG or WebP header, or None if unrecognized
+    """
+    if data[:8] == b'\x89PNG\r\n\x1a\n' and data[12:16] == b'IHDR' and len(data) >= 24:
+        return struct.unpack('>II', data[16:24])
+
+    if data[:2] == b'\xff\xd8':
+        offset = 2
+        while offset + 9 <= len(data):
+            if data[offset] != 0xFF:
+                return None
+            marker = data[offset + 1]
+            if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+                offset += 2
+                continue
+            (segment_length,) = struct.unpack('>H', data[offset + 2:offset + 4])
+            # Start-of-frame markers carry the image size
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                height, width = struct.unpack('>HH', data[offset + 5:offset + 9])
+                return width, height
+            offset += 2 + segment_length
+        return None
+
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP' and len(data) >= 30:
+        chunk = data[12:16]
+        if chunk == b'VP8 ':
+            width, height = struct.unpack('<HH', data[26:30])
+            return width & 0x3FFF, height & 0x3FFF
+        if chunk == b'VP8L':
+            bits = int.from_bytes(data[21:25], 'little')
+            return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+        if chunk == b'VP8X':
+            return int.from_bytes(data[24:27], 'little') + 1, int.from_bytes(data[27:30], 'little') + 1
+
+    return None
+
+
+def _node_matrix(node):
+    """
+    Local transform of a node as a column-major 4x4 list
+    """
+    if 'matrix' in node:
+        return list(node['matrix'])
+
+    tx, ty, tz = node.get('translation', (0, 0, 0))
+    x, y, z, w = node.get('rotation', (0, 0, 0, 1))
+    sx, sy, sz = node.get('scale', (1, 1, 1))
+    return [
+        (1 - 2 * (y * y + z * z)) * sx, 2 * (x * y + z * w) * sx, 2 * (x * z - y * w) * sx, 0,
+        2 * (x * y - z * w) * sy, (1 - 2 * (x * x + z * z)) * sy, 2 * (y * z + x * w) * sy, 0,
+        2 * (x * z + y * w) * sz, 2 * (y * z - x * w) * sz, (1 - 2 * (x * x + y * y)) * sz, 0,
+        tx, ty, tz, 1
+    ]
+
+
+def _multiply(a, b):
+    return [
+        sum(a[k * 4 + row] * b[column * 4 + k] for k in range(4))
+        for column in range(4) for row in range(4)
+    ]
+
+
+def _transform_point(m, point):
+    x, y, z = point
+    return (
+        m[0] * x + m[4] * y + m[8] * z + m[12],
+        m[1] * x + m[5] * y + m[9] * z + m[13],
+        m[2] * x + m[6] * y + m[10] * z + m[14]
+    )
+
+
+def _check_index(gltf, collection, index, where):
+    if not isinstance(index, int) or not 0 <= index < len(gltf.get(collection, [])):
+        raise GLBError(f"{where} points at missing {collection}[{index}]")
+
+
+def _objects(gltf, collection):
+    """
+    A top-level glTF array, checked to hold only objects
+    """
+    items = gltf.get(collection, [])
+    if not isinstance(items, list) or not all(isinstance(item, dict) for item in items):
+        raise GLBError(f"'{collection}' must be an array of objects")
+    return items
+
+
+def _check_count(item, key, where, required=False):
+    """
+    A non-negative integer property (byteLength, count, byteOffset, ...)
+    """
+    if key not in item:
+        if required:
+            raise GLBError(f"{where} is missing '{key}'")
+        return
+    value = item[key]
+    if not isinstance(value, int) or isinstance(value, bool) or value < 0:
+        raise GLBError(f"{where} has an invalid '{key}': {value!r}")
+
+
+def _validate(gltf, bin_chunk):
+    asset = gltf.get('asset')
+    if not isinstance(asset, dict):
+        raise GLBError("Missing 'asset' object")
+    version = str(asset.get('version', ''))
+    if not version.startswith('2.'):
+        raise GLBError(f"Unsupported glTF asset version '{version}'")
+
+    for index, buffer in enumerate(_objects(gltf, 'buffers')):
+        if 'uri' in buffer:
+            raise GLBError(f"buffers[{index}] references an external file")
+        _check_count(buffer, 'byteLength', f"buffers[{index}]", required=True)
+        if buffer['byteLength'] > len(bin_chunk):
+            raise GLBError(f"buffers[{index}] needs {buffer['byteLength']} bytes, BIN chunk has {len(bin_chunk)}")
+
+    for index, view in enumerate(_objects(gltf, 'bufferViews')):
+        where = f"bufferViews[{index}]"
+        _check_index(gltf, 'buffers', view.get('buffer'), where)
+        _check_count(view, 'byteLength', where, required=True)
+        _check_count(view, 'byteOffset', where)
+        _check_count(view, 'byteStride', where)
+        if view.get('byteOffset', 0) + view['byteLength'] > len(bin_chunk):
+            raise GLBError(f"bufferViews[{index}] runs past the BIN chunk")
+
+    for index, accessor in enumerate(_objects(gltf, 'accessors')):
+        where = f"accessors[{index}]"
+        if accessor.get('componentType') not in COMPONENT_FORMATS or accessor.get('type') not in TYPE_SIZES:
+            raise GLBError(f"{where} has an invalid componentType/type")
+        _check_count(accessor, 'count', where, required=True)
+        _check_count(accessor, 'byteOffset', where)
+        if 'bufferView' not in accessor or not accessor['count']:
+            continue
+        _check_index(gltf, 'bufferViews', accessor['bufferView'], f"accessors[{index}]")
+        view = gltf['bufferViews'][accessor['bufferView']]
+        element_size = struct.calcsize('<' + COMPONENT_FORMATS[accessor['componentType']] * TYPE_SIZES[accessor['type']])
+        stride = view.get('byteStride') or element_size
+        end = accessor.get('byteOffset', 0) + stride * (accessor['count'] - 1) + element_size
+        if end > view.get('byteLength', 0):
+            raise GLBError(f"accessors[{index}] runs past its bufferView")
+
+    for index, image in enumerate(_objects(gltf, 'images')):
+        if 'bufferView' in image:
+            _check_index(gltf, 'bufferViews', image['bufferView'], f"images[{index}]")
+        elif not str(image.get('uri', '')).startswith('data:'):
+            raise GLBError(f"images[{index}] references an external file")
+
+    for index, texture in enumerate(_objects(gltf, 'textures')):
+        if 'source' in texture:
+            _check_index(gltf, 'images', texture['source'], f"textures[{index}]")
+
+    _objects(gltf, 'materials')
+    for mesh_index, mesh in enumerate(_objects(gltf, 'meshes')):
+        where = f"meshes[{mesh_index}]"
+        for primitive in _objects(mesh, 'primitives'):
+            if not isinstance(primitive.get('attributes', {}), dict):
+                raise GLBError(f"{where} has a primitive whose attributes are not an object")
+            for accessor_index in primitive.get('attributes', {}).values():
+                _check_index(gltf, 'accessors', accessor_index, where)
+            if 'indices' in primitive:
+                _check_index(gltf, 'accessors', primitive['indices'], where)
+            if 'material' in primitive:
+                _check_index(gltf, 'materials', primitive['material'], where)
+
+    for index, node in enumerate(_objects(gltf, 'nodes')):
+        if 'mesh' in node:
+            _check_index(gltf, 'meshes', node['mesh'], f"nodes[{index}]")
+        for child in node.get('children', []):
+            _check_index(gltf, 'nodes', child, f"nodes[{index}]")
+
+    for index, scene in enumerate(_objects(gltf, 'scenes')):
+        for node in scene.get('nodes', []):
+            _check_index(gltf, 'nodes', node, f"scenes[{index}]")
+
+    if not any('POSITION' in primitive.get('attributes', {})
+               for mesh in gltf.get('meshes', []) for primitive in mesh.get('primitives', [])):
+        raise GLBError("Model has no mesh geometry")
+
+
+def _position_bounds(gltf, bin_chunk, accessor_index):
+    accessor = gltf['accessors'][accessor_index]
+    if 'min' in accessor and 'max' in accessor:
+        low, high = accessor['min'], accessor['max']
+        divisor = NORMALIZED_DIVISORS.get(accessor['componentType'])
+        if accessor.get('normalized') and divisor:
+            low = [max(c / divisor, -1.0) for c in low]
+            high = [max(c / divisor, -1.0) for c in high]
+        return low[:3], high[:3]
+
+    values = read_accessor(gltf, bin_chunk, accessor_index)
+    if not values:
+        return None
+    return [min(v[axis] for v in values) for axis in range(3)], [max(v[axis] for v in values) for axis in range(3)]
+
+
+def _scene_bounds(gltf, bin_chunk):
+    """
+    World-space bounding box of the default scene (every root node if there is none)
+    """
+    nodes = gltf.get('nodes', [])
+    scenes = gltf.get('scenes', [])
+    if scenes:
+        roots = scenes[gltf.get('scene', 0) if gltf.get('scene', 0) < len(scenes) else 0].get('nodes', [])
+    else:
+        children = {child for node in nodes for child in node.get('children', [])}
+        roots = [index for index in range(len(nodes)) if index not in children]
+
+    mesh_bounds = {}
+    low = [float('inf')] * 3
+    high = [float('-inf')] * 3
+    stack = [(root, _node_matrix(nodes[root]), {root}) for root in roots]
+
+    while stack:
+        index, matrix, path = stack.pop()
+        node = nodes[index]
+
+        if 'mesh' in node:
+            if node['mesh'] not in mesh_bounds:
+                boxes = [
+                    _position_bounds(gltf, bin_chunk, primitive['attributes']['POSITION'])
+                    for primitive in gltf['meshes'][node['mesh']].get('primitives', [])
+                    if 'POSITION' in primitive.get('attributes', {})
+                ]
+                mesh_bounds[node['mesh']] = [box for box in boxes if box]
+
+            for box_low, box_high in mesh_bounds[node['mesh']]:
+                for corner in ((x, y, z) for x in (box_low[0], box_high[0])
+                               for y in (box_low[1], box_high[1]) for z in (box_low[2], box_high[2])):
+                    point = _transform_point(matrix, corner)
+                    low = [min(a, b) for a, b in zip(low, point)]
+                    high = [max(a, b) for a, b in zip(high, point)]
+
+        for child in node.get('children', []):
+            if child in path:
+                raise GLBError(f"Node hierarchy has a cycle at nodes[{child}]")
+            stack.append((child, _multiply(matrix, _node_matrix(nodes[child])), path | {child}))
+
+    if low[0] == float('inf'):
+        return None, None
+    return [round(c, 6) for c in low], [round(c, 6) for c in high]
+
+
+def _image_bytes(gltf, bin_chunk, image):
+    if 'bufferView' in image:
+        return buffer_view_bytes(gltf, bin_chunk, image['bufferView'])
+    header, _, payload = image['uri'].partition(',')
+    try:
+        return base64.b64decode(payload) if header.endswith(';base64') else payload.encode('utf-8')
+    except ValueError:
+        raise GLBError("Invalid data: URI in image")
+
+
+def inspect_glb(data):
+    """
+    Validate GLB bytes and summarize them. Raises GLBError for truncated,
+    corrupt or externally-referencing files. Returns a dict with byte size,
+    vertex / triangle counts, textures and the scene's bounding box.
+    """
+    gltf, bin_chunk = parse_glb(data)
+    try:
+        _validate(gltf, bin_chunk)
+        return _summarize(gltf, bin_chunk, len(data))
+    except (KeyError, TypeError, AttributeError, IndexError, ValueError, struct.error) as e:
+        # Malformed JSON that the structural checks above don't name
+        raise GLBError(f"Malformed glTF: {type(e).__name__}: {e}")
+
+
+def inspect_glb_file(path):
+    """
+    inspect_glb for a file on disk. The file is memory-mapped instead of
+    read, so only the pages the checks touch (header, JSON chunk, the BIN
+    ranges being validated) are loaded.
+    """
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < 20:
+            raise GLBError(f"File too small to be a GLB ({size} bytes)")
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    view = memoryview(mapped)
+    try:
+        return inspect_glb(view)
+    except GLBError as e:
+        # Keep only the message: the traceback's frames hold slices of the
+        # map, and the map must be closed before the caller can delete the
+        # file (Windows refuses to remove a mapped file)
+        message = str(e)
+    finally:
+        view.release()
+        try:
+            mapped.close()
+        except BufferError:
+            # Another error is on its way up with views into the map;
+            # it is unmapped once those are collected
+            pass
+    raise GLBError(message)
+
+
+def _summarize(gltf, bin_chunk, byte_size):
+    vertices = 0
+    triangles = 0
+    primitives = 0
+    for mesh in gltf.get('meshes', []):
+        for primitive in mesh.get('primitives', []):
+            attributes = primitive.get('attributes', {})
+            if 'POSITION' not in attributes:
+                continue
+            primitives += 1
+            vertex_count = gltf['accessors'][attributes['POSITION']]['count']
+            vertices += vertex_count
+            count = gltf['accessors'][primitive['indices']]['count'] if 'indices' in primitive else vertex_count
+            mode = primitive.get('mode', 4)
+            if mode == 4:
+                triangles += count // 3
+            elif mode in (5, 6):
+                triangles += max(0, count - 2)
+
+    textures = []
+    for image in gltf.get('images', []):
+        image_data = _image_bytes(gltf, bin_chunk, image)
+        size = image_dimensions(image_data)
+        textures.append({
+            'mime_type': image.get('mimeType'),
+            'bytes': len(image_data),
+            'width': size[0] if size else None,
+            'height': size[1] if size else None
+        })
+
+    bbox_min, bbox_max = _scene_bounds(gltf, bin_chunk)
+
+    return {
+        'bytes': byte_size,
+        'vertices': vertices,
+        'triangles': triangles,
+        'meshes': len(gltf.get('meshes', [])),
+        'primitives': primitives,
+        'materials': len(gltf.get('materials', [])),
+        'textures': textures,
+        'bbox_min': bbox_min,
+        'bbox_max': bbox_max,
+        'generator': gltf.get('asset', {}).get('generator'),
+        'extensions': gltf.get('extensionsUsed', [])
+    }
@@ -0,0 +1,400 @@
+"""
+GLB post-processing: vertex dedup, quantization and levels of detail
+- Merges duplicate vertices and re-indexes every triangle primitive
+- Quantizes positions, normals and UVs (KHR_mesh_quantization)
+- Vertex-clustering simplification for the smaller levels of detail
+- Optional texture downscaling / recompression (needs Pillow)
+- Writes <name>.lod<percent>.glb files plus a <name>.lods.json manifest
+"""
+
+import copy
+import json
+import math
+import os
+
+from glb import (
+    ARRAY_BUFFER, BYTE, ELEMENT_ARRAY_BUFFER, FLOAT, UNSIGNED_INT, UNSIGNED_SHORT,
+    BinBuilder, GLBError, buffer_view_bytes, parse_glb, read_accessor, write_glb
+)
+from image_derivatives import recompress_texture
+
+
+QUANTIZATION_EXTENSION = 'KHR_mesh_quantization'
+
+# Extensions that store geometry outside plain accessors; files using them are left alone
+UNSUPPORTED_EXTENSIONS = {
+    'KHR_draco_mesh_compression',
+    'EXT_meshopt_compression',
+    'EXT_mesh_gpu_instancing'
+}
+
+SUPPORTED_ATTRIBUTES = {'POSITION', 'NORMAL', 'TEXCOORD_0', 'COLOR_0'}
+TRIANGLES = 4
+
+# Finest clustering grid tried when simplifying (cells along the longest axis)
+MAX_GRID_RESOLUTION = 1024
+
+
+def _check_supported(gltf):
+    extensions = set(gltf.get('extensionsUsed', [])) | set(gltf.get('extensionsRequired', []))
+    unsupported = extensions & UNSUPPORTED_EXTENSIONS
+    if unsupported:
+        raise GLBError(f"Compressed geometry is not supported: {', '.join(sorted(unsupported))}")
+    for buffer in gltf.get('buffers', []):
+        if 'uri' in buffer:
+            raise GLBError("External buffers are not supported")
+
+
+def _is_simple(primitive):
+    attributes = primitive.get('attributes', {})
+    return (
+        primitive.get('mode', TRIANGLES) == TRIANGLES
+        and 'POSITION' in attributes
+        and set(attributes) <= SUPPORTED_ATTRIBUTES
+        and not primitive.get('targets')
+    )
+
+
+def _load_primitive(gltf, bin_chunk, primitive):
+    attributes = {
+        name: read_accessor(gltf, bin_chunk, index)
+        for name, index in primitive['attributes'].items()
+    }
+    vertex_count = len(attributes['POSITION'])
+
+    if 'indices' in primitive:
+        indices = [index for (index,) in read_accessor(gltf, bin_chunk, primitive['indices'])]
+    else:
+        indices = list(range(vertex_count))
+
+    if any(index >= vertex_count for index in indices):
+        raise GLBError("Index out of range")
+    triangles = list(zip(indices[0::3], indices[1::3], indices[2::3]))
+    return attributes, triangles
+
+
+def _cluster(positions, triangles, origin, cell):
+    """
+    Snap every vertex to the first vertex seen in its grid cell and drop the
+    triangles that collapse. Returns the remapped triangles.
+    """
+    ox, oy, oz = origin
+    inverse = 1.0 / cell
+    representatives = {}
+    remap = []
+    for x, y, z in positions:
+        key = (int((x - ox) * inverse), int((y - oy) * inverse), int((z - oz) * inverse))
+        remap.append(representatives.setdefault(key, len(remap)))
+
+    seen = set()
+    clustered = []
+    for a, b, c in triangles:
+        a, b, c = remap[a], remap[b], remap[c]
+        if a == b or b == c or a == c:
+            continue
+        # Same triangle with the same winding, whatever vertex it starts at
+        key = min((a, b, c), (b, c, a), (c, a, b))
+        if key not in seen:
+            seen.add(key)
+            clustered.append((a, b, c))
+    return clustered
+
+
+def simplify(positions, triangles, target):
+    """
+    Vertex-clustering simplification: binary-search the grid resolution for
+    the finest grid that brings the triangle count down to `target`
+    """
+    if len(triangles) <= target:
+        return triangles
+
+    used = {index for triangle in triangles for index in triangle}
+    low_corner = [min(positions[i][axis] for i in used) for axis in range(3)]
+    high_corner = [max(positions[i][axis] for i in used) for axis in range(3)]
+    extent = max(high - low for low, high in zip(low_corner, high_corner)) or 1.0
+
+    best = None
+    smallest = None
+    low, high = 1, MAX_GRID_RESOLUTION
+    while low <= high:
+        resolution = (low + high) // 2
+        clustered = _cluster(positions, triangles, low_corner, extent / resolution)
+        if clustered and (smallest is None or len(clustered) < len(smallest)):
+            smallest = clustered
+        if len(clustered) <= target:
+            if clustered:
+                best = clustered
+            low = resolution + 1
+        else:
+            high = resolution - 1
+
+    # A very low target can collapse the mesh entirely; keep the coarsest non-empty result
+    return best or smallest or triangles
+
+
+def _unit(vector):
+    length = math.sqrt(sum(c * c for c in vector)) or 1.0
+    return tuple(c / length for c in vector)
+
+
+def _encode_attributes(attributes, accessor_types, frame, quantize):
+    """
+    Per attribute: (values, componentType, type, normalized).
+    `frame` is (origin, scale) for quantized positions, or None to keep floats.
+    """
+    encoded = {}
+    for name, values in attributes.items():
+        accessor_type = accessor_types[name]
+
+        if name == 'POSITION' and frame:
+            origin, scale = frame
+            values = [
+                tuple(min(65535, max(0, round((c - o) / scale * 65535))) for c, o in zip(value, origin))
+                for value in values
+            ]
+            encoded[name] = (values, UNSIGNED_SHORT, accessor_type, True)
+        elif name == 'NORMAL' and quantize:
+            values = [tuple(round(c * 127) for c in _unit(value)) for value in values]
+            encoded[name] = (values, BYTE, accessor_type, True)
+        elif name == 'TEXCOORD_0' and quantize and all(0.0 <= c <= 1.0 for value in values for c in value):
+            values = [tuple(round(c * 65535) for c in value) for value in values]
+            encoded[name] = (values, UNSIGNED_SHORT, accessor_type, True)
+        else:
+            encoded[name] = ([tuple(float(c) for c in value) for value in values], FLOAT, accessor_type, False)
+    return encoded
+
+
+def _position_frame(loaded):
+    """
+    Shared dequantization transform for all primitives of a mesh. The scale is
+    uniform so normals are not skewed by the node transform.
+    """
+    positions = [value for attributes, _ in loaded for value in attributes['POSITION']]
+    if not positions:
+        return None
+    origin = [min(value[axis] for value in positions) for axis in range(3)]
+    extent = max(max(value[axis] for value in positions) - origin[axis] for axis in range(3))
+    return [float(c) for c in origin], float(extent) or 1.0
+
+
+def _normal_map_images(gltf):
+    """
+    Images used as normal maps, which must not be re-encoded lossily
+    """
+    textures = gltf.get('textures', [])
+    images = set()
+    for material in gltf.get('materials', []):
+        texture_index = material.get('normalTexture', {}).get('index')
+        if texture_index is not None and texture_index < len(textures) and 'source' in textures[texture_index]:
+            images.add(textures[texture_index]['source'])
+    return images
+
+
+def optimize_glb(data, ratio=1.0, quantize=True, recompress_textures=False, texture_max_size=None):
+    """
+    Return (glb_bytes, stats) for a deduplicated, optionally quantized copy of
+    a GLB with each triangle primitive simplified to about `ratio` of its triangles.
+    With recompress_textures, embedded images are re-encoded and downscaled to
+    texture_max_size. Materials, skins and animations are carried over unchanged.
+    """
+    gltf, bin_chunk = parse_glb(data)
+    _check_supported(gltf)
+
+    out = copy.deepcopy(gltf)
+    builder = BinBuilder()
+    copied = {}
+    stats = {'triangles': 0, 'vertices': 0}
+
+    def copy_accessor(index, target=None):
+        """
+        Re-pack an accessor as-is (densifying sparse data) into the new buffer
+        """
+        if index not in copied:
+            accessor = gltf['accessors'][index]
+            values = read_accessor(gltf, bin_chunk, index, normalize=False)
+            new_index = builder.add_accessor(
+                values, accessor['componentType'], accessor['type'],
+                normalized=accessor.get('normalized', False), target=target
+            )
+            for key in ('min', 'max', 'name'):
+                if key in accessor:
+                    builder.accessors[new_index][key] = accessor[key]
+            copied[index] = new_index
+        return copied[index]
+
+    normal_maps = _normal_map_images(gltf)
+    for image_index, image in enumerate(out.get('images', [])):
+        if 'bufferView' in image:
+            image_data = buffer_view_bytes(gltf, bin_chunk, image['bufferView'])
+            if recompress_textures:
+                image_data, mime_type = recompress_texture(
+                    image_data, image.get('mimeType'),
+                    max_size=texture_max_size, lossless=image_index in normal_maps
+                )
+                if mime_type:
+                    image['mimeType'] = mime_type
+            image['bufferView'] = builder.add_view(image_data)
+
+    skinned_meshes = {node['mesh'] for node in gltf.get('nodes', []) if 'mesh' in node and 'skin' in node}
+    frames = {}
+
+    for mesh_index, mesh in enumerate(out.get('meshes', [])):
+        primitives = mesh.get('primitives', [])
+        loaded = [
+            _load_primitive(gltf, bin_chunk, primitive) if _is_simple(primitive) else None
+            for primitive in primitives
+        ]
+
+        # Quantized positions rely on a node transform, which skinned meshes ignore
+        frame = None
+        if quantize and mesh_index not in skinned_meshes and all(loaded):
+            frame = _position_frame(loaded)
+            if frame:
+                frames[mesh_index] = frame
+
+        for primitive, primitive_data in zip(primitives, loaded):
+            if primitive_data is None:
+                for name, index in primitive['attributes'].items():
+                    primitive['attributes'][name] = copy_accessor(index, ARRAY_BUFFER)
+                for target in primitive.get('targets', []):
+                    for name, index in target.items():
+                        target[name] = copy_accessor(index, ARRAY_BUFFER)
+                if 'indices' in primitive:
+                    primitive['indices'] = copy_accessor(primitive['indices'], ELEMENT_ARRAY_BUFFER)
+                continue
+
+            attributes, triangles = primitive_data
+            if ratio < 1.0:
+                target_count = max(1, int(len(triangles) * ratio))
+                triangles = simplify(attributes['POSITION'], triangles, target_count)
+
+            accessor_types = {
+                name: gltf['accessors'][index]['type'] for name, index in primitive['attributes'].items()
+            }
+            encoded = _encode_attributes(attributes, accessor_types, frame, quantize)
+            names = list(encoded)
+
+            # Dedup on the encoded values, so vertices that quantize alike merge too
+            vertex_ids = {}
+            order = []
+            indices = []
+            for triangle in triangles:
+                for vertex in triangle:
+                    key = tuple(encoded[name][0][vertex] for name in names)
+                    new_index = vertex_ids.get(key)
+                    if new_index is None:
+                        new_index = vertex_ids[key] = len(order)
+                        order.append(vertex)
+                    indices.append(new_index)
+
+            for name in names:
+                values, component_type, accessor_type, normalized = encoded[name]
+                primitive['attributes'][name] = builder.add_accessor(
+                    [values[vertex] for vertex in order], component_type, accessor_type,
+                    normalized=normalized, target=ARRAY_BUFFER, bounds=(name == 'POSITION')
+                )
+
+            index_type = UNSIGNED_SHORT if len(order) < 65536 else UNSIGNED_INT
+            primitive['indices'] = builder.add_accessor(
+                [(index,) for index in indices], index_type, 'SCALAR', target=ELEMENT_ARRAY_BUFFER
+            )
+            primitive['mode'] = TRIANGLES
+            stats['triangles'] += len(triangles)
+            stats['vertices'] += len(order)
+
+    for skin in out.get('skins', []):
+        if 'inverseBindMatrices' in skin:
+            skin['inverseBindMatrices'] = copy_accessor(skin['inverseBindMatrices'])
+    for animation in out.get('animations', []):
+        for sampler in animation.get('samplers', []):
+            sampler['input'] = copy_accessor(sampler['input'])
+            sampler['output'] = copy_accessor(sampler['output'])
+
+    # Quantized meshes move to a child node that carries the dequantization
+    # transform, so the original node's children are not affected by it
+    if frames:
+        nodes = out.setdefault('nodes', [])
+        for node in list(nodes):
+            if node.get('mesh') in frames:
+                origin, scale = frames[node['mesh']]
+                nodes.append({'mesh': node.pop('mesh'), 'translation': origin, 'scale': [scale] * 3})
+                node.setdefault('children', []).append(len(nodes) - 1)
+
+        for key in ('extensionsUsed', 'extensionsRequired'):
+            extensions = out.setdefault(key, [])
+            if QUANTIZATION_EXTENSION not in extensions:
+                extensions.append(QUANTIZATION_EXTENSION)
+
+    new_bin = builder.finish()
+    out['accessors'] = builder.accessors
+    out['bufferViews'] = builder.buffer_views
+    out['buffers'] = [{'byteLength': len(new_bin)}]
+    # glTF arrays must not be empty when present
+    for key in ('accessors', 'bufferViews'):
+        if not out[key]:
+            del out[key]
+    if not new_bin:
+        del out['buffers']
+
+    return write_glb(out, new_bin), stats
+
+
+def lod_path(model_path, ratio):
+    stem, _ = os.path.splitext(model_path)
+    return f"{stem}.lod{round(ratio * 100)}.glb"
+
+
+def manifest_path(model_path):
+    stem, _ = os.path.splitext(model_path)
+    return f"{stem}.lods.json"
+
+
+def _write_atomic(path, payload):
+    temp_path = f"{path}.part"
+    with open(temp_path, 'wb') as f:
+        f.write(payload)
+    os.replace(temp_path, path)
+
+
+def lod_texture_size(texture_max_size, ratio):
+    """
+    Texture size cap for a LOD: shrinks with the square root of the triangle ratio
+    """
+    if not texture_max_size:
+        return None
+    return max(64, int(texture_max_size * math.sqrt(ratio)))
+
+
+def build_lods(model_path, ratios=(1.0, 0.5, 0.1), quantize=True,
+               recompress_textures=False, texture_max_size=None):
+    """
+    Write one optimized GLB per ratio next to model_path and a manifest
+    listing them, largest first. The original file is left untouched.
+    Returns the manifest dict.
+    """
+    with open(model_path, 'rb') as f:
+        data = f.read()
+
+    lods = []
+    for ratio in sorted(set(ratios), reverse=True):
+        payload, stats = optimize_glb(
+            data, ratio=ratio, quantize=quantize,
+            recompress_textures=recompress_textures,
+            texture_max_size=lod_texture_size(texture_max_size, ratio)
+        )
+        path = lod_path(model_path, ratio)
+        _write_atomic(path, payload)
+        lods.append({
+            'ratio': ratio,
+            'file': os.path.basename(path),
+            'bytes': len(payload),
+            **stats
+        })
+
+    manifest = {
+        'source': os.path.basename(model_path),
+        'bytes': len(data),
+        'lods': lods
+    }
+    _write_atomic(manifest_path(model_path), json.dumps(manifest, indent=2).encode('utf-8'))
+    return manifest
@@ -0,0 +1,40 @@
+"""
+Production serving with gunicorn (pip install gunicorn; not needed for development)
+
+    gunicorn -c gunicorn.conf.py text_to_3d.wsgi:app
+    WEB_CONCURRENCY=4 GUNICORN_THREADS=16 BIND=0.0.0.0:8000 gunicorn -c gunicorn.conf.py text_to_3d.wsgi:app
+
+- WEB_CONCURRENCY worker processes (default: one per core, at most 8), each with
+  GUNICORN_THREADS request threads; SSE and NDJSON streams hold a thread while open
+- The app is imported once in the master; every worker starts its own pools,
+  clients and job leases after the fork
+- Workers share jobs, caches, history and assets through DATA_FOLDER, and the
+  upstream rate limits are split between them
+"""
+
+import os
+
+from text_to_3d.config import default_workers
+
+bind = os.getenv("BIND", "0.0.0.0:5000")
+workers = default_workers()
+worker_class = 'gthread'
+threads = int(os.getenv("GUNICORN_THREADS", "16"))
+
+# A DALL-E call can hold a request thread for a minute without the worker being stuck
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
+
+preload_app = True
+
+# The app reads the worker count to share out rate limits and job leases
+os.environ["WEB_CONCURRENCY"] = str(workers)
+
+
+def post_fork(server, worker):
+    from text_to_3d import services
+
+    app = server.app.wsgi()
+    if 'text_to_3d' in getattr(app, 'extensions', {}):
+        services(app).start()
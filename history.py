@@ -0,0 +1,227 @@
+"""
+Generation history for the gallery
+- One row per generated (or cache-reused) image, with the model it was converted to
+- Keyset pagination on the row id: each page costs O(page size), however long the archive
+- Prompt search through an SQLite FTS5 index (plain LIKE matching if FTS5 is missing)
+"""
+
+import base64
+import logging
+import re
+import sqlite3
+import time
+
+from db import connect
+
+
+log = logging.getLogger(__name__)
+
+
+class InvalidCursor(ValueError):
+    """Raised for a cursor that wasn't produced by GenerationHistory.page"""
+
+
+def encode_cursor(row_id):
+    return base64.urlsafe_b64encode(f"g{row_id}".encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        if not raw.startswith('g'):
+            raise ValueError(cursor)
+        return int(raw[1:])
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidCursor(f"Invalid cursor: {cursor}")
+
+
+def match_query(text):
+    """
+    FTS5 query for free text: every word must match, as a prefix
+    (quoted, so user input can't inject FTS syntax)
+    """
+    words = re.findall(r'\w+', text)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def like_pattern(word):
+    """
+    LIKE pattern matching word anywhere, with its own % _ and \\ taken literally
+    (for use with ESCAPE '\\')
+    """
+    escaped = word.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+
+class GenerationHistory:
+    """
+    Rows are only ever appended, stamped with the time they are added, so the
+    autoincrement id follows created_at: pages are ordered by id (new rows
+    never shift a page boundary), and a date range is turned into an id
+    range with one index lookup per bound.
+
+    That order is assumed, not checked: rows added with a created_at older
+    than rows already there (a backfill, a wall clock stepped back) are
+    listed in insertion order, and a date filter may miss them. Workers
+    racing to add rows differ by milliseconds at most.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        with connect(self.db_path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS generations (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    image_id TEXT NOT NULL UNIQUE,
+                    prompt TEXT NOT NULL,
+                    image_url TEXT NOT NULL,
+                    image_path TEXT NOT NULL,
+                    model_url TEXT,
+                    cached INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS generations_created ON generations (created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS generations_image ON generations (image_url)")
+            self.fts = self._create_fts(conn)
+
+    @staticmethod
+    def _create_fts(conn):
+        try:
+            conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS generations_fts USING fts5(
+                    prompt, content='generations', content_rowid='id'
+                )
+            """)
+        except sqlite3.OperationalError as e:
+            log.warning(f"⚠️ SQLite FTS5 unavailable, prompt search falls back to LIKE: {e}")
+            return False
+
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS generations_fts_insert AFTER INSERT ON generations BEGIN
+                INSERT INTO generations_fts (rowid, prompt) VALUES (new.id, new.prompt);
+            END
+        """)
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS generations_fts_delete AFTER DELETE ON generations BEGIN
+                INSERT INTO generations_fts (generations_fts, rowid, prompt) VALUES ('delete', old.id, old.prompt);
+            END
+        """)
+        return True
+
+    def add(self, image_id, prompt, image_url, image_path, cached=False, created_at=None):
+        with connect(self.db_path) as conn:
+            conn.execute(
+                """
+                INSERT OR IGNORE INTO generations
+                    (image_id, prompt, image_url, image_path, cached, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (image_id, prompt, image_url, image_path, int(bool(cached)), created_at or time.time())
+            )
+
+    def set_model(self, image_url, model_url):
+        """
+        Record the model an image was converted to (on every generation of that image)
+        """
+        with connect(self.db_path) as conn:
+            conn.execute("UPDATE generations SET model_url = ? WHERE image_url = ?", (model_url, image_url))
+
+    def forget_image(self, image_url):
+        with connect(self.db_path) as conn:
+            conn.execute("DELETE FROM generations WHERE image_url = ?", (image_url,))
+
+    def forget_model(self, model_url):
+        with connect(self.db_path) as conn:
+            conn.execute("UPDATE generations SET model_url = NULL WHERE model_url = ?", (model_url,))
+
+    def page(self, cursor=None, limit=20, since=None, until=None, query=None):
+        """
+        Newest first. since / until are epoch seconds (inclusive / exclusive),
+        query is free text matched against prompts. Returns (items, next_cursor);
+        next_cursor is None on the last page.
+        """
+        words = re.findall(r'\w+', query or '')
+
+        with connect(self.db_path) as conn:
+            low, high = self._id_range(conn, since, until)
+            if cursor is not None:
+                before = decode_cursor(cursor) - 1
+                high = before if high is None else min(high, before)
+
+            def id_bounds(column):
+                conditions, args = [], []
+                if low is not None:
+                    conditions.append(f"{column} >= ?")
+                    args.append(low)
+                if high is not None:
+                    conditions.append(f"{column} <= ?")
+                    args.append(high)
+                return conditions, args
+
+            if words and self.fts:
+                # Walk the FTS index itself in rowid order so only one page is read
+                conditions, args = id_bounds('rowid')
+                rows = conn.execute(
+                    f"""
+                    SELECT g.* FROM (
+                        SELECT rowid AS id FROM generations_fts
+                        WHERE {' AND '.join(['generations_fts MATCH ?', *conditions])}
+                        ORDER BY rowid DESC LIMIT ?
+                    ) AS hits JOIN generations AS g ON g.id = hits.id
+                    ORDER BY g.id DESC
+                    """,
+                    [match_query(query), *args, limit + 1]
+                ).fetchall()
+            else:
+                conditions, args = id_bounds('id')
+                for word in words:
+                    conditions.append("prompt LIKE ? ESCAPE '\\'")
+                    args.append(like_pattern(word))
+                where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+                rows = conn.execute(
+                    f"SELECT * FROM generations {where} ORDER BY id DESC LIMIT ?",
+                    [*args, limit + 1]
+                ).fetchall()
+
+        items = [self._to_dict(row) for row in rows[:limit]]
+        next_cursor = encode_cursor(rows[limit - 1]['id']) if len(rows) > limit else None
+        return items, next_cursor
+
+    @staticmethod
+    def _id_range(conn, since, until):
+        """
+        Ids bounding a created_at range: one created_at index probe per bound
+        """
+        low = high = None
+        if since is not None:
+            row = conn.execute(
+                "SELECT id FROM generations WHERE created_at >= ? ORDER BY created_at LIMIT 1", (since,)
+            ).fetchone()
+            if row is None:
+                return 0, -1
+            low = row['id']
+        if until is not None:
+            row = conn.execute(
+                "SELECT id FROM generations WHERE created_at < ? ORDER BY created_at DESC LIMIT 1", (until,)
+            ).fetchone()
+            if row is None:
+                return 0, -1
+            high = row['id']
+        return low, high
+
+    def stats(self):
+        with connect(self.db_path) as conn:
+            row = conn.execute("""
+                SELECT COUNT(*) AS generations,
+                       COALESCE(SUM(model_url IS NOT NULL), 0) AS converted
+                FROM generations
+            """).fetchone()
+        return dict(row, search='fts5' if self.fts else 'like')
+
+    @staticmethod
+    def _to_dict(row):
+        item = dict(row)
+        item.pop('id')
+        item['cached'] = bool(item['cached'])
+        return item
@@ -0,0 +1,171 @@
+"""
+Pooled keep-alive HTTP clients for upstream APIs
+- One requests.Session per upstream host, reused across calls and threads
+- Configurable connection pool size, timeouts and retry policy per host
+- Optional rate limiting per endpoint class, with 429 / Retry-After handling
+- Optional circuit breaker so a degraded upstream fails fast
+"""
+
+import logging
+import os
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from metrics import Counter, Histogram
+from rate_limit import parse_retry_after
+
+
+log = logging.getLogger(__name__)
+
+UPSTREAM_RESPONSES = Counter(
+    'upstream_responses_total',
+    'Upstream HTTP responses by status code (code="error" for connection failures and timeouts)',
+    ['upstream', 'code']
+)
+UPSTREAM_SECONDS = Histogram(
+    'upstream_request_seconds',
+    'Upstream call latency until the response headers arrived',
+    ['upstream']
+)
+
+
+class UpstreamClient:
+    """
+    Thin wrapper around a pooled requests.Session for a single upstream.
+
+    Paths are resolved against base_url; absolute URLs (e.g. signed asset
+    links on a CDN) are passed through and still reuse the pool.
+
+    With a rate_limiter, calls tagged with rate_class wait for a slot on the
+    "<name>:<rate_class>" bucket, and a 429 reply pauses that bucket for the
+    upstream's Retry-After and re-queues the call (up to max_throttle_retries).
+
+    With a circuit_breaker, every call is checked against it first (raising
+    circuit_breaker.CircuitOpenError while open) and its outcome recorded.
+    """
+
+    def __init__(self, name, base_url=None, pool_size=10, timeout=30,
+                 connect_timeout=5, retries=3, backoff_factor=0.5,
+                 retry_statuses=(500, 502, 503, 504), headers=None,
+                 rate_limiter=None, max_throttle_retries=5, circuit_breaker=None):
+        self.name = name
+        self.base_url = base_url.rstrip('/') if base_url else None
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, timeout)
+        self.rate_limiter = rate_limiter
+        self.max_throttle_retries = max_throttle_retries
+        self.circuit_breaker = circuit_breaker
+
+        # Connection errors are retried for every method; read errors and
+        # retryable status codes only for idempotent methods, so a paid
+        # POST (image generation, task creation) is never sent twice
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=retry_statuses,
+            allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=retry
+        )
+
+        self.session = requests.Session()
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        if headers:
+            self.session.headers.update(headers)
+
+    def url(self, path):
+        if path.startswith(('http://', 'https://')) or not self.base_url:
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def request(self, method, path, rate_class=None, rate_limit_wait=None, **kwargs):
+        """
+        Send a request; rate_limit_wait caps the seconds spent waiting for a
+        rate limit slot (default: the limiter's max_wait) before RateLimitTimeout
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        bucket = f"{self.name}:{rate_class or 'default'}"
+
+        for attempt in range(self.max_throttle_retries + 1):
+            if self.rate_limiter:
+                self.rate_limiter.acquire(bucket, timeout=rate_limit_wait)
+
+            response = self._send(method, path, **kwargs)
+            if response.status_code != 429 or attempt == self.max_throttle_retries:
+                return response
+
+            # A 429 means the upstream did not act on the request, so even a
+            # POST can be sent again once the Retry-After has passed
+            delay = parse_retry_after(response.headers.get('Retry-After'), default=2 ** attempt)
+            response.close()
+            log.warning(f"⏳ {self.name} rate limited (429), retrying",
+                        extra={'upstream': self.name, 'retry_in': round(delay, 1)})
+            if not (self.rate_limiter and self.rate_limiter.penalize(bucket, delay)):
+                time.sleep(delay)
+
+        return response
+
+    def _send(self, method, path, **kwargs):
+        if self.circuit_breaker:
+            self.circuit_breaker.before_call()
+
+        started = time.monotonic()
+        response = None
+        try:
+            response = self.session.request(method, self.url(path), **kwargs)
+        except requests.RequestException:
+            UPSTREAM_RESPONSES.inc(upstream=self.name, code='error')
+            raise
+        finally:
+            # Whatever the call raised (a bad URL, a failing body iterator...)
+            # is recorded, so a half-open trial always ends. A 429 means the
+            # upstream is up and answering, just busy.
+            if self.circuit_breaker:
+                self.circuit_breaker.record(response is not None and response.status_code < 500,
+                                            time.monotonic() - started)
+
+        elapsed = time.monotonic() - started
+        UPSTREAM_RESPONSES.inc(upstream=self.name, code=response.status_code)
+        UPSTREAM_SECONDS.observe(elapsed, upstream=self.name)
+        return response
+
+    def get(self, path, **kwargs):
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.request('POST', path, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+def client_from_env(name, base_url=None, pool_size=10, timeout=30, retries=3,
+                    rate_limiter=None, circuit_breaker=None, client_class=UpstreamClient):
+    """
+    Build an UpstreamClient (or client_class, e.g. async_clients.AsyncUpstreamClient)
+    whose settings can be overridden with <NAME>_POOL_SIZE, <NAME>_TIMEOUT,
+    <NAME>_CONNECT_TIMEOUT and <NAME>_RETRIES
+    """
+    prefix = name.upper()
+    return client_class(
+        name,
+        base_url,
+        pool_size=int(os.getenv(f"{prefix}_POOL_SIZE", pool_size)),
+        timeout=float(os.getenv(f"{prefix}_TIMEOUT", timeout)),
+        connect_timeout=float(os.getenv(f"{prefix}_CONNECT_TIMEOUT", 5)),
+        retries=int(os.getenv(f"{prefix}_RETRIES", retries)),
+        rate_limiter=rate_limiter,
+        circuit_breaker=circuit_breaker
+    )
@@ -0,0 +1,112 @@
+"""
+Content-addressed prompt -> image cache
+- Keyed on the normalized prompt plus generation parameters (model, size, quality)
+- Persistent SQLite index with TTL expiry and LRU eviction
+"""
+
+import hashlib
+import json
+import os
+import time
+
+from db import connect
+
+
+def normalize_prompt(prompt):
+    return ' '.join(prompt.split()).casefold()
+
+
+def cache_key(prompt, **params):
+    material = json.dumps(
+        {'prompt': normalize_prompt(prompt), 'params': params},
+        sort_keys=True
+    )
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class PromptImageCache:
+    """
+    Maps (prompt, params) to an already generated image on disk.
+    Evicting an entry only forgets it; the image file itself is left alone.
+    """
+
+    def __init__(self, db_path, ttl=7 * 24 * 3600, max_entries=5000):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        with connect(self.db_path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS image_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    prompt TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    image_url TEXT NOT NULL,
+                    image_path TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS image_cache_lru ON image_cache (last_access)"
+            )
+
+    def get(self, prompt, **params):
+        """
+        Return {'image_url', 'image_path', 'created_at'} for a live entry, or None
+        """
+        key = cache_key(prompt, **params)
+        now = time.time()
+
+        with connect(self.db_path) as conn:
+            row = conn.execute(
+                "SELECT image_url, image_path, created_at FROM image_cache WHERE cache_key = ?",
+                (key,)
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            if row['created_at'] + self.ttl <= now or not os.path.isfile(row['image_path']):
+                conn.execute("DELETE FROM image_cache WHERE cache_key = ?", (key,))
+                return None
+
+            conn.execute(
+                "UPDATE image_cache SET last_access = ?, hits = hits + 1 WHERE cache_key = ?",
+                (now, key)
+            )
+
+        return dict(row)
+
+    def put(self, prompt, image_url, image_path, **params):
+        now = time.time()
+        with connect(self.db_path) as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO image_cache
+                    (cache_key, prompt, params, image_url, image_path, created_at, last_access, hits)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 0)
+                """,
+                (cache_key(prompt, **params), prompt, json.dumps(params, sort_keys=True),
+                 image_url, image_path, now, now)
+            )
+            self._evict(conn, now)
+
+    def stats(self):
+        with connect(self.db_path) as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) AS entries, COALESCE(SUM(hits), 0) AS hits FROM image_cache"
+            ).fetchone()
+        return dict(row)
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM image_cache WHERE created_at <= ?", (now - self.ttl,))
+        conn.execute(
+            """
+            DELETE FROM image_cache WHERE cache_key IN (
+                SELECT cache_key FROM image_cache
+                ORDER BY last_access DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_entries,)
+        )
@@ -0,0 +1,180 @@
+"""
+Image derivatives and texture recompression
+- Thumbnails and WebP copies of generated images, keyed by the source's content hash
+- Downscaling / recompression of GLB textures
+- Pillow is optional: without it originals are served and textures left alone
+"""
+
+import io
+import logging
+import os
+import threading
+
+from model_cache import file_sha256
+
+try:
+    from PIL import Image, features
+except ImportError:
+    Image = None
+    features = None
+
+
+log = logging.getLogger(__name__)
+
+
+FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+    'png': ('PNG', 'image/png')
+}
+
+
+def pillow_available():
+    return Image is not None
+
+
+def webp_supported():
+    return Image is not None and features.check('webp')
+
+
+def _has_alpha(image):
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        alpha = image.convert('RGBA').getchannel('A')
+        return alpha.getextrema()[0] < 255
+    return False
+
+
+def _encode(image, format_name, quality):
+    pillow_format, _ = FORMATS[format_name]
+    if pillow_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    output = io.BytesIO()
+    if pillow_format == 'PNG':
+        image.save(output, pillow_format, optimize=True)
+    elif pillow_format == 'WEBP':
+        image.save(output, pillow_format, quality=quality, method=4)
+    else:
+        image.save(output, pillow_format, quality=quality, optimize=True, progressive=True)
+    return output.getvalue()
+
+
+class DerivativeStore:
+    """
+    Resized / re-encoded copies of images under folder/<hash[:2]>/<hash>/<width>.<format>.
+    Width 0 means full size. Because the key is the content hash, an image
+    that is saved again (or reused from the prompt cache) shares its derivatives.
+    """
+
+    def __init__(self, folder, widths=(256, 512), quality=80):
+        self.folder = folder
+        self.widths = sorted(widths)
+        self.quality = quality
+        self._hashes = {}
+        self._lock = threading.Lock()
+
+    @property
+    def available(self):
+        return pillow_available()
+
+    def formats(self):
+        return ['webp', 'jpeg'] if webp_supported() else ['jpeg']
+
+    def pick_width(self, requested):
+        """
+        Smallest configured width that covers the request; 0 (full size) if none does
+        """
+        for width in self.widths:
+            if requested and width >= requested:
+                return width
+        return 0
+
+    def content_hash(self, source_path, sha256=None):
+        """
+        SHA-256 of the source, remembered per (path, mtime) so it is read once
+        """
+        key = (os.path.abspath(source_path), os.path.getmtime(source_path))
+        with self._lock:
+            sha256 = sha256 or self._hashes.get(key)
+        if sha256 is None:
+            sha256 = file_sha256(source_path)
+        with self._lock:
+            if len(self._hashes) >= 10000:
+                self._hashes.clear()
+            self._hashes[key] = sha256
+        return sha256
+
+    def path_for(self, sha256, width, format_name):
+        return os.path.join(self.folder, sha256[:2], sha256, f"{width}.{format_name}")
+
+    def get(self, source_path, width, format_name, sha256=None):
+        """
+        Path of the derivative, creating it on first use. Returns None without Pillow.
+        """
+        if not self.available:
+            return None
+
+        path = self.path_for(self.content_hash(source_path, sha256), width, format_name)
+        if not os.path.isfile(path):
+            with Image.open(source_path) as image:
+                self._write(image, path, width, format_name)
+        return path
+
+    def create_all(self, source_path, sha256=None):
+        """
+        Pre-render every configured width in every supported format (plus a
+        full-size WebP). Returns {(width, format): path}.
+        """
+        if not self.available:
+            return {}
+
+        sha256 = self.content_hash(source_path, sha256)
+        variants = [(width, format_name) for width in self.widths for format_name in self.formats()]
+        if webp_supported():
+            variants.append((0, 'webp'))
+
+        created = {}
+        with Image.open(source_path) as image:
+            image.load()
+            for width, format_name in variants:
+                path = self.path_for(sha256, width, format_name)
+                if not os.path.isfile(path):
+                    self._write(image, path, width, format_name)
+                created[(width, format_name)] = path
+        return created
+
+    def _write(self, image, path, width, format_name):
+        if width and image.width > width:
+            image = image.copy()
+            image.thumbnail((width, image.height), Image.LANCZOS)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{threading.get_ident()}.part"
+        with open(temp_path, 'wb') as f:
+            f.write(_encode(image, format_name, self.quality))
+        os.replace(temp_path, path)
+
+
+def recompress_texture(data, mime_type, max_size=None, quality=85, lossless=False):
+    """
+    Downscale a texture to max_size on its longest side and re-encode it as
+    JPEG (opaque) or optimized PNG (with alpha, or lossless=True for data
+    textures such as normal maps). Returns (data, mime_type); the input is
+    returned unchanged if Pillow is missing or nothing got smaller.
+    """
+    if not pillow_available():
+        return data, mime_type
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            image.load()
+            if max_size and max(image.size) > max_size:
+                image.thumbnail((max_size, max_size), Image.LANCZOS)
+            format_name = 'png' if lossless or _has_alpha(image) else 'jpeg'
+            encoded = _encode(image, format_name, quality)
+    except (OSError, ValueError) as e:
+        log.warning(f"⚠️ Texture left as-is, could not be decoded: {e}")
+        return data, mime_type
+
+    if len(encoded) >= len(data):
+        return data, mime_type
+    return encoded, FORMATS[format_name][1]
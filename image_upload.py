@@ -0,0 +1,125 @@
+"""
+Image hand-off to Meshy without the base64 round trip
+- Remembers the upstream (DALL-E) URL of each saved image while it is still valid
+- Falls back to a JSON body that base64-encodes the file on the fly,
+  so raw bytes, base64 text and JSON are never all held in memory
+"""
+
+import base64
+import json
+import mimetypes
+import os
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlparse, parse_qs
+
+
+# Read size for the streamed encoder; a multiple of 3 so every chunk
+# encodes to base64 without padding
+ENCODE_CHUNK_SIZE = 3 * 16 * 1024
+
+
+def _url_expiry(url, default_ttl):
+    """
+    Best-effort expiry time of a signed URL (Azure SAS 'se' or S3 'X-Amz-Expires')
+    """
+    query = parse_qs(urlparse(url).query)
+
+    signed_expiry = query.get('se')
+    if signed_expiry:
+        try:
+            return datetime.fromisoformat(signed_expiry[0].replace('Z', '+00:00')).timestamp()
+        except ValueError:
+            pass
+
+    amz_date, amz_expires = query.get('X-Amz-Date'), query.get('X-Amz-Expires')
+    if amz_date and amz_expires:
+        try:
+            signed_at = datetime.strptime(amz_date[0] + '+0000', '%Y%m%dT%H%M%SZ%z')
+            return signed_at.timestamp() + int(amz_expires[0])
+        except ValueError:
+            pass
+
+    return time.time() + default_ttl
+
+
+class SourceUrlRegistry:
+    """
+    Maps local image paths to the remote URL they were downloaded from,
+    for as long as that URL can still be fetched by a third party
+    """
+
+    def __init__(self, default_ttl=3600, safety_margin=300, max_entries=10000):
+        self.default_ttl = default_ttl
+        self.safety_margin = safety_margin
+        self.max_entries = max_entries
+        self._sources = {}
+        self._lock = threading.Lock()
+
+    def remember(self, image_path, url):
+        expires_at = _url_expiry(url, self.default_ttl)
+        with self._lock:
+            if len(self._sources) >= self.max_entries:
+                self._drop_expired()
+            if len(self._sources) >= self.max_entries:
+                # Still full: drop the oldest entry (dicts keep insertion order)
+                self._sources.pop(next(iter(self._sources)))
+            self._sources[os.path.normpath(image_path)] = (url, expires_at)
+
+    def lookup(self, image_path):
+        """
+        Return the remembered URL if it stays valid for at least safety_margin seconds
+        """
+        with self._lock:
+            entry = self._sources.get(os.path.normpath(image_path))
+        if not entry:
+            return None
+
+        url, expires_at = entry
+        if expires_at - self.safety_margin <= time.time():
+            return None
+        return url
+
+    def _drop_expired(self):
+        now = time.time()
+        for path in [p for p, (_, expires_at) in self._sources.items() if expires_at <= now]:
+            del self._sources[path]
+
+
+class Base64JsonBody:
+    """
+    Iterable request body: a JSON object whose image field is a base64 data
+    URL streamed from disk. Exposes __len__ so requests sends Content-Length
+    instead of chunked encoding, and can be iterated again on retry.
+    encode_seconds is the time the last pass spent reading and encoding the file.
+    """
+
+    def __init__(self, fields, image_field, image_path, chunk_size=ENCODE_CHUNK_SIZE):
+        self.image_path = image_path
+        self.chunk_size = chunk_size - chunk_size % 3
+
+        mime_type = mimetypes.guess_type(image_path)[0] or 'image/png'
+        head = json.dumps(fields)[:-1]
+        separator = ', ' if fields else ''
+        self._prefix = f'{head}{separator}"{image_field}": "data:{mime_type};base64,'.encode('utf-8')
+        self._suffix = b'"}'
+        self.encode_seconds = 0.0
+
+    def __len__(self):
+        size = os.path.getsize(self.image_path)
+        return len(self._prefix) + 4 * ((size + 2) // 3) + len(self._suffix)
+
+    def __iter__(self):
+        self.encode_seconds = 0.0
+        yield self._prefix
+        with open(self.image_path, 'rb') as f:
+            while True:
+                started = time.perf_counter()
+                chunk = f.read(self.chunk_size)
+                encoded = base64.b64encode(chunk) if chunk else None
+                self.encode_seconds += time.perf_counter() - started
+                if not chunk:
+                    break
+                yield encoded
+        yield self._suffix
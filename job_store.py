@@ -0,0 +1,297 @@
+"""
+Durable SQLite job table, shared by every server process on the data folder
+- Every job state change is written through, so a restart loses nothing
+- Each row names the worker running it; workers heartbeat their rows and take
+  over the jobs of a worker that went silent (its lease ran out). Only the
+  owner's saves are written, so a worker that lost a job can't take it back.
+- An optional dedupe key keeps two workers from starting the same job
+- Upstream task statuses received by one worker (webhooks) are left on the
+  row for the worker running the job to pick up
+- QueuedJobStore moves the writes off an asyncio event loop
+"""
+
+import json
+import logging
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from db import connect
+
+
+log = logging.getLogger(__name__)
+
+_ACTIVE = "status IN ('queued', 'running')"
+
+
+def worker_id():
+    """
+    Name of this process in the job table: host, pid and a random part, as
+    pids are reused and a restarted server must not take old rows for its own
+    """
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class JobStore:
+    """
+    Persists job dicts as produced by jobs.Job.to_dict(). Rows saved through
+    this store are owned by `owner` (a worker_id()) until another worker
+    claims them.
+    """
+
+    def __init__(self, db_path, owner=None):
+        self.db_path = db_path
+        self.owner = owner or worker_id()
+        with connect(self.db_path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    progress INTEGER NOT NULL DEFAULT 0,
+                    task_id TEXT,
+                    params TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    created_at TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+            # Tables written before jobs were shared between processes lack these
+            columns = {row['name'] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column, definition in (('owner', 'TEXT'), ('heartbeat', 'REAL'), ('dedupe_key', 'TEXT'),
+                                       ('pushed_status', 'TEXT')):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {definition}")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_task_id ON jobs (task_id)")
+            conn.execute(f"""
+                CREATE UNIQUE INDEX IF NOT EXISTS jobs_active_dedupe ON jobs (dedupe_key)
+                WHERE dedupe_key IS NOT NULL AND {_ACTIVE}
+            """)
+
+    def create(self, job_data, dedupe_key=None):
+        """
+        Insert a new job. If an unfinished job with the same dedupe_key
+        exists (in any process), nothing is written and that job is returned;
+        otherwise returns None.
+        """
+        for _ in range(3):
+            try:
+                with connect(self.db_path) as conn:
+                    conn.execute(
+                        """
+                        INSERT INTO jobs
+                            (job_id, kind, status, progress, task_id, params, result, error,
+                             created_at, updated_at, owner, heartbeat, dedupe_key)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        """,
+                        (*self._row(job_data), dedupe_key)
+                    )
+                return None
+            except sqlite3.IntegrityError:
+                if dedupe_key is None:
+                    raise
+                with connect(self.db_path) as conn:
+                    row = conn.execute(
+                        f"SELECT * FROM jobs WHERE dedupe_key = ? AND {_ACTIVE}", (dedupe_key,)
+                    ).fetchone()
+                # The other job may have finished in between; then try again
+                if row:
+                    return self._to_dict(row)
+        raise RuntimeError(f"Could not create job {job_data['job_id']}")
+
+    def save(self, job_data):
+        """
+        Write a job's state. Returns False (and writes nothing) if another
+        worker has claimed the job since: this one lost its lease and must stop.
+        """
+        with connect(self.db_path) as conn:
+            cursor = conn.execute(
+                """
+                INSERT INTO jobs
+                    (job_id, kind, status, progress, task_id, params, result, error,
+                     created_at, updated_at, owner, heartbeat)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (job_id) DO UPDATE SET
+                    status = excluded.status,
+                    progress = excluded.progress,
+                    task_id = excluded.task_id,
+                    result = excluded.result,
+                    error = excluded.error,
+                    updated_at = excluded.updated_at,
+                    owner = excluded.owner,
+                    heartbeat = excluded.heartbeat
+                WHERE jobs.owner = excluded.owner OR jobs.owner IS NULL
+                """,
+                self._row(job_data)
+            )
+            return cursor.rowcount > 0
+
+    def get(self, job_id):
+        with connect(self.db_path) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def unfinished(self, kind=None):
+        """
+        Jobs that are queued or running in any process, oldest first
+        """
+        query = f"SELECT * FROM jobs WHERE {_ACTIVE}"
+        args = ()
+        if kind:
+            query += " AND kind = ?"
+            args = (kind,)
+        query += " ORDER BY created_at"
+
+        with connect(self.db_path) as conn:
+            rows = conn.execute(query, args).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def heartbeat(self):
+        """
+        Renew the lease on every unfinished job this worker owns; returns how many
+        """
+        with connect(self.db_path) as conn:
+            cursor = conn.execute(
+                f"UPDATE jobs SET heartbeat = ? WHERE owner = ? AND {_ACTIVE}",
+                (time.time(), self.owner)
+            )
+            return cursor.rowcount
+
+    def claim(self, kind=None, stale_after=0):
+        """
+        Take over unfinished jobs of other workers whose last heartbeat is
+        more than stale_after seconds old (0: all of them, e.g. at startup of
+        the only server process). With a lease (stale_after > 0) each job is
+        handed to exactly one claimant; 0 takes rows from live workers too,
+        including one that has just claimed them.
+        Returns the claimed jobs, oldest first.
+        """
+        now = time.time()
+        query = f"""
+            UPDATE jobs SET owner = ?, heartbeat = ?
+            WHERE {_ACTIVE} AND (owner IS NULL OR owner != ?) AND COALESCE(heartbeat, 0) < ?
+        """
+        args = [self.owner, now, self.owner, now - stale_after]
+        if kind:
+            query += " AND kind = ?"
+            args.append(kind)
+        query += " RETURNING *"
+
+        with connect(self.db_path) as conn:
+            rows = conn.execute(query, args).fetchall()
+        return sorted((self._to_dict(row) for row in rows), key=lambda job_data: job_data['created_at'])
+
+    def push_status(self, task_id, status_data):
+        """
+        Leave an upstream status for the unfinished job(s) working on task_id,
+        for whichever worker runs them; returns how many jobs that was
+        """
+        with connect(self.db_path) as conn:
+            cursor = conn.execute(
+                f"UPDATE jobs SET pushed_status = ? WHERE task_id = ? AND {_ACTIVE}",
+                (json.dumps(status_data), task_id)
+            )
+            return cursor.rowcount
+
+    def take_pushed(self):
+        """
+        Collect (task_id, status_data) left for this worker's jobs, clearing them
+        """
+        with connect(self.db_path) as conn:
+            # Read and clear in one write transaction, so no push lands in between
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                "SELECT job_id, task_id, pushed_status FROM jobs WHERE owner = ? AND pushed_status IS NOT NULL",
+                (self.owner,)
+            ).fetchall()
+            conn.executemany("UPDATE jobs SET pushed_status = NULL WHERE job_id = ?", [(row['job_id'],) for row in rows])
+        return [(row['task_id'], json.loads(row['pushed_status'])) for row in rows]
+
+    def _row(self, job_data):
+        return (
+            job_data['job_id'],
+            job_data['kind'],
+            job_data['status'],
+            job_data['progress'],
+            job_data['task_id'],
+            json.dumps(job_data['params']),
+            json.dumps(job_data['result']) if job_data['result'] is not None else None,
+            job_data['error'],
+            job_data['created_at'],
+            job_data['updated_at'],
+            self.owner,
+            time.time()
+        )
+
+    @staticmethod
+    def _to_dict(row):
+        job_data = dict(row)
+        job_data.pop('pushed_status', None)
+        job_data['params'] = json.loads(job_data['params'])
+        job_data['result'] = json.loads(job_data['result']) if job_data['result'] else None
+        return job_data
+
+
+class QueuedJobStore:
+    """
+    Write-behind front for a JobStore, for jobs updated on an event loop:
+    save() hands the row to one background thread, so writes keep their
+    order without blocking the caller. Reads, create() and the lease calls
+    go straight to the store (create() has to answer before the job starts).
+    A lost lease is found by a background write, so save() reports it for
+    the job's next change.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='job-store')
+        self._lost = set()
+
+    @property
+    def owner(self):
+        return self.store.owner
+
+    def create(self, job_data, dedupe_key=None):
+        return self.store.create(job_data, dedupe_key)
+
+    def save(self, job_data):
+        if job_data['job_id'] in self._lost:
+            return False
+        self._executor.submit(self._save, job_data)
+        return True
+
+    def _save(self, job_data):
+        try:
+            if not self.store.save(job_data):
+                self._lost.add(job_data['job_id'])
+        except Exception as e:
+            log.error(f"❌ Could not persist job: {e}", extra={'job_id': job_data['job_id']})
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def unfinished(self, kind=None):
+        return self.store.unfinished(kind)
+
+    def heartbeat(self):
+        return self.store.heartbeat()
+
+    def claim(self, kind=None, stale_after=0):
+        return self.store.claim(kind, stale_after)
+
+    def push_status(self, task_id, status_data):
+        return self.store.push_status(task_id, status_data)
+
+    def take_pushed(self):
+        return self.store.take_pushed()
+
+    def flush(self, timeout=None):
+        """
+        Wait until every queued write has reached the database
+        """
+        self._executor.submit(lambda: None).result(timeout)
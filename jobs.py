@@ -0,0 +1,373 @@
+"""
+Background job queue for long-running conversions
+- Bounded worker pool so API requests return a job id immediately
+- Thread-safe in-memory registry for job status lookups
+- Optional durable store (see job_store.py) so jobs survive a restart
+  and other processes can report on them
+- AsyncJobQueue: the same registry running jobs as asyncio tasks
+"""
+
+import asyncio
+import inspect
+import logging
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+
+
+log = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when too many jobs are already waiting for a worker"""
+
+
+class LeaseLostError(Exception):
+    """Raised when another worker has taken over a job this process was running"""
+
+    def __init__(self, job_id):
+        super().__init__(f"Job {job_id} was taken over by another worker")
+        self.job_id = job_id
+
+
+class DuplicateJobError(Exception):
+    """Raised when an unfinished job with the same dedupe key exists (job_data: that job)"""
+
+    def __init__(self, job_data):
+        super().__init__(f"Job {job_data['job_id']} is already doing this")
+        self.job_data = job_data
+
+
+class Job:
+    """
+    A single unit of background work and its observable state
+    """
+
+    def __init__(self, kind, params=None, store=None):
+        self.id = str(uuid.uuid4())
+        self.kind = kind
+        self.params = params or {}
+        self.status = 'queued'
+        self.progress = 0
+        self.task_id = None  # id of the upstream task doing the work, once known
+        self.result = None
+        self.error = None
+        self.created_at = datetime.now().isoformat()
+        self.updated_at = self.created_at
+        self.version = 0  # bumped on every change, for watchers
+        self.lost = False  # the store gave the job to another worker
+        self._store = store
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._done = threading.Event()
+        self._callbacks = []
+
+    @classmethod
+    def from_dict(cls, job_data, store=None):
+        """
+        Rebuild a job from its to_dict() form (e.g. a row from the job store)
+        """
+        job = cls(job_data['kind'], job_data['params'], store)
+        job.id = job_data['job_id']
+        for key in ('status', 'progress', 'task_id', 'result', 'error', 'created_at', 'updated_at'):
+            setattr(job, key, job_data[key])
+        if job.finished:
+            job._done.set()
+        return job
+
+    def update(self, **fields):
+        """
+        Change the job's state (and store it). Raises LeaseLostError once the
+        store reports that another worker has claimed the job.
+        """
+        with self._lock:
+            self.check_lease()
+            for key, value in fields.items():
+                setattr(self, key, value)
+            self.updated_at = datetime.now().isoformat()
+            self.version += 1
+            # Written under the lock so snapshots reach the store in order
+            if self._store and self._store.save(self._snapshot()) is False:
+                self.lost = True
+            self._changed.notify_all()
+            self.check_lease()
+
+    def check_lease(self):
+        """
+        Raise LeaseLostError if another worker has taken the job over, e.g.
+        before paying for more work on it
+        """
+        if self.lost:
+            raise LeaseLostError(self.id)
+
+    def succeed(self, result):
+        self.update(status='succeeded', progress=100, result=result)
+        self._notify_done()
+
+    def fail(self, error):
+        self.update(status='failed', error=str(error))
+        self._notify_done()
+
+    def add_done_callback(self, fn):
+        """
+        Call fn(job) once the job finishes (immediately if it already has)
+        """
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    def watch(self, since_version, timeout=None):
+        """
+        Block until the job changes after since_version (or timeout).
+        Returns (version, snapshot); version == since_version means nothing changed.
+        """
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != since_version, timeout)
+            return self.version, self._snapshot()
+
+    def wait(self, timeout=None):
+        """
+        Block until the job finishes; returns False on timeout
+        """
+        return self._done.wait(timeout)
+
+    def _notify_done(self):
+        with self._lock:
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception as e:
+                log.warning(f"⚠️ Job callback failed: {e}", extra={'job_id': self.id})
+
+    @property
+    def finished(self):
+        return self.status in ('succeeded', 'failed')
+
+    def to_dict(self):
+        with self._lock:
+            return self._snapshot()
+
+    def _snapshot(self):
+        return {
+            'job_id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'progress': self.progress,
+            'task_id': self.task_id,
+            'result': self.result,
+            'error': self.error,
+            'params': self.params,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at
+        }
+
+
+class JobQueue:
+    """
+    Runs jobs on a fixed-size thread pool and keeps them addressable by id
+    """
+
+    def __init__(self, max_workers=4, max_pending=500, retain_finished=1000, store=None):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.retain_finished = retain_finished
+        self.store = store
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='job-worker'
+        )
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind, fn, *args, params=None, dedupe_key=None, **kwargs):
+        """
+        Register a job and schedule fn(job, *args, **kwargs) on the pool.
+        The return value of fn becomes the job result. If fn returns a
+        Future instead, the job stays running until that Future settles,
+        without holding a worker thread in the meantime.
+        With a store, a dedupe_key raises DuplicateJobError while an
+        unfinished job with the same key exists, even in another process.
+        """
+        with self._lock:
+            if self._pending_count() >= self.max_pending:
+                raise QueueFullError(
+                    f"Job queue is full ({self.max_pending} pending jobs)"
+                )
+            self._prune_finished()
+            job = Job(kind, params, self.store)
+            self._jobs[job.id] = job
+
+        if self.store:
+            existing = self.store.create(job.to_dict(), dedupe_key)
+            if existing:
+                with self._lock:
+                    del self._jobs[job.id]
+                raise DuplicateJobError(existing)
+
+        self._start(job, fn, args, kwargs)
+        return job
+
+    def restore(self, job_data, fn, *args, **kwargs):
+        """
+        Re-register an unfinished job from the store under its original id
+        and schedule fn(job, *args, **kwargs) to pick it up again
+        """
+        job = Job.from_dict(job_data, self.store)
+        with self._lock:
+            self._jobs[job.id] = job
+
+        self._start(job, fn, args, kwargs)
+        return job
+
+    def then(self, future, fn):
+        """
+        Run fn(result) on the pool once future resolves; returns a new Future
+        """
+        chained = Future()
+
+        def run_next(result):
+            try:
+                chained.set_result(fn(result))
+            except Exception as e:
+                chained.set_exception(e)
+
+        def on_done(done):
+            error = done.exception()
+            if error is not None:
+                chained.set_exception(error)
+            else:
+                self._executor.submit(run_next, done.result())
+
+        future.add_done_callback(on_done)
+        return chained
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None and self.store:
+            # Pruned from memory or started by an earlier process
+            job_data = self.store.get(job_id)
+            if job_data:
+                job = Job.from_dict(job_data)
+        return job
+
+    def is_local(self, job_id):
+        """
+        Whether this process holds the job (rather than only finding it in the store)
+        """
+        with self._lock:
+            return job_id in self._jobs
+
+    def stats(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        counts = {}
+        for job in jobs:
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            'workers': self.max_workers,
+            'max_pending': self.max_pending,
+            'jobs': counts
+        }
+
+    def _pending_count(self):
+        return sum(1 for job in self._jobs.values() if not job.finished)
+
+    def _prune_finished(self):
+        # Jobs are stored in submission order, so the first finished ones are the oldest
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.retain_finished)]:
+            del self._jobs[job_id]
+
+    def _start(self, job, fn, args, kwargs):
+        self._executor.submit(self._run, job, fn, args, kwargs)
+
+    def _run(self, job, fn, args, kwargs):
+        try:
+            job.update(status='running')
+            result = fn(job, *args, **kwargs)
+        except Exception as e:
+            self._conclude(job, error=e)
+            return
+
+        if isinstance(result, Future):
+            result.add_done_callback(lambda done: self._settle(job, done))
+        else:
+            self._conclude(job, result=result)
+
+    def _settle(self, job, future):
+        error = future.exception()
+        self._conclude(job, result=None if error is not None else future.result(), error=error)
+
+    def _conclude(self, job, result=None, error=None):
+        try:
+            if isinstance(error, LeaseLostError):
+                raise error
+            if error is not None:
+                job.fail(error)
+            else:
+                job.succeed(result)
+        except LeaseLostError:
+            # The worker that claimed the job finishes it; lookups here go to the store
+            log.warning("⚠️ Job taken over by another worker, dropping it", extra={'job_id': job.id})
+            with self._lock:
+                self._jobs.pop(job.id, None)
+            job._notify_done()
+
+
+class AsyncJobQueue(JobQueue):
+    """
+    JobQueue for an asyncio event loop. Each job is a task running the
+    coroutine function fn(job, *args, **kwargs); at most max_workers of
+    them are in an active phase at once, the rest stay 'queued'.
+
+    As with JobQueue, fn may return an awaitable (e.g. from then()) to
+    keep the job running without holding a worker slot while it waits.
+    submit(), restore() and then() must be called from the loop.
+    """
+
+    def __init__(self, max_workers=4, max_pending=500, retain_finished=1000, store=None):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.retain_finished = retain_finished
+        self.store = store
+        self._slots = asyncio.Semaphore(max_workers)
+        self._tasks = set()
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def then(self, awaitable, fn):
+        """
+        Await awaitable, then run the coroutine function fn(result) in a worker slot
+        """
+        async def chained():
+            # Shielded so a cancelled job doesn't cancel a result others share
+            result = await asyncio.shield(awaitable)
+            async with self._slots:
+                return await fn(result)
+
+        return chained()
+
+    def _start(self, job, fn, args, kwargs):
+        task = asyncio.create_task(self._run(job, fn, args, kwargs), name=f"job-{job.id}")
+        # The loop only keeps weak references to tasks
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, job, fn, args, kwargs):
+        try:
+            async with self._slots:
+                job.update(status='running')
+                result = await fn(job, *args, **kwargs)
+
+            if inspect.isawaitable(result):
+                result = await result
+        except Exception as e:
+            self._conclude(job, error=e)
+            return
+
+        self._conclude(job, result=result)
@@ -0,0 +1,75 @@
+"""
+Structured, level-controlled logging
+- LOG_LEVEL picks what is written (DEBUG adds per-poll Meshy status lines)
+- LOG_FORMAT=json writes one JSON object per line for log shippers; text stays readable
+- Fields passed with extra={...} are kept as key=value pairs / JSON keys
+"""
+
+import json
+import logging
+import sys
+from datetime import datetime
+
+
+# Attributes every LogRecord has; anything else on a record came from extra={...}
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+
+# The handler configure_logging() added last
+_handler = None
+
+
+def record_fields(record):
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            **record_fields(record)
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        line = f"{self.formatTime(record)} {record.levelname:<7} {record.getMessage()}"
+        fields = record_fields(record)
+        if fields:
+            line += '  ' + ' '.join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_info:
+            line += '\n' + self.formatException(record.exc_info)
+        return line
+
+
+def configure_logging(level='INFO', log_format='text', stream=None, replace=False):
+    """
+    Send all log records (ours and the libraries') to a handler on stdout.
+    Handlers installed by others (gunicorn, pytest's log capture) are kept
+    unless replace is set; calling this again swaps the handler it added.
+    """
+    global _handler
+
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(JsonFormatter() if log_format == 'json' else TextFormatter())
+
+    root = logging.getLogger()
+    if replace:
+        root.handlers[:] = [handler]
+    else:
+        if _handler is not None:
+            root.removeHandler(_handler)
+        root.addHandler(handler)
+    _handler = handler
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+
+    # Pillow logs every decoded chunk at DEBUG; werkzeug would force its
+    # per-request access log to INFO whatever the root level is
+    logging.getLogger('PIL').setLevel(max(root.level, logging.INFO))
+    logging.getLogger('werkzeug').setLevel(root.level)
@@ -0,0 +1,295 @@
+"""
+Shared status poller for in-flight Meshy tasks
+- One background thread tracks every outstanding task id and hands due
+  status fetches to a small bounded pool, so a slow fetch never holds up
+  the schedule for every other task
+- Poll interval adapts to the reported progress (slow early, fast near 100%)
+- Jitter spreads polls out so tasks started together don't poll together
+- Statuses pushed by Meshy (webhooks) settle a task at once; polling then
+  only has to catch lost callbacks
+- AsyncMeshyPoller: the same schedule as one small coroutine per task, for the asyncio backend
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from metrics import Histogram
+
+
+log = logging.getLogger(__name__)
+
+TASK_SECONDS = Histogram(
+    'meshy_task_seconds',
+    'Time from tracking a Meshy task until its final status (time-to-SUCCEEDED for outcome="succeeded")',
+    ['outcome']
+)
+
+
+class MeshyTaskError(Exception):
+    """Raised when a Meshy task ends in a non-successful state"""
+
+
+class _TrackedTask:
+    def __init__(self, task_id, timeout):
+        self.task_id = task_id
+        self.progress_callbacks = []
+        self.timeout = timeout
+        self.started = time.monotonic()
+        self.deadline = self.started + timeout
+        self.future = Future()
+        self.progress = 0
+        self.failures = 0
+
+
+class MeshyPoller:
+    """
+    Schedules Meshy status polls for all tracked tasks from a single thread;
+    the fetches themselves run on up to fetch_workers pool threads and each
+    task is rescheduled when its fetch completes.
+
+    fetch_status(task_id) must return the decoded status JSON or raise; it
+    should fail fast rather than wait out rate limits, since a failed fetch
+    just backs off to a later poll.
+    track() returns a Future that resolves with the final status JSON once
+    the task SUCCEEDED, or fails with MeshyTaskError. push() feeds in a
+    status received some other way (a webhook) as if it had been polled.
+    """
+
+    TERMINAL_FAILURES = ('FAILED', 'CANCELED', 'EXPIRED')
+
+    def __init__(self, fetch_status, min_interval=2.0, max_interval=15.0,
+                 jitter=0.2, timeout=300.0, fetch_workers=4):
+        self.fetch_status = fetch_status
+        self.fetch_workers = fetch_workers
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.timeout = timeout
+        self._schedule = []
+        self._sequence = itertools.count()
+        self._tasks = {}
+        self._condition = threading.Condition()
+        self._thread = None
+        self._executor = None
+        self.polls = 0
+        self.pushes = 0
+
+    def track(self, task_id, on_progress=None, timeout=None):
+        """
+        Start tracking a task; returns a Future for its final status.
+        Tracking a task id that is already tracked shares the same Future.
+        """
+        with self._condition:
+            task = self._tasks.get(task_id)
+            if task is None:
+                task = _TrackedTask(task_id, timeout or self.timeout)
+                self._tasks[task_id] = task
+                self._schedule_poll(task, self._next_interval(0))
+                self._ensure_thread()
+                self._condition.notify()
+            if on_progress:
+                task.progress_callbacks.append(on_progress)
+
+        return task.future
+
+    def push(self, task_id, status_data):
+        """
+        Apply a status pushed by Meshy to a tracked task (settling it if the
+        status is final). Returns False if the task isn't tracked here.
+        """
+        with self._condition:
+            task = self._tasks.get(task_id)
+        if task is None:
+            return False
+
+        self.pushes += 1
+        self._apply_status(task, status_data)
+        return True
+
+    def in_flight(self):
+        with self._condition:
+            return len(self._tasks)
+
+    def _ensure_thread(self):
+        # Started lazily so importing the module (e.g. the Flask reloader
+        # parent process) doesn't spawn a poller that never gets work
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.fetch_workers, thread_name_prefix='meshy-status'
+            )
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name='meshy-poller', daemon=True
+            )
+            self._thread.start()
+
+    def _next_interval(self, progress, failures=0):
+        if failures:
+            base = min(self.max_interval, self.min_interval * (2 ** failures))
+        else:
+            # Linear ramp from max_interval at 0% down to min_interval at 100%
+            fraction = min(max(progress, 0), 100) / 100
+            base = self.max_interval - (self.max_interval - self.min_interval) * fraction
+        return base * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _schedule_poll(self, task, delay):
+        due = min(time.monotonic() + delay, task.deadline)
+        heapq.heappush(self._schedule, (due, next(self._sequence), task.task_id))
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._schedule:
+                    self._condition.wait()
+
+                due, _, task_id = self._schedule[0]
+                wait = due - time.monotonic()
+                if wait > 0:
+                    self._condition.wait(timeout=wait)
+                    continue
+
+                heapq.heappop(self._schedule)
+                task = self._tasks.get(task_id)
+
+            if task is not None:
+                self._poll(task)
+
+    def _poll(self, task):
+        # Only dispatches; the task has no schedule entry until _fetched
+        # puts it back, so it never has two fetches out at once
+        self.polls += 1
+        future = self._executor.submit(self.fetch_status, task.task_id)
+        future.add_done_callback(lambda done: self._fetched(task, done))
+
+    def _fetched(self, task, done):
+        try:
+            status_data = done.result()
+        except Exception as e:
+            self._fetch_failed(task, e)
+            self._reschedule(task)
+            return
+
+        if not self._apply_status(task, status_data):
+            self._reschedule(task)
+
+    def _fetch_failed(self, task, error):
+        task.failures += 1
+        log.warning(f"⚠️ Status check failed: {error}", extra={'task_id': task.task_id, 'failures': task.failures})
+
+    def _apply_status(self, task, status_data):
+        """
+        Report progress from a status reply and settle the task if it is
+        final. Returns True once the task is finished.
+        """
+        if self._tasks.get(task.task_id) is not task:
+            # Already settled, e.g. by a pushed status while this poll was out
+            return True
+
+        task.failures = 0
+        status = status_data.get('status')
+        progress = status_data.get('progress', 0) or 0
+        log.debug("📊 Meshy task status", extra={'task_id': task.task_id, 'status': status, 'progress': progress})
+
+        # Polls and pushes can arrive out of order; progress only moves forward
+        if progress > task.progress:
+            task.progress = progress
+            for callback in list(task.progress_callbacks):
+                try:
+                    callback(progress)
+                except Exception as e:
+                    log.warning(f"⚠️ Progress callback failed: {e}", extra={'task_id': task.task_id})
+
+        if status == 'SUCCEEDED':
+            self._finish(task, result=status_data)
+        elif status in self.TERMINAL_FAILURES:
+            error = status_data.get('task_error') or status_data.get('error') or 'Unknown error'
+            if isinstance(error, dict):
+                error = error.get('message') or error
+            self._finish(task, error=MeshyTaskError(f"3D conversion {status.lower()}: {error}"))
+        else:
+            return False
+        return True
+
+    def _timed_out(self, task):
+        """
+        Fail the task if its deadline has passed; returns True if it did
+        """
+        if time.monotonic() < task.deadline:
+            return False
+        self._finish(task, error=MeshyTaskError(
+            f"3D conversion timed out after {int(task.timeout)} seconds"
+        ))
+        return True
+
+    def _reschedule(self, task):
+        if self._timed_out(task):
+            return
+
+        with self._condition:
+            self._schedule_poll(task, self._next_interval(task.progress, task.failures))
+            # Called from the fetch pool; wake the scheduler if it sleeps on an empty schedule
+            self._condition.notify()
+
+    def _finish(self, task, result=None, error=None):
+        with self._condition:
+            # A poll and a pushed status may both see the end; the first one settles
+            if self._tasks.get(task.task_id) is not task:
+                return
+            del self._tasks[task.task_id]
+
+        outcome = 'succeeded' if error is None else 'failed'
+        TASK_SECONDS.observe(time.monotonic() - task.started, outcome=outcome)
+
+        if error is not None:
+            task.future.set_exception(error)
+        else:
+            task.future.set_result(result)
+
+
+class AsyncMeshyPoller(MeshyPoller):
+    """
+    MeshyPoller for an asyncio event loop: fetch_status is a coroutine
+    function and every tracked task is followed by its own coroutine
+    (a few KB each, no thread), so thousands of tasks can be in flight.
+
+    track() must be called from the loop and returns an asyncio.Future.
+    """
+
+    def track(self, task_id, on_progress=None, timeout=None):
+        task = self._tasks.get(task_id)
+        if task is None:
+            task = _TrackedTask(task_id, timeout or self.timeout)
+            task.future = asyncio.get_running_loop().create_future()
+            self._tasks[task_id] = task
+            task.runner = asyncio.create_task(self._follow(task), name=f"meshy-poll-{task_id}")
+        if on_progress:
+            task.progress_callbacks.append(on_progress)
+
+        return task.future
+
+    async def _follow(self, task):
+        delay = self._next_interval(0)
+        while True:
+            await asyncio.sleep(max(0.0, min(delay, task.deadline - time.monotonic())))
+            if task.future.done():
+                # Settled by a pushed status meanwhile
+                return
+            self.polls += 1
+
+            try:
+                status_data = await self.fetch_status(task.task_id)
+            except Exception as e:
+                self._fetch_failed(task, e)
+            else:
+                if self._apply_status(task, status_data):
+                    return
+
+            if self._timed_out(task):
+                return
+            delay = self._next_interval(task.progress, task.failures)
@@ -0,0 +1,336 @@
+"""
+Prometheus-style metrics without a client library
+- Counters, gauges and histograms with labels, safe to update from any thread
+- Gauges can read their value from a callback at scrape time (queue depth, in-flight tasks)
+- render() produces the text exposition format served on /metrics
+- SharedMetrics sums the figures of every worker process on one data folder,
+  so a scrape reaching any worker sees the whole server
+"""
+
+import bisect
+import json
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+
+log = logging.getLogger(__name__)
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; wide enough for both sub-second API calls and multi-minute Meshy tasks
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+
+class Registry:
+    """
+    The set of metrics rendered together on one /metrics page
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+
+    def get(self, name):
+        with self._lock:
+            return self._metrics.get(name)
+
+    def collect(self):
+        """
+        Current values of every metric as plain data (JSON-serializable)
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.collect() for metric in metrics}
+
+    def render(self, snapshots=None):
+        """
+        Exposition text of every metric. With snapshots (collect() results,
+        e.g. one per worker process) their values are summed and rendered
+        instead of this process's own.
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        if snapshots is None:
+            return ''.join(metric.render() for metric in metrics)
+        return ''.join(
+            metric.render(metric.merge(snapshot.get(metric.name, []) for snapshot in snapshots))
+            for metric in metrics
+        )
+
+
+REGISTRY = Registry()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    type_name = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def _key(self, labels):
+        if len(labels) != len(self.labelnames) or set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self, items=None):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+            *self._samples(self._items() if items is None else items)
+        ]
+        return '\n'.join(lines) + '\n'
+
+    def collect(self):
+        """
+        [[label values, value], ...] as plain data
+        """
+        return [[list(key), value] for key, value in self._items()]
+
+    def merge(self, collected):
+        """
+        Sum several collect() results into sorted (label values, value) items
+        """
+        totals = {}
+        for items in collected:
+            for key, value in items:
+                key = tuple(key)
+                totals[key] = self._add(totals[key], value) if key in totals else value
+        return sorted(totals.items())
+
+    def _add(self, total, value):
+        return total + value
+
+    def _items(self):
+        with self._lock:
+            return sorted(self._values.items())
+
+    def _samples(self, items):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+
+class Counter(_Metric):
+    """
+    A value that only goes up (requests served, bytes written...)
+    """
+
+    type_name = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only be incremented")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """
+    A value that goes up and down. With set_function the value is read at
+    scrape time instead: fn() returns a number, or for a labelled gauge a
+    dict of {label value (or tuple of values): number}.
+    """
+
+    type_name = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        super().__init__(name, documentation, labelnames, registry)
+        self._function = None
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, fn):
+        self._function = fn
+
+    def _items(self):
+        if self._function is None:
+            return super()._items()
+
+        value = self._function()
+        if not self.labelnames:
+            return [((), value)]
+        return sorted(
+            (tuple(str(part) for part in (key if isinstance(key, tuple) else (key,))), sample)
+            for key, sample in value.items()
+        )
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values (latencies) in cumulative buckets
+    """
+
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0}
+            state['counts'][index] += 1
+            state['sum'] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observe the duration of a with-block (also when it raises)
+        """
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - started, **labels)
+
+    def count(self, **labels):
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return sum(state['counts']) if state else 0
+
+    def _items(self):
+        with self._lock:
+            return sorted((key, dict(state, counts=list(state['counts']))) for key, state in self._values.items())
+
+    def _add(self, total, value):
+        return {
+            'counts': [a + b for a, b in zip(total['counts'], value['counts'])],
+            'sum': total['sum'] + value['sum']
+        }
+
+    def _samples(self, items):
+        samples = []
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), state['counts']):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, [('le', _format_value(bound))])
+                samples.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            samples.append(f"{self.name}_sum{labels} {_format_value(state['sum'])}")
+            samples.append(f"{self.name}_count{labels} {cumulative}")
+        return samples
+
+
+class SharedMetrics:
+    """
+    Metrics of all the worker processes sharing `folder`. Each process
+    writes its own figures to a file there (dump(), called periodically and
+    on every scrape), and render() sums all of them, so /metrics answers the
+    same on whichever worker the scrape reaches.
+
+    Counters and histograms of a stopped process keep counting towards the
+    totals (so they never go backwards) until its file is retain_seconds old;
+    its gauges stop counting once the file is gauge_max_age seconds old.
+    """
+
+    def __init__(self, folder, registry=REGISTRY, gauge_max_age=60, retain_seconds=24 * 3600):
+        self.folder = folder
+        self.registry = registry
+        self.gauge_max_age = gauge_max_age
+        self.retain_seconds = retain_seconds
+        # Workers forked from one master share this token, but not their pid
+        self._token = uuid.uuid4().hex[:8]
+        os.makedirs(folder, exist_ok=True)
+
+    def path(self):
+        return os.path.join(self.folder, f"{os.getpid()}-{self._token}.json")
+
+    def dump(self):
+        """
+        Write this process's figures to its file
+        """
+        path = self.path()
+        temp_path = f"{path}.part"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.registry.collect(), f)
+        os.replace(temp_path, path)
+
+    def render(self):
+        try:
+            self.dump()
+        except OSError as e:
+            # The other workers' figures are still worth answering with
+            log.warning(f"⚠️ Could not write metrics file: {e}")
+        return self.registry.render(self._snapshots())
+
+    def _snapshots(self):
+        now = time.time()
+        snapshots = []
+        for name in os.listdir(self.folder):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.folder, name)
+            try:
+                age = now - os.path.getmtime(path)
+                if age > self.retain_seconds:
+                    os.remove(path)
+                    continue
+                with open(path, encoding='utf-8') as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError) as e:
+                # Removed or being replaced by its worker right now
+                log.debug(f"Skipping metrics file {name}: {e}")
+                continue
+            if age > self.gauge_max_age:
+                snapshot = {
+                    name: items for name, items in snapshot.items()
+                    if not isinstance(self.registry.get(name), Gauge)
+                }
+            snapshots.append(snapshot)
+        return snapshots
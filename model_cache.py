@@ -0,0 +1,93 @@
+"""
+Image-hash keyed cache of 3D conversion results
+- Keyed on the SHA-256 of the source image bytes plus the Meshy parameters
+- Durable SQLite index from that key to the downloaded GLB
+"""
+
+import hashlib
+import json
+import os
+import time
+
+from db import connect
+
+
+def file_sha256(path, chunk_size=64 * 1024):
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def conversion_key(image_hash, **params):
+    material = json.dumps({'image': image_hash, 'params': params}, sort_keys=True)
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+
+class ConversionCache:
+    """
+    Maps (image content, conversion params) to a GLB already on disk
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        with connect(self.db_path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS model_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    image_hash TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    model_url TEXT NOT NULL,
+                    model_path TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+
+    def get(self, image_hash, **params):
+        """
+        Return {'model_url', 'model_path', 'created_at'} if the GLB is still on disk, or None
+        """
+        key = conversion_key(image_hash, **params)
+
+        with connect(self.db_path) as conn:
+            row = conn.execute(
+                "SELECT model_url, model_path, created_at FROM model_cache WHERE cache_key = ?",
+                (key,)
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            if not os.path.isfile(row['model_path']):
+                conn.execute("DELETE FROM model_cache WHERE cache_key = ?", (key,))
+                return None
+
+            conn.execute(
+                "UPDATE model_cache SET last_access = ?, hits = hits + 1 WHERE cache_key = ?",
+                (time.time(), key)
+            )
+
+        return dict(row)
+
+    def put(self, image_hash, model_url, model_path, **params):
+        now = time.time()
+        with connect(self.db_path) as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO model_cache
+                    (cache_key, image_hash, params, model_url, model_path, created_at, last_access, hits)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 0)
+                """,
+                (conversion_key(image_hash, **params), image_hash,
+                 json.dumps(params, sort_keys=True), model_url, model_path, now, now)
+            )
+
+    def stats(self):
+        with connect(self.db_path) as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) AS entries, COALESCE(SUM(hits), 0) AS hits FROM model_cache"
+            ).fetchone()
+        return dict(row)
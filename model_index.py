@@ -0,0 +1,125 @@
+"""
+Queryable index of stored 3D models
+- One row per validated GLB: byte size, vertex / triangle counts, textures, bounding box
+- Filter by size or triangle count without reopening the files
+"""
+
+import json
+import time
+
+from db import connect
+
+
+class ModelIndex:
+    """
+    Stores the summaries produced by glb.inspect_glb, keyed by model id (file stem)
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        with connect(self.db_path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS models (
+                    model_id TEXT PRIMARY KEY,
+                    model_url TEXT NOT NULL,
+                    model_path TEXT NOT NULL,
+                    sha256 TEXT,
+                    bytes INTEGER NOT NULL,
+                    vertices INTEGER NOT NULL,
+                    triangles INTEGER NOT NULL,
+                    textures INTEGER NOT NULL,
+                    texture_bytes INTEGER NOT NULL,
+                    max_texture_size INTEGER,
+                    info TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS models_triangles ON models (triangles)")
+            conn.execute("CREATE INDEX IF NOT EXISTS models_created ON models (created_at)")
+
+    def put(self, model_id, model_url, model_path, info, sha256=None):
+        textures = info.get('textures', [])
+        sizes = [max(t['width'] or 0, t['height'] or 0) for t in textures]
+        with connect(self.db_path) as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO models
+                    (model_id, model_url, model_path, sha256, bytes, vertices, triangles,
+                     textures, texture_bytes, max_texture_size, info, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    model_id, model_url, model_path, sha256,
+                    info['bytes'], info['vertices'], info['triangles'],
+                    len(textures), sum(t['bytes'] for t in textures),
+                    max(sizes) if sizes else None,
+                    json.dumps(info), time.time()
+                )
+            )
+
+    def update_info(self, model_id, **fields):
+        """
+        Merge extra fields (e.g. the LOD manifest) into a model's stored info
+        """
+        with connect(self.db_path) as conn:
+            row = conn.execute("SELECT info FROM models WHERE model_id = ?", (model_id,)).fetchone()
+            if row is None:
+                return False
+            info = json.loads(row['info'])
+            info.update(fields)
+            conn.execute("UPDATE models SET info = ? WHERE model_id = ?", (json.dumps(info), model_id))
+        return True
+
+    def get(self, model_id):
+        with connect(self.db_path) as conn:
+            row = conn.execute("SELECT * FROM models WHERE model_id = ?", (model_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def query(self, min_triangles=None, max_triangles=None, min_bytes=None, max_bytes=None,
+              limit=50, offset=0):
+        """
+        Newest first, optionally filtered by triangle count and byte size
+        """
+        conditions = []
+        args = []
+        for column, operator, value in (
+            ('triangles', '>=', min_triangles),
+            ('triangles', '<=', max_triangles),
+            ('bytes', '>=', min_bytes),
+            ('bytes', '<=', max_bytes)
+        ):
+            if value is not None:
+                conditions.append(f"{column} {operator} ?")
+                args.append(value)
+
+        query = "SELECT * FROM models"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY created_at DESC LIMIT ? OFFSET ?"
+        args += [limit, offset]
+
+        with connect(self.db_path) as conn:
+            rows = conn.execute(query, args).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def remove(self, model_id):
+        with connect(self.db_path) as conn:
+            conn.execute("DELETE FROM models WHERE model_id = ?", (model_id,))
+
+    def totals(self):
+        with connect(self.db_path) as conn:
+            row = conn.execute("""
+                SELECT COUNT(*) AS models,
+                       COALESCE(SUM(bytes), 0) AS bytes,
+                       COALESCE(SUM(vertices), 0) AS vertices,
+                       COALESCE(SUM(triangles), 0) AS triangles,
+                       COALESCE(SUM(texture_bytes), 0) AS texture_bytes
+                FROM models
+            """).fetchone()
+        return dict(row)
+
+    @staticmethod
+    def _to_dict(row):
+        model = dict(row)
+        model.update(json.loads(model.pop('info')))
+        return model
@@ -0,0 +1,225 @@
+"""
+Client-side rate limiting for upstream APIs
+- One token bucket per "<upstream>:<endpoint class>" (e.g. openai:generation, meshy:status)
+- Excess calls wait in line instead of failing; interactive work goes before batch work
+- A 429 pauses the bucket for the upstream's Retry-After
+- Usable from threads (acquire) and from asyncio coroutines (acquire_async)
+"""
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+
+
+INTERACTIVE = 0
+BATCH = 1
+
+# A context variable rather than a thread-local, so each asyncio task has its own
+_priority = contextvars.ContextVar('upstream_priority', default=INTERACTIVE)
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a call waited longer than allowed for a rate-limit slot"""
+
+
+@contextmanager
+def request_priority(priority):
+    """
+    Run upstream calls made by this thread (or asyncio task) at the given priority
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority():
+    return _priority.get()
+
+
+def parse_retry_after(value, default=1.0):
+    """
+    Retry-After is either a number of seconds or an HTTP date
+    """
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return default
+
+
+def parse_limits(spec):
+    """
+    Parse "openai:generation=0.5/5,meshy:status=10/20" into {name: (rate, burst)}
+    """
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, value = item.partition('=')
+        rate, _, burst = value.partition('/')
+        limits[name.strip()] = (float(rate), float(burst or rate))
+    return limits
+
+
+class _Bucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.waiters = []
+
+    def refill(self, now):
+        # No credit builds up while paused, so a pause isn't followed by a burst
+        if now >= self.paused_until:
+            elapsed = now - max(self.updated, self.paused_until)
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated = now
+
+    def wait_time(self, now):
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """
+    Token buckets keyed by name. Waiters on a bucket are served strictly by
+    (priority, arrival), so a queued batch call never overtakes an interactive one.
+    Names without a configured limit are not limited.
+    """
+
+    def __init__(self, limits=None, max_wait=120.0):
+        self.max_wait = max_wait
+        self._buckets = {
+            name: _Bucket(rate, burst) for name, (rate, burst) in (limits or {}).items()
+        }
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self.throttled = {}
+
+    def acquire(self, name, priority=None, timeout=None):
+        """
+        Block until a slot on bucket `name` is free; returns seconds waited
+        """
+        bucket = self._buckets.get(name)
+        if bucket is None:
+            return 0.0
+
+        priority = current_priority() if priority is None else priority
+        timeout = self.max_wait if timeout is None else timeout
+        started = time.monotonic()
+        ticket = (priority, next(self._sequence))
+
+        with self._condition:
+            heapq.heappush(bucket.waiters, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    bucket.refill(now)
+                    wait = bucket.wait_time(now) if bucket.waiters[0] == ticket else None
+
+                    if wait == 0.0:
+                        heapq.heappop(bucket.waiters)
+                        bucket.tokens -= 1
+                        # Let the next waiter in line re-check the bucket
+                        self._condition.notify_all()
+                        return now - started
+
+                    remaining = timeout - (now - started)
+                    if remaining <= 0:
+                        raise RateLimitTimeout(f"Waited more than {timeout:.0f}s for {name} rate limit")
+
+                    self._condition.wait(min(remaining, wait) if wait is not None else remaining)
+            except BaseException:
+                if ticket in bucket.waiters:
+                    bucket.waiters.remove(ticket)
+                    heapq.heapify(bucket.waiters)
+                    self._condition.notify_all()
+                raise
+
+    async def acquire_async(self, name, priority=None, timeout=None, recheck_interval=0.05):
+        """
+        acquire() for coroutines: waits in the same line as the threads but
+        sleeps on the event loop instead of blocking it. A coroutine that is
+        not at the head of the line re-checks every recheck_interval seconds.
+        """
+        bucket = self._buckets.get(name)
+        if bucket is None:
+            return 0.0
+
+        priority = current_priority() if priority is None else priority
+        timeout = self.max_wait if timeout is None else timeout
+        started = time.monotonic()
+        ticket = (priority, next(self._sequence))
+
+        with self._condition:
+            heapq.heappush(bucket.waiters, ticket)
+        try:
+            while True:
+                with self._condition:
+                    now = time.monotonic()
+                    bucket.refill(now)
+                    wait = bucket.wait_time(now) if bucket.waiters[0] == ticket else None
+
+                    if wait == 0.0:
+                        heapq.heappop(bucket.waiters)
+                        bucket.tokens -= 1
+                        self._condition.notify_all()
+                        return now - started
+
+                remaining = timeout - (now - started)
+                if remaining <= 0:
+                    raise RateLimitTimeout(f"Waited more than {timeout:.0f}s for {name} rate limit")
+
+                await asyncio.sleep(min(remaining, recheck_interval if wait is None else wait))
+        except BaseException:
+            with self._condition:
+                if ticket in bucket.waiters:
+                    bucket.waiters.remove(ticket)
+                    heapq.heapify(bucket.waiters)
+                    self._condition.notify_all()
+            raise
+
+    def penalize(self, name, seconds):
+        """
+        Pause bucket `name` (after an upstream 429) for `seconds`.
+        Returns False if the bucket isn't limited, i.e. the caller must wait itself.
+        """
+        bucket = self._buckets.get(name)
+        with self._condition:
+            self.throttled[name] = self.throttled.get(name, 0) + 1
+            if bucket is None:
+                return False
+            bucket.paused_until = max(bucket.paused_until, time.monotonic() + seconds)
+            # Refund the rejected call's token, but allow only one call right after the pause
+            bucket.tokens = min(bucket.tokens + 1, 1)
+            self._condition.notify_all()
+        return True
+
+    def stats(self):
+        with self._condition:
+            now = time.monotonic()
+            return {
+                name: {
+                    'rate': bucket.rate,
+                    'burst': bucket.capacity,
+                    'waiting': len(bucket.waiters),
+                    'paused_for': round(max(0.0, bucket.paused_until - now), 1),
+                    'throttled': self.throttled.get(name, 0)
+                }
+                for name, bucket in self._buckets.items()
+            }
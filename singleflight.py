@@ -0,0 +1,114 @@
+"""
+Request coalescing ("singleflight") for expensive upstream operations
+- Concurrent calls with the same key share one in-flight operation
+- The key is released as soon as that operation finishes
+- AsyncSingleFlight does the same for coroutines on one event loop
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """
+    do()    - run a blocking call once per key; concurrent callers wait and share its outcome
+    share() - start an asynchronous operation (a Future or Job) once per key
+              and hand the same handle to every caller while it is in flight
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Returns (result, shared). Exceptions from the leading call are raised in every caller.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            self._release(key, future)
+
+        return result, False
+
+    def share(self, key, start):
+        """
+        Returns (handle, shared). start() must return an object with
+        add_done_callback(fn), and is only called when nothing is in flight for key.
+        """
+        with self._lock:
+            handle = self._calls.get(key)
+            if handle is not None:
+                return handle, True
+            handle = start()
+            self._calls[key] = handle
+
+        handle.add_done_callback(lambda _: self._release(key, handle))
+        return handle, False
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+    def _release(self, key, handle):
+        with self._lock:
+            if self._calls.get(key) is handle:
+                del self._calls[key]
+
+
+class AsyncSingleFlight:
+    """
+    SingleFlight.do() for coroutines: concurrent awaits with the same key
+    share one run of the coroutine function. Use from a single event loop.
+    """
+
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, fn, *args, **kwargs):
+        """
+        Returns (result, shared). Exceptions from the leading call are raised in every caller.
+        """
+        future = self._calls.get(key)
+        if future is not None:
+            # A waiter that gives up must not cancel the leader's work
+            return await asyncio.shield(future), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await fn(*args, **kwargs)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark it retrieved: nobody else may be waiting for it
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+        return result, False
+
+    def in_flight(self):
+        return len(self._calls)
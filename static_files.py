@@ -0,0 +1,183 @@
+"""
+Static asset serving
+- Strong ETags from each file's content hash, so revalidation is a cheap 304
+- Immutable caching for content-addressed / uuid-named assets
+- Conditional GET and byte Range requests (resumable GLB downloads)
+- Precompressed .br / .gz variants served to clients that accept them
+- Optional X-Sendfile / X-Accel-Redirect so a front proxy sends the bytes
+"""
+
+import gzip
+import mimetypes
+import os
+import shutil
+import threading
+
+from flask import Response, abort, request, send_file
+from werkzeug.security import safe_join
+
+from model_cache import file_sha256
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+mimetypes.add_type('model/gltf-binary', '.glb')
+
+# One year, the longest lifetime caches are expected to honour
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# Preferred first; the file suffix is the encoding's usual extension
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+SENDFILE_MODES = (None, 'x-sendfile', 'x-accel')
+
+
+class StaticFiles:
+    """
+    Serves files below `root`. Paths starting with one of immutable_prefixes
+    never change once written and are cached for a year; everything else is
+    revalidated on every use.
+
+    sendfile_mode 'x-sendfile' relies on app.use_x_sendfile; 'x-accel' answers
+    with an X-Accel-Redirect to accel_prefix + path and leaves Range and
+    compression (gzip_static) to nginx.
+    """
+
+    def __init__(self, root, immutable_prefixes=(), sendfile_mode=None,
+                 accel_prefix='/protected-static/', precompress_min_size=1024):
+        if sendfile_mode not in SENDFILE_MODES:
+            raise ValueError(f"Unknown sendfile mode {sendfile_mode!r}, expected one of {SENDFILE_MODES}")
+        self.root = root
+        self.immutable_prefixes = tuple(immutable_prefixes)
+        self.sendfile_mode = sendfile_mode
+        self.accel_prefix = '/' + accel_prefix.strip('/') + '/'
+        self.precompress_min_size = precompress_min_size
+        self._hashes = {}
+        self._lock = threading.Lock()
+
+    def _stat_key(self, path):
+        stat = os.stat(path)
+        return os.path.abspath(path), stat.st_mtime_ns, stat.st_size
+
+    def remember_hash(self, path, sha256):
+        """
+        Prime the ETag cache with a hash computed while the file was written
+        """
+        with self._lock:
+            self._hashes[self._stat_key(path)] = sha256
+
+    def etag(self, path):
+        key = self._stat_key(path)
+        with self._lock:
+            sha256 = self._hashes.get(key)
+        if sha256 is None:
+            sha256 = file_sha256(path)
+            with self._lock:
+                if len(self._hashes) >= 10000:
+                    self._hashes.clear()
+                self._hashes[key] = sha256
+        return sha256
+
+    def precompress(self, path):
+        """
+        Write .br (if the brotli module is installed) and .gz copies of a file,
+        keeping only those that are meaningfully smaller. Returns the encodings written.
+        """
+        size = os.path.getsize(path)
+        if size < self.precompress_min_size:
+            return []
+
+        written = []
+        for encoding, suffix in ENCODINGS:
+            if encoding == 'br' and brotli is None:
+                continue
+
+            target = path + suffix
+            temp_path = f"{target}.part"
+            with open(path, 'rb') as source, open(temp_path, 'wb') as output:
+                if encoding == 'br':
+                    compressor = brotli.Compressor(quality=9)
+                    for chunk in iter(lambda: source.read(64 * 1024), b''):
+                        output.write(compressor.process(chunk))
+                    output.write(compressor.finish())
+                else:
+                    with gzip.GzipFile(fileobj=output, mode='wb', compresslevel=9, mtime=0) as compressed:
+                        shutil.copyfileobj(source, compressed, 64 * 1024)
+
+            # Not worth a second representation unless it saves at least 10%
+            if os.path.getsize(temp_path) <= size * 0.9:
+                os.replace(temp_path, target)
+                written.append(encoding)
+            else:
+                os.remove(temp_path)
+        return written
+
+    def is_immutable(self, relative_path):
+        return relative_path.startswith(self.immutable_prefixes)
+
+    def serve(self, relative_path):
+        """
+        Response for GET /static/<relative_path>
+        """
+        path = safe_join(self.root, relative_path)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+        return self.send(path, immutable=self.is_immutable(relative_path))
+
+    def send(self, path, mimetype=None, immutable=False, max_age=0, vary=None):
+        """
+        Send a file with a content-hash ETag, conditional GET and Range support.
+        max_age applies to mutable files (0 = revalidate every time).
+        """
+        mimetype = mimetype or mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        etag = self.etag(path)
+        vary_headers = [vary] if vary else []
+
+        if self.sendfile_mode == 'x-accel':
+            response = Response(mimetype=mimetype)
+            response.headers['X-Accel-Redirect'] = self.accel_prefix + os.path.relpath(path, self.root).replace(os.sep, '/')
+            response.set_etag(etag)
+            if etag in request.if_none_match:
+                response.status_code = 304
+        else:
+            encoding, send_path = self._negotiate(path)
+            if encoding:
+                etag = f"{etag}-{encoding}"
+            if encoding or os.path.exists(path + '.gz') or os.path.exists(path + '.br'):
+                vary_headers.append('Accept-Encoding')
+
+            response = send_file(
+                os.path.abspath(send_path),
+                mimetype=mimetype,
+                etag=etag,
+                conditional=True,
+                max_age=IMMUTABLE_MAX_AGE if immutable else max_age
+            )
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+
+        response.cache_control.public = True
+        if immutable:
+            response.cache_control.max_age = IMMUTABLE_MAX_AGE
+            response.cache_control.immutable = True
+        elif max_age:
+            response.cache_control.max_age = max_age
+        else:
+            response.cache_control.no_cache = True
+        if vary_headers:
+            response.headers['Vary'] = ', '.join(vary_headers)
+        return response
+
+    def _negotiate(self, path):
+        """
+        Pick the best precompressed variant the client accepts: (encoding, path)
+        """
+        for encoding, suffix in ENCODINGS:
+            variant = path + suffix
+            if (request.accept_encodings[encoding] and os.path.isfile(variant)
+                    and os.path.getmtime(variant) >= os.path.getmtime(path)):
+                return encoding, variant
+        return None, path
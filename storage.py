@@ -0,0 +1,343 @@
+"""
+Storage manager for generated assets (images, GLBs and everything derived from them)
+- Hash-sharded layout: <folder>/<ab>/<cd>/<name>, so no directory grows unbounded
+- Access tracking with a byte quota (LRU eviction) and an optional TTL
+- Pluggable backends: the local filesystem, or an S3-compatible bucket (boto3 optional)
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import threading
+import time
+
+from db import connect
+
+
+log = logging.getLogger(__name__)
+
+
+class StorageError(Exception):
+    """Raised when a storage backend can't be set up or reached"""
+
+
+def shard_key(folder, filename, depth=2):
+    """
+    Deterministic sharded key for a file name, e.g. generated_images/3f/a2/<name>
+    """
+    digest = hashlib.sha256(filename.encode('utf-8')).hexdigest()
+    shards = [digest[i * 2:i * 2 + 2] for i in range(depth)]
+    return '/'.join([folder, *shards, filename])
+
+
+class LocalBackend:
+    """
+    Files live under root; the local copy *is* the stored object
+    """
+
+    name = 'local'
+
+    def __init__(self, root):
+        self.root = root
+
+    def local_path(self, key):
+        return os.path.join(self.root, *key.split('/'))
+
+    def put(self, key, path):
+        target = self.local_path(key)
+        if os.path.abspath(path) != os.path.abspath(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(path, target)
+
+    def fetch(self, key):
+        return os.path.isfile(self.local_path(key))
+
+    def delete(self, key):
+        try:
+            os.remove(self.local_path(key))
+        except FileNotFoundError:
+            pass
+
+
+class S3Backend:
+    """
+    Objects are stored in an S3-compatible bucket (AWS, MinIO, a moto server...);
+    files under root are a local working copy that is re-fetched on demand
+    """
+
+    name = 's3'
+
+    def __init__(self, root, bucket, prefix='', endpoint_url=None, region=None):
+        try:
+            import boto3
+        except ImportError:
+            raise StorageError("The S3 storage backend needs boto3 (pip install boto3)")
+
+        self.root = root
+        self.bucket = bucket
+        self.prefix = prefix.strip('/') + '/' if prefix.strip('/') else ''
+        self.client = boto3.client('s3', endpoint_url=endpoint_url, region_name=region)
+
+    def local_path(self, key):
+        return os.path.join(self.root, *key.split('/'))
+
+    def put(self, key, path):
+        self.client.upload_file(path, self.bucket, self.prefix + key)
+
+    def fetch(self, key):
+        """
+        Download an object into its local path; False if the bucket doesn't have it
+        """
+        from botocore.exceptions import ClientError
+
+        target = self.local_path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        temp_path = f"{target}.{threading.get_ident()}.part"
+        try:
+            self.client.download_file(self.bucket, self.prefix + key, temp_path)
+        except ClientError as e:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey'):
+                return False
+            raise
+        os.replace(temp_path, target)
+        return True
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + key)
+        try:
+            os.remove(self.local_path(key))
+        except FileNotFoundError:
+            pass
+
+
+class AssetStore:
+    """
+    Tracks stored assets in SQLite. An asset is a main file (an image, a GLB)
+    plus the files derived from it (LODs, compressed variants, thumbnails);
+    access to any of them counts as access to the asset, and eviction removes
+    them together. Keys are paths relative to the backend root.
+
+    With quota_bytes, the least recently accessed assets are evicted once the
+    total is exceeded; with ttl, assets not accessed for ttl seconds are evicted.
+    Eviction runs whenever an asset is added and on evict().
+    """
+
+    def __init__(self, db_path, backend, quota_bytes=0, ttl=0, shard_depth=2,
+                 touch_interval=60, on_evict=None):
+        self.db_path = db_path
+        self.backend = backend
+        self.quota_bytes = quota_bytes
+        self.ttl = ttl
+        self.shard_depth = shard_depth
+        self.touch_interval = touch_interval
+        self.on_evict = on_evict
+        self.evicted = 0
+        self._touched = {}
+        self._lock = threading.Lock()
+
+        with connect(self.db_path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS assets (
+                    asset_key TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    bytes INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS asset_files (
+                    file_key TEXT PRIMARY KEY,
+                    asset_key TEXT NOT NULL,
+                    bytes INTEGER NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS assets_lru ON assets (last_access)")
+            conn.execute("CREATE INDEX IF NOT EXISTS asset_files_asset ON asset_files (asset_key)")
+
+    def allocate(self, folder, filename):
+        """
+        Sharded key and local path for a new file; the directory is created
+        """
+        key = shard_key(folder, filename, self.shard_depth)
+        path = self.backend.local_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return key, path
+
+    def path(self, key):
+        return self.backend.local_path(key)
+
+    def key_for_path(self, path):
+        relative = os.path.relpath(os.path.abspath(path), os.path.abspath(self.backend.root))
+        return relative.replace(os.sep, '/')
+
+    def add(self, key, kind, extra_paths=()):
+        """
+        Record (and store) a newly written asset and any derived files already
+        next to it, then enforce the quota
+        """
+        now = time.time()
+        with connect(self.db_path) as conn:
+            conn.execute(
+                """
+                INSERT OR IGNORE INTO assets (asset_key, kind, bytes, created_at, last_access)
+                VALUES (?, ?, 0, ?, ?)
+                """,
+                (key, kind, now, now)
+            )
+        self.attach(key, [self.path(key), *extra_paths])
+        self.evict(keep=key)
+
+    def attach(self, key, paths):
+        """
+        Add derived files to an asset (stored, counted and evicted with it)
+        """
+        files = [
+            (self.key_for_path(path), os.path.getsize(path), path)
+            for path in paths if os.path.isfile(path)
+        ]
+        # Upload before touching the database so no transaction waits on the network
+        for file_key, _, path in files:
+            self.backend.put(file_key, path)
+
+        added = 0
+        with connect(self.db_path) as conn:
+            if not conn.execute("SELECT 1 FROM assets WHERE asset_key = ?", (key,)).fetchone():
+                return 0
+            for file_key, size, _ in files:
+                previous = conn.execute(
+                    "SELECT asset_key, bytes FROM asset_files WHERE file_key = ?", (file_key,)
+                ).fetchone()
+                if previous:
+                    conn.execute(
+                        "UPDATE assets SET bytes = bytes - ? WHERE asset_key = ?",
+                        (previous['bytes'], previous['asset_key'])
+                    )
+                conn.execute(
+                    "INSERT OR REPLACE INTO asset_files (file_key, asset_key, bytes) VALUES (?, ?, ?)",
+                    (file_key, key, size)
+                )
+                conn.execute("UPDATE assets SET bytes = bytes + ? WHERE asset_key = ?", (size, key))
+                added += size
+        return added
+
+    def touch(self, file_key):
+        """
+        Record an access to a file (and so its asset). Writes are throttled to
+        one per asset file per touch_interval.
+        """
+        now = time.time()
+        with self._lock:
+            if now - self._touched.get(file_key, 0) < self.touch_interval:
+                return
+            if len(self._touched) >= 100000:
+                self._touched.clear()
+            self._touched[file_key] = now
+
+        with connect(self.db_path) as conn:
+            conn.execute(
+                """
+                UPDATE assets SET last_access = ?, hits = hits + 1
+                WHERE asset_key = (SELECT asset_key FROM asset_files WHERE file_key = ?)
+                """,
+                (now, file_key)
+            )
+
+    def locate(self, folder, filename):
+        """
+        Local path of a stored file by name (sharded, or a legacy flat file), or None
+        """
+        path = self.ensure_local(shard_key(folder, filename, self.shard_depth))
+        if path:
+            return path
+        legacy_path = self.backend.local_path(f"{folder}/{filename}")
+        return legacy_path if os.path.isfile(legacy_path) else None
+
+    def ensure_local(self, file_key):
+        """
+        Local path of a tracked file, fetched from the backend if the local copy is gone.
+        None if the file isn't known or can't be fetched.
+        """
+        path = self.path(file_key)
+        if os.path.isfile(path):
+            return path
+        with connect(self.db_path) as conn:
+            known = conn.execute("SELECT 1 FROM asset_files WHERE file_key = ?", (file_key,)).fetchone()
+        if known and self.backend.fetch(file_key):
+            return path
+        return None
+
+    def evict(self, now=None, keep=None):
+        """
+        Remove expired assets, then least recently used ones until under quota.
+        `keep` (e.g. the asset just added) is never evicted. Returns the evicted asset keys.
+        """
+        now = now or time.time()
+        with connect(self.db_path) as conn:
+            victims = []
+            if self.ttl:
+                victims += [
+                    row['asset_key'] for row in conn.execute(
+                        "SELECT asset_key FROM assets WHERE last_access < ?", (now - self.ttl,)
+                    )
+                ]
+
+            if self.quota_bytes:
+                total = conn.execute(
+                    "SELECT COALESCE(SUM(bytes), 0) AS total FROM assets WHERE last_access >= ?",
+                    (now - self.ttl if self.ttl else 0,)
+                ).fetchone()['total']
+                if total > self.quota_bytes:
+                    for row in conn.execute("SELECT asset_key, bytes FROM assets ORDER BY last_access"):
+                        if total <= self.quota_bytes:
+                            break
+                        if row['asset_key'] not in victims and row['asset_key'] != keep:
+                            victims.append(row['asset_key'])
+                            total -= row['bytes']
+
+        victims = [key for key in victims if key != keep]
+        for key in victims:
+            self.remove(key)
+        return victims
+
+    def remove(self, key):
+        with connect(self.db_path) as conn:
+            row = conn.execute("SELECT kind FROM assets WHERE asset_key = ?", (key,)).fetchone()
+            if row is None:
+                return False
+            file_keys = [
+                r['file_key'] for r in conn.execute(
+                    "SELECT file_key FROM asset_files WHERE asset_key = ?", (key,)
+                )
+            ]
+            conn.execute("DELETE FROM asset_files WHERE asset_key = ?", (key,))
+            conn.execute("DELETE FROM assets WHERE asset_key = ?", (key,))
+
+        for file_key in file_keys:
+            self.backend.delete(file_key)
+        self.evicted += 1
+        log.info(f"🧹 Evicted {row['kind']} {key}", extra={'asset_key': key, 'kind': row['kind'], 'files': len(file_keys)})
+
+        if self.on_evict:
+            self.on_evict(key, row['kind'])
+        return True
+
+    def stats(self):
+        with connect(self.db_path) as conn:
+            rows = conn.execute("""
+                SELECT kind, COUNT(*) AS assets, COALESCE(SUM(bytes), 0) AS bytes
+                FROM assets GROUP BY kind
+            """).fetchall()
+        kinds = {row['kind']: {'assets': row['assets'], 'bytes': row['bytes']} for row in rows}
+        return {
+            'backend': self.backend.name,
+            'bytes': sum(kind['bytes'] for kind in kinds.values()),
+            'quota_bytes': self.quota_bytes or None,
+            'ttl': self.ttl or None,
+            'evicted': self.evicted,
+            'kinds': kinds
+        }
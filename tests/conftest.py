@@ -0,0 +1,10 @@
+"""
+Shared pytest setup
+- The library modules live at the repository root; make them importable
+  however pytest is invoked
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,169 @@
+import pytest
+
+import circuit_breaker
+from circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from http_clients import UpstreamClient
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(circuit_breaker.time, 'monotonic', clock)
+    return clock
+
+
+def make_breaker(**kwargs):
+    settings = dict(failure_rate=0.5, min_calls=4, window_seconds=60, slow_call_seconds=5, open_seconds=30)
+    settings.update(kwargs)
+    return CircuitBreaker('meshy', **settings)
+
+
+def call(breaker, success=True, latency=0.1):
+    breaker.before_call()
+    breaker.record(success, latency)
+
+
+def trip(breaker):
+    for _ in range(breaker.min_calls):
+        call(breaker, success=False)
+    assert breaker.state == OPEN
+
+
+def test_opens_at_failure_rate_once_min_calls_reached(clock):
+    breaker = make_breaker()
+
+    for _ in range(3):
+        call(breaker, success=False)
+    # Three failures out of three, but below min_calls
+    assert breaker.state == CLOSED
+
+    call(breaker, success=True)
+    # 3 of 4 failed
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    assert breaker.stats()['rejected'] == 1
+
+
+def test_stays_closed_below_failure_rate(clock):
+    breaker = make_breaker()
+
+    for success in (True, True, True, False, True, False):
+        call(breaker, success=success)
+
+    assert breaker.state == CLOSED
+
+
+def test_old_calls_leave_the_window(clock):
+    breaker = make_breaker()
+    for _ in range(3):
+        call(breaker, success=False)
+
+    clock.advance(61)
+    call(breaker, success=False)
+
+    assert breaker.state == CLOSED
+    assert breaker.stats()['calls'] == 1
+
+
+def test_slow_calls_count_as_failures(clock):
+    breaker = make_breaker()
+
+    for _ in range(4):
+        call(breaker, success=True, latency=6)
+
+    assert breaker.state == OPEN
+
+
+def test_half_open_after_cool_down_then_trial_closes(clock):
+    breaker = make_breaker()
+    trip(breaker)
+
+    clock.advance(29)
+    assert not breaker.available()
+    clock.advance(1)
+    assert breaker.available()
+
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    # Only one trial at a time
+    assert not breaker.available()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record(True, 0.1)
+    assert breaker.state == CLOSED
+    assert breaker.stats()['calls'] == 0
+
+
+def test_failed_trial_reopens(clock):
+    breaker = make_breaker()
+    trip(breaker)
+    clock.advance(30)
+
+    call(breaker, success=False)
+
+    assert breaker.state == OPEN
+    assert breaker.stats()['retry_in'] == 30
+
+
+def test_trial_that_never_reports_back_expires(clock):
+    breaker = make_breaker()
+    trip(breaker)
+    clock.advance(30)
+    breaker.before_call()
+
+    clock.advance(29)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    # The lost trial counts as failed: open again, for another cool-down
+    clock.advance(1)
+    assert breaker.stats()['state'] == OPEN
+    clock.advance(30)
+    call(breaker, success=True)
+    assert breaker.state == CLOSED
+
+
+def test_released_trial_frees_its_slot(clock):
+    breaker = make_breaker()
+    trip(breaker)
+    clock.advance(30)
+    breaker.before_call()
+
+    breaker.release()
+
+    assert breaker.available()
+    assert breaker.state == HALF_OPEN
+
+
+class ExplodingSession:
+    def request(self, method, url, **kwargs):
+        raise ValueError("Invalid URL 'http://[::1'")
+
+
+def test_client_records_any_exception_so_trials_end(clock):
+    breaker = make_breaker()
+    client = UpstreamClient('meshy', 'https://api.meshy.test', circuit_breaker=breaker)
+    client.session = ExplodingSession()
+    trip(breaker)
+    clock.advance(30)
+
+    with pytest.raises(ValueError):
+        client.get('/v2/tasks/1')
+
+    # The trial was recorded as failed rather than left pending forever
+    assert breaker.state == OPEN
+    clock.advance(30)
+    assert breaker.available()
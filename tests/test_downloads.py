@@ -0,0 +1,244 @@
+import asyncio
+import hashlib
+
+import pytest
+import requests
+
+from circuit_breaker import CircuitOpenError
+from downloads import DownloadError, stream_download
+from rate_limit import RateLimitTimeout
+
+
+BODY = bytes(range(256)) * 40
+
+
+class FakeResponse:
+    """
+    requests-like streamed reply; fail_after cuts the body off with a
+    connection error after that many bytes
+    """
+
+    def __init__(self, status_code, body=b'', headers=None, fail_after=None):
+        self.status_code = status_code
+        self.body = body
+        self.headers = headers or {}
+        self.fail_after = fail_after
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def iter_content(self, chunk_size):
+        end = len(self.body) if self.fail_after is None else self.fail_after
+        for start in range(0, end, chunk_size):
+            yield self.body[start:min(start + chunk_size, end)]
+        if self.fail_after is not None:
+            raise requests.ConnectionError("connection reset")
+
+
+class FakeClient:
+    """
+    Replays one scripted reply (or exception) per get() and records the request headers
+    """
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.requests = []
+
+    def get(self, url, headers=None, stream=False, **kwargs):
+        self.requests.append(dict(headers or {}))
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+
+def full(body=BODY, **headers):
+    return FakeResponse(200, body, {'Content-Length': str(len(body)), **headers})
+
+
+def partial(offset, body=BODY):
+    headers = {
+        'Content-Length': str(len(body) - offset),
+        'Content-Range': f"bytes {offset}-{len(body) - 1}/{len(body)}"
+    }
+    return FakeResponse(206, body[offset:], headers)
+
+
+def test_download_verifies_and_renames(tmp_path):
+    dest = tmp_path / 'model.glb'
+    client = FakeClient(full())
+
+    result = stream_download(client, 'http://assets/model.glb', str(dest),
+                             expected_sha256=hashlib.sha256(BODY).hexdigest())
+
+    assert dest.read_bytes() == BODY
+    assert result == {'path': str(dest), 'size': len(BODY), 'sha256': hashlib.sha256(BODY).hexdigest()}
+    assert not (tmp_path / 'model.glb.part').exists()
+    assert client.requests == [{'Accept-Encoding': 'identity'}]
+
+
+def test_interrupted_download_resumes_with_range(tmp_path):
+    dest = tmp_path / 'model.glb'
+    client = FakeClient(
+        FakeResponse(200, BODY, {'Content-Length': str(len(BODY))}, fail_after=4096),
+        partial(4096)
+    )
+
+    result = stream_download(client, 'http://assets/model.glb', str(dest), chunk_size=1024)
+
+    assert dest.read_bytes() == BODY
+    assert result['sha256'] == hashlib.sha256(BODY).hexdigest()
+    assert client.requests[1] == {'Accept-Encoding': 'identity', 'Range': 'bytes=4096-'}
+
+
+def test_range_ignored_restarts_from_zero(tmp_path):
+    dest = tmp_path / 'model.glb'
+    (tmp_path / 'model.glb.part').write_bytes(b'stale bytes')
+
+    stream_download(FakeClient(full()), 'http://assets/model.glb', str(dest))
+
+    assert dest.read_bytes() == BODY
+
+
+def test_range_not_satisfiable_discards_part_file(tmp_path):
+    dest = tmp_path / 'model.glb'
+    (tmp_path / 'model.glb.part').write_bytes(b'x' * (len(BODY) + 10))
+    client = FakeClient(FakeResponse(416), full())
+
+    stream_download(client, 'http://assets/model.glb', str(dest))
+
+    assert dest.read_bytes() == BODY
+    assert 'Range' in client.requests[0]
+    assert 'Range' not in client.requests[1]
+
+
+def test_short_body_is_retried_then_fails(tmp_path):
+    dest = tmp_path / 'model.glb'
+    truncated = [FakeResponse(200, BODY[:100], {'Content-Length': str(len(BODY))}) for _ in range(2)]
+
+    with pytest.raises(DownloadError, match='Incomplete download'):
+        stream_download(FakeClient(*truncated), 'http://assets/model.glb', str(dest), max_attempts=2)
+
+    assert not dest.exists()
+    assert not (tmp_path / 'model.glb.part').exists()
+
+
+def test_size_mismatch_removes_part_file(tmp_path):
+    dest = tmp_path / 'model.glb'
+    client = FakeClient(FakeResponse(200, BODY, {'Content-Length': '100'}))
+
+    with pytest.raises(DownloadError, match='Size mismatch'):
+        stream_download(client, 'http://assets/model.glb', str(dest))
+
+    assert not (tmp_path / 'model.glb.part').exists()
+
+
+def test_checksum_mismatch_removes_part_file(tmp_path):
+    dest = tmp_path / 'model.glb'
+
+    with pytest.raises(DownloadError, match='SHA-256 mismatch'):
+        stream_download(FakeClient(full()), 'http://assets/model.glb', str(dest), expected_sha256='0' * 64)
+
+    assert not dest.exists()
+    assert not (tmp_path / 'model.glb.part').exists()
+
+
+def test_content_md5_checked(tmp_path):
+    dest = tmp_path / 'model.glb'
+
+    with pytest.raises(DownloadError, match='Content-MD5'):
+        stream_download(FakeClient(full(**{'Content-MD5': 'AAAAAAAAAAAAAAAAAAAAAA=='})),
+                        'http://assets/model.glb', str(dest))
+
+
+@pytest.mark.parametrize('error', [CircuitOpenError("assets circuit open"), RateLimitTimeout("waited too long")])
+def test_fatal_error_after_interruption_removes_part_file(tmp_path, error):
+    dest = tmp_path / 'model.glb'
+    client = FakeClient(FakeResponse(200, BODY, {'Content-Length': str(len(BODY))}, fail_after=4096), error)
+
+    with pytest.raises(type(error)):
+        stream_download(client, 'http://assets/model.glb', str(dest), chunk_size=1024)
+
+    assert not (tmp_path / 'model.glb.part').exists()
+
+
+def test_encoded_reply_skips_length_checks(tmp_path):
+    # A server that compresses despite Accept-Encoding: identity; the client
+    # hands over decoded bytes, so the encoded Content-Length must not be used
+    dest = tmp_path / 'model.glb'
+    client = FakeClient(full(**{'Content-Length': '1200', 'Content-Encoding': 'gzip'}))
+
+    result = stream_download(client, 'http://assets/model.glb', str(dest))
+
+    assert result['size'] == len(BODY)
+
+
+class FakeAsyncContent:
+    def __init__(self, body, fail_after):
+        self.body = body
+        self.fail_after = fail_after
+
+    async def iter_chunked(self, chunk_size):
+        import aiohttp
+        end = len(self.body) if self.fail_after is None else self.fail_after
+        for start in range(0, end, chunk_size):
+            yield self.body[start:min(start + chunk_size, end)]
+        if self.fail_after is not None:
+            raise aiohttp.ClientPayloadError("connection reset")
+
+
+class FakeAsyncResponse:
+    def __init__(self, response):
+        self.status = response.status_code
+        self.headers = response.headers
+        self.content = FakeAsyncContent(response.body, response.fail_after)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeAsyncClient(FakeClient):
+    def stream(self, method, url, headers=None, **kwargs):
+        return FakeAsyncResponse(self.get(url, headers=headers))
+
+
+def test_async_download_resumes_with_range(tmp_path):
+    pytest.importorskip('aiohttp')
+    from async_clients import stream_download as async_stream_download
+
+    dest = tmp_path / 'model.glb'
+    client = FakeAsyncClient(
+        FakeResponse(200, BODY, {'Content-Length': str(len(BODY))}, fail_after=4096),
+        partial(4096)
+    )
+
+    result = asyncio.run(async_stream_download(client, 'http://assets/model.glb', str(dest), chunk_size=1024))
+
+    assert dest.read_bytes() == BODY
+    assert result['sha256'] == hashlib.sha256(BODY).hexdigest()
+    assert client.requests == [
+        {'Accept-Encoding': 'identity'},
+        {'Accept-Encoding': 'identity', 'Range': 'bytes=4096-'}
+    ]
+
+
+def test_async_download_fatal_error_removes_part_file(tmp_path):
+    pytest.importorskip('aiohttp')
+    from async_clients import stream_download as async_stream_download
+
+    dest = tmp_path / 'model.glb'
+    client = FakeAsyncClient(
+        FakeResponse(200, BODY, {'Content-Length': str(len(BODY))}, fail_after=4096),
+        CircuitOpenError("assets circuit open")
+    )
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(async_stream_download(client, 'http://assets/model.glb', str(dest), chunk_size=1024))
+
+    assert not (tmp_path / 'model.glb.part').exists()
@@ -0,0 +1,217 @@
+import struct
+
+import pytest
+
+from glb import (
+    ARRAY_BUFFER, CHUNK_JSON, FLOAT, GLB_MAGIC, UNSIGNED_SHORT,
+    BinBuilder, GLBError, inspect_glb, inspect_glb_file, write_glb
+)
+
+
+def triangle_gltf():
+    """
+    (gltf, bin_chunk) of one indexed triangle in one node
+    """
+    builder = BinBuilder()
+    position = builder.add_accessor(
+        [(0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (0.0, 2.0, 0.0)], FLOAT, 'VEC3',
+        target=ARRAY_BUFFER, bounds=True
+    )
+    indices = builder.add_accessor([(0,), (1,), (2,)], UNSIGNED_SHORT, 'SCALAR')
+    bin_chunk = builder.finish()
+    gltf = {
+        'asset': {'version': '2.0', 'generator': 'tests'},
+        'buffers': [{'byteLength': len(bin_chunk)}],
+        'bufferViews': builder.buffer_views,
+        'accessors': builder.accessors,
+        'meshes': [{'primitives': [{'attributes': {'POSITION': position}, 'indices': indices}]}],
+        'nodes': [{'mesh': 0, 'translation': [0, 0, 5]}],
+        'scenes': [{'nodes': [0]}]
+    }
+    return gltf, bin_chunk
+
+
+def raw_glb(json_bytes):
+    """
+    A GLB whose JSON chunk holds exactly json_bytes (which may not be a glTF object)
+    """
+    json_bytes += b' ' * (-len(json_bytes) % 4)
+    header = struct.pack('<III', GLB_MAGIC, 2, 12 + 8 + len(json_bytes))
+    return header + struct.pack('<II', len(json_bytes), CHUNK_JSON) + json_bytes
+
+
+def test_inspect_summarizes_valid_model():
+    gltf, bin_chunk = triangle_gltf()
+    data = write_glb(gltf, bin_chunk)
+
+    info = inspect_glb(data)
+
+    assert info['bytes'] == len(data)
+    assert (info['vertices'], info['triangles'], info['meshes'], info['primitives']) == (3, 1, 1, 1)
+    assert info['bbox_min'] == [0.0, 0.0, 5.0]
+    assert info['bbox_max'] == [1.0, 2.0, 5.0]
+    assert info['generator'] == 'tests'
+
+
+def test_inspect_reports_embedded_texture():
+    gltf, bin_chunk = triangle_gltf()
+    png = b'\x89PNG\r\n\x1a\n' + struct.pack('>I', 13) + b'IHDR' + struct.pack('>II', 64, 32) + b'\0' * 9
+    view = {'buffer': 0, 'byteOffset': len(bin_chunk), 'byteLength': len(png)}
+    gltf['bufferViews'].append(view)
+    gltf['images'] = [{'bufferView': len(gltf['bufferViews']) - 1, 'mimeType': 'image/png'}]
+    bin_chunk += png
+    gltf['buffers'][0]['byteLength'] = len(bin_chunk)
+    data = write_glb(gltf, bin_chunk)
+
+    info = inspect_glb(data)
+
+    assert info['bytes'] == len(data)
+    assert info['textures'] == [{'mime_type': 'image/png', 'bytes': len(png), 'width': 64, 'height': 32}]
+
+
+def test_inspect_file_matches_bytes(tmp_path):
+    gltf, bin_chunk = triangle_gltf()
+    gltf['images'] = [{'uri': 'data:image/png;base64,iVBORw0KGgo=', 'mimeType': 'image/png'}]
+    data = write_glb(gltf, bin_chunk)
+    path = tmp_path / 'model.glb'
+    path.write_bytes(data)
+
+    assert inspect_glb_file(str(path)) == inspect_glb(data)
+
+
+def test_inspect_file_rejects_empty_file(tmp_path):
+    path = tmp_path / 'empty.glb'
+    path.write_bytes(b'')
+
+    with pytest.raises(GLBError, match='too small'):
+        inspect_glb_file(str(path))
+
+
+def test_inspect_file_unmaps_corrupt_file(tmp_path, monkeypatch):
+    import glb
+
+    maps = []
+    real_mmap = glb.mmap.mmap
+
+    def recording_mmap(*args, **kwargs):
+        maps.append(real_mmap(*args, **kwargs))
+        return maps[-1]
+
+    monkeypatch.setattr(glb.mmap, 'mmap', recording_mmap)
+    gltf, bin_chunk = triangle_gltf()
+    gltf['accessors'][0]['count'] = 1000
+    path = tmp_path / 'corrupt.glb'
+    path.write_bytes(write_glb(gltf, bin_chunk))
+
+    with pytest.raises(GLBError):
+        inspect_glb_file(str(path))
+
+    # Closed before the error reaches the caller, so it can delete the file at once
+    assert maps and maps[0].closed
+    path.unlink()
+
+
+def test_truncated_file():
+    gltf, bin_chunk = triangle_gltf()
+    data = write_glb(gltf, bin_chunk)
+
+    with pytest.raises(GLBError, match='truncated'):
+        inspect_glb(data[:-8])
+
+
+@pytest.mark.parametrize('json_bytes', [b'[]', b'[1, 2]', b'"model"', b'null'])
+def test_json_chunk_not_an_object(json_bytes):
+    with pytest.raises(GLBError, match='not an object'):
+        inspect_glb(raw_glb(json_bytes))
+
+
+def test_invalid_json_chunk():
+    with pytest.raises(GLBError, match='Invalid JSON'):
+        inspect_glb(raw_glb(b'{"asset": '))
+
+
+def break_position_count(gltf):
+    del gltf['accessors'][0]['count']
+
+
+def break_view_length(gltf):
+    del gltf['bufferViews'][0]['byteLength']
+
+
+def break_component_type(gltf):
+    del gltf['accessors'][0]['componentType']
+
+
+def break_view_offset(gltf):
+    gltf['bufferViews'][0]['byteOffset'] = 'zero'
+
+
+def break_accessors(gltf):
+    gltf['accessors'] = {'0': gltf['accessors'][0]}
+
+
+def break_primitives(gltf):
+    gltf['meshes'][0]['primitives'] = [['POSITION']]
+
+
+def break_attributes(gltf):
+    gltf['meshes'][0]['primitives'][0]['attributes'] = [0]
+
+
+def break_asset(gltf):
+    gltf['asset'] = ['2.0']
+
+
+def break_node_matrix(gltf):
+    gltf['nodes'][0]['matrix'] = [1, 0, 0]
+
+
+@pytest.mark.parametrize('corrupt', [
+    break_position_count,
+    break_view_length,
+    break_component_type,
+    break_view_offset,
+    break_accessors,
+    break_primitives,
+    break_attributes,
+    break_asset,
+    break_node_matrix
+])
+def test_malformed_json_raises_glb_error(corrupt):
+    gltf, bin_chunk = triangle_gltf()
+    corrupt(gltf)
+
+    with pytest.raises(GLBError):
+        inspect_glb(write_glb(gltf, bin_chunk))
+
+
+def test_accessor_past_buffer_view():
+    gltf, bin_chunk = triangle_gltf()
+    gltf['accessors'][0]['count'] = 50
+
+    with pytest.raises(GLBError, match='runs past its bufferView'):
+        inspect_glb(write_glb(gltf, bin_chunk))
+
+
+def test_external_buffer_rejected():
+    gltf, bin_chunk = triangle_gltf()
+    gltf['buffers'][0]['uri'] = 'model.bin'
+
+    with pytest.raises(GLBError, match='external file'):
+        inspect_glb(write_glb(gltf, bin_chunk))
+
+
+def test_model_without_geometry():
+    gltf, bin_chunk = triangle_gltf()
+    gltf['meshes'][0]['primitives'][0]['attributes'] = {}
+
+    with pytest.raises(GLBError, match='no mesh geometry'):
+        inspect_glb(write_glb(gltf, bin_chunk))
+
+
+def test_missing_count_message():
+    gltf, bin_chunk = triangle_gltf()
+    break_position_count(gltf)
+
+    with pytest.raises(GLBError, match=r"accessors\[0\] is missing 'count'"):
+        inspect_glb(write_glb(gltf, bin_chunk))
@@ -0,0 +1,120 @@
+import json
+import os
+
+import pytest
+
+from glb import ARRAY_BUFFER, FLOAT, UNSIGNED_SHORT, BinBuilder, inspect_glb, parse_glb, write_glb
+from glb_postprocess import QUANTIZATION_EXTENSION, build_lods, lod_path, manifest_path, optimize_glb
+
+
+def grid_glb(size=20):
+    """
+    A wavy size x size grid of quads, with every triangle carrying its own
+    copies of its vertices (as exporters often write them)
+    """
+    positions, normals, uvs, indices = [], [], [], []
+
+    def corner(x, y):
+        return (x / size, y / size, 0.1 * ((x * 7 + y * 3) % 5) / size)
+
+    for x in range(size):
+        for y in range(size):
+            for triangle in (((x, y), (x + 1, y), (x + 1, y + 1)), ((x, y), (x + 1, y + 1), (x, y + 1))):
+                for cx, cy in triangle:
+                    indices.append((len(positions),))
+                    positions.append(corner(cx, cy))
+                    normals.append((0.0, 0.0, 1.0))
+                    uvs.append((cx / size, cy / size))
+
+    builder = BinBuilder()
+    attributes = {
+        'POSITION': builder.add_accessor(positions, FLOAT, 'VEC3', target=ARRAY_BUFFER, bounds=True),
+        'NORMAL': builder.add_accessor(normals, FLOAT, 'VEC3', target=ARRAY_BUFFER),
+        'TEXCOORD_0': builder.add_accessor(uvs, FLOAT, 'VEC2', target=ARRAY_BUFFER)
+    }
+    index_accessor = builder.add_accessor(indices, UNSIGNED_SHORT, 'SCALAR')
+    bin_chunk = builder.finish()
+    gltf = {
+        'asset': {'version': '2.0', 'generator': 'tests'},
+        'buffers': [{'byteLength': len(bin_chunk)}],
+        'bufferViews': builder.buffer_views,
+        'accessors': builder.accessors,
+        'meshes': [{'primitives': [{'attributes': attributes, 'indices': index_accessor}]}],
+        'nodes': [{'mesh': 0, 'translation': [0, 1, 0]}],
+        'scenes': [{'nodes': [0]}]
+    }
+    return write_glb(gltf, bin_chunk)
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    path = tmp_path / 'model.glb'
+    path.write_bytes(grid_glb())
+    return str(path)
+
+
+def test_full_detail_keeps_triangles_and_merges_vertices():
+    data = grid_glb()
+    original = inspect_glb(data)
+
+    optimized, stats = optimize_glb(data, ratio=1.0, quantize=False)
+    info = inspect_glb(optimized)
+
+    assert info['triangles'] == original['triangles'] == stats['triangles'] == 800
+    # 2400 per-triangle copies of the 21 x 21 grid corners
+    assert original['vertices'] == 2400
+    assert info['vertices'] == stats['vertices'] == 441
+    assert info['bbox_min'] == pytest.approx(original['bbox_min'])
+    assert info['bbox_max'] == pytest.approx(original['bbox_max'])
+
+
+def test_lods_parse_and_shrink(model_path):
+    manifest = build_lods(model_path, ratios=(0.1, 1.0, 0.5))
+
+    infos = []
+    for lod in manifest['lods']:
+        path = os.path.join(os.path.dirname(model_path), lod['file'])
+        with open(path, 'rb') as f:
+            info = inspect_glb(f.read())
+        assert (info['triangles'], info['bytes']) == (lod['triangles'], lod['bytes'])
+        infos.append(info)
+
+    assert [lod['ratio'] for lod in manifest['lods']] == [1.0, 0.5, 0.1]
+    triangles = [info['triangles'] for info in infos]
+    assert triangles[0] == 800
+    assert triangles[0] > triangles[1] > triangles[2] > 0
+    assert triangles[1] <= 400 and triangles[2] <= 80
+    assert [info['bytes'] for info in infos] == sorted((info['bytes'] for info in infos), reverse=True)
+    # Quantization moves the mesh, not the model: the bounds stay put
+    for info in infos:
+        assert info['bbox_min'] == pytest.approx(infos[0]['bbox_min'], abs=0.01)
+        assert info['bbox_max'] == pytest.approx(infos[0]['bbox_max'], abs=0.01)
+
+
+def test_quantized_lods_declare_khr_mesh_quantization(model_path):
+    build_lods(model_path, ratios=(1.0,))
+    with open(lod_path(model_path, 1.0), 'rb') as f:
+        gltf, _ = parse_glb(f.read())
+
+    assert QUANTIZATION_EXTENSION in gltf['extensionsUsed']
+    assert QUANTIZATION_EXTENSION in gltf['extensionsRequired']
+    attributes = gltf['meshes'][0]['primitives'][0]['attributes']
+    assert all(gltf['accessors'][index]['componentType'] != FLOAT for index in attributes.values())
+
+    build_lods(model_path, ratios=(1.0,), quantize=False)
+    with open(lod_path(model_path, 1.0), 'rb') as f:
+        gltf, _ = parse_glb(f.read())
+    assert QUANTIZATION_EXTENSION not in gltf.get('extensionsUsed', [])
+    assert gltf['accessors'][attributes['POSITION']]['componentType'] == FLOAT
+
+
+def test_manifest_written_next_to_model(model_path):
+    manifest = build_lods(model_path, ratios=(1.0, 0.5))
+
+    with open(manifest_path(model_path)) as f:
+        assert json.load(f) == manifest
+    assert manifest_path(model_path).endswith('model.lods.json')
+    assert manifest['source'] == 'model.glb'
+    assert manifest['bytes'] == os.path.getsize(model_path)
+    assert [lod['file'] for lod in manifest['lods']] == ['model.lod100.glb', 'model.lod50.glb']
+    assert not [name for name in os.listdir(os.path.dirname(model_path)) if name.endswith('.part')]
@@ -0,0 +1,104 @@
+import pytest
+
+from history import GenerationHistory, InvalidCursor
+
+
+@pytest.fixture
+def history(tmp_path):
+    return GenerationHistory(str(tmp_path / 'history.db'))
+
+
+def add(history, n, prompt=None, created_at=None):
+    history.add(
+        f'image-{n}', prompt or f'prompt {n}', f'/static/generated_images/{n}.png',
+        f'static/generated_images/{n}.png', created_at=created_at or 1000.0 + n
+    )
+
+
+def image_ids(items):
+    return [item['image_id'] for item in items]
+
+
+def test_cursor_pages_are_stable_across_inserts(history):
+    for n in range(1, 6):
+        add(history, n)
+
+    first, cursor = history.page(limit=2)
+    assert image_ids(first) == ['image-5', 'image-4']
+
+    # Rows added meanwhile go to the top, they don't shift the next page
+    add(history, 6)
+    add(history, 7)
+    second, cursor = history.page(cursor, limit=2)
+    assert image_ids(second) == ['image-3', 'image-2']
+
+    last, cursor = history.page(cursor, limit=2)
+    assert image_ids(last) == ['image-1']
+    assert cursor is None
+
+
+def test_invalid_cursor(history):
+    with pytest.raises(InvalidCursor):
+        history.page('not-a-cursor')
+
+
+def test_date_range_is_since_inclusive_until_exclusive(history):
+    for n in range(1, 6):
+        add(history, n, created_at=n * 100.0)
+
+    items, cursor = history.page(since=200, until=500)
+    assert image_ids(items) == ['image-4', 'image-3', 'image-2']
+    assert cursor is None
+
+    items, cursor = history.page(since=200, until=500, limit=2)
+    assert image_ids(items) == ['image-4', 'image-3']
+    assert image_ids(history.page(cursor, since=200, until=500, limit=2)[0]) == ['image-2']
+
+    assert history.page(since=600) == ([], None)
+    assert history.page(until=100) == ([], None)
+
+
+@pytest.fixture(params=['fts5', 'like'])
+def search_history(request, history):
+    if request.param == 'fts5':
+        if not history.fts:
+            pytest.skip('SQLite built without FTS5')
+    else:
+        history.fts = False
+    for n, prompt in enumerate([
+        'A red dragon on a castle',
+        'Blue dragonfly',
+        'red_car toy',
+        'redXcar toy',
+        'A castle in the snow'
+    ], start=1):
+        add(history, n, prompt=prompt)
+    return history
+
+
+def test_search_matches_every_word(search_history):
+    assert image_ids(search_history.page(query='castle')[0]) == ['image-5', 'image-1']
+    assert image_ids(search_history.page(query='red castle')[0]) == ['image-1']
+    # Both word-prefix (FTS) and substring (LIKE) matching find prefixes
+    assert image_ids(search_history.page(query='drag')[0]) == ['image-2', 'image-1']
+
+
+def test_search_wildcards_are_literal(search_history):
+    # '_' would match any character in an unescaped LIKE pattern
+    assert image_ids(search_history.page(query='red_car')[0]) == ['image-3']
+    assert search_history.page(query='%')[0] == search_history.page()[0]
+
+
+def test_search_pages_with_cursor_and_date_range(search_history):
+    items, cursor = search_history.page(query='toy', limit=1)
+    assert image_ids(items) == ['image-4']
+    assert image_ids(search_history.page(cursor, query='toy', limit=1)[0]) == ['image-3']
+
+    items, _ = search_history.page(query='dragon', since=1002)
+    assert image_ids(items) == ['image-2']
+
+
+def test_fts_matches_word_prefixes_like_any_substring(search_history):
+    expected = [] if search_history.fts else ['image-2', 'image-1']
+    assert image_ids(search_history.page(query='agon')[0]) == expected
+    assert search_history.stats()['search'] == ('fts5' if search_history.fts else 'like')
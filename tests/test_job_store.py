@@ -0,0 +1,181 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from db import connect
+from job_store import JobStore, QueuedJobStore
+from jobs import Job, LeaseLostError
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'jobs.db')
+
+
+def new_job(kind='convert-to-3d', **params):
+    return Job(kind, params).to_dict()
+
+
+def finish(store, job_data):
+    store.save(dict(job_data, status='completed', result={'model_url': '/static/model.glb'}))
+
+
+def test_create_and_get_round_trip(db_path):
+    store = JobStore(db_path, owner='worker-a')
+    job_data = new_job(image_path='cat.png')
+
+    assert store.create(job_data) is None
+
+    stored = store.get(job_data['job_id'])
+    assert stored['params'] == {'image_path': 'cat.png'}
+    assert stored['owner'] == 'worker-a'
+    assert stored['status'] == 'queued'
+
+
+def test_create_returns_active_job_with_same_dedupe_key(db_path):
+    first = new_job()
+    JobStore(db_path, owner='worker-a').create(first, dedupe_key='convert:abc')
+
+    # Another worker asking for the same work joins the running job
+    other = JobStore(db_path, owner='worker-b')
+    existing = other.create(new_job(), dedupe_key='convert:abc')
+
+    assert existing['job_id'] == first['job_id']
+    assert other.unfinished() == [existing]
+
+
+def test_dedupe_key_is_free_again_once_job_finished(db_path):
+    store = JobStore(db_path)
+    first = new_job()
+    store.create(first, dedupe_key='convert:abc')
+    finish(store, first)
+
+    second = new_job()
+    assert store.create(second, dedupe_key='convert:abc') is None
+    assert store.get(second['job_id'])['status'] == 'queued'
+
+
+def test_concurrent_creates_start_one_job(db_path):
+    JobStore(db_path)
+    jobs = [new_job() for _ in range(8)]
+
+    def create(job_data):
+        return JobStore(db_path).create(job_data, dedupe_key='text-to-3d:castle')
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(create, jobs))
+
+    started = [job_data for job_data, existing in zip(jobs, results) if existing is None]
+    assert len(started) == 1
+    assert {existing['job_id'] for existing in results if existing} == {started[0]['job_id']}
+
+
+def test_claim_takes_other_workers_jobs_by_kind(db_path):
+    dead = JobStore(db_path, owner='worker-a')
+    conversion, pipeline = new_job(), new_job('text-to-3d', prompt='castle')
+    dead.create(conversion)
+    dead.create(pipeline)
+
+    alive = JobStore(db_path, owner='worker-b')
+    claimed = alive.claim(kind='convert-to-3d')
+
+    assert [job_data['job_id'] for job_data in claimed] == [conversion['job_id']]
+    assert claimed[0]['owner'] == 'worker-b'
+    assert alive.get(pipeline['job_id'])['owner'] == 'worker-a'
+    # A worker never claims its own rows
+    assert dead.claim(kind='text-to-3d') == []
+
+
+def test_claim_skips_finished_jobs_and_live_leases(db_path):
+    busy = JobStore(db_path, owner='worker-a')
+    done, running = new_job(), new_job()
+    busy.create(done)
+    busy.create(running)
+    finish(busy, done)
+    busy.heartbeat()
+
+    other = JobStore(db_path, owner='worker-b')
+    assert other.claim(stale_after=60) == []
+    assert [job_data['job_id'] for job_data in other.claim(stale_after=0)] == [running['job_id']]
+
+
+def test_expired_lease_hands_each_job_to_one_claimant(db_path):
+    JobStore(db_path, owner='worker-a').create(new_job())
+    with connect(db_path) as conn:
+        # worker-a went silent long ago
+        conn.execute("UPDATE jobs SET heartbeat = ?", (time.time() - 3600,))
+    claimants = [JobStore(db_path, owner=f'worker-{n}') for n in range(1, 7)]
+
+    with ThreadPoolExecutor(max_workers=len(claimants)) as pool:
+        claimed = list(pool.map(lambda store: store.claim(stale_after=60), claimants))
+
+    assert sum(len(jobs) for jobs in claimed) == 1
+
+
+def test_claim_returns_oldest_first(db_path):
+    store = JobStore(db_path, owner='worker-a')
+    jobs = []
+    for _ in range(3):
+        jobs.append(new_job())
+        time.sleep(0.001)
+    for job_data in reversed(jobs):
+        store.create(job_data)
+
+    claimed = JobStore(db_path, owner='worker-b').claim()
+
+    assert [job_data['job_id'] for job_data in claimed] == [job_data['job_id'] for job_data in jobs]
+
+
+def test_pushed_status_reaches_the_owner_once(db_path):
+    owner = JobStore(db_path, owner='worker-a')
+    job_data = dict(new_job(), task_id='task-1')
+    owner.create(job_data)
+
+    assert JobStore(db_path, owner='worker-b').push_status('task-1', {'status': 'SUCCEEDED'}) == 1
+
+    assert owner.take_pushed() == [('task-1', {'status': 'SUCCEEDED'})]
+    assert owner.take_pushed() == []
+
+
+def test_save_after_losing_the_lease_writes_nothing(db_path):
+    slow = JobStore(db_path, owner='worker-a')
+    job_data = new_job()
+    slow.create(job_data)
+    with connect(db_path) as conn:
+        conn.execute("UPDATE jobs SET heartbeat = ?", (time.time() - 3600,))
+    JobStore(db_path, owner='worker-b').claim(stale_after=60)
+
+    # worker-a's next progress save must not take the row back
+    assert slow.save(dict(job_data, status='running', progress=40)) is False
+
+    stored = slow.get(job_data['job_id'])
+    assert stored['owner'] == 'worker-b'
+    assert stored['status'] == 'queued'
+
+
+def test_job_update_raises_once_lease_is_lost(db_path):
+    store = JobStore(db_path, owner='worker-a')
+    job = Job('convert-to-3d', {}, store)
+    store.create(job.to_dict())
+    job.update(progress=10)
+    JobStore(db_path, owner='worker-b').claim()
+
+    with pytest.raises(LeaseLostError):
+        job.update(progress=20)
+    with pytest.raises(LeaseLostError):
+        job.check_lease()
+    assert store.get(job.id)['progress'] == 10
+
+
+def test_queued_store_reports_lost_lease_on_next_save(db_path):
+    store = JobStore(db_path, owner='worker-a')
+    queued = QueuedJobStore(store)
+    job_data = new_job()
+    store.create(job_data)
+    JobStore(db_path, owner='worker-b').claim()
+
+    assert queued.save(dict(job_data, progress=20)) is True
+    queued.flush()
+    assert queued.save(dict(job_data, progress=30)) is False
+    assert store.get(job_data['job_id'])['owner'] == 'worker-b'
@@ -0,0 +1,129 @@
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+from job_store import JobStore
+from jobs import JobQueue
+
+
+@pytest.fixture
+def queue():
+    queue = JobQueue(max_workers=2)
+    yield queue
+    queue._executor.shutdown(wait=True)
+
+
+def finished(job):
+    assert job.wait(5)
+    return job
+
+
+def test_then_runs_dependent_on_parent_result(queue):
+    upstream = Future()
+    ran_on = []
+
+    def download(status):
+        ran_on.append(threading.current_thread().name)
+        return {'model_url': status['model_urls']['glb']}
+
+    job = queue.submit('convert-to-3d', lambda job: queue.then(upstream, download))
+    assert not job.wait(0.05)
+    assert job.status == 'running'
+
+    upstream.set_result({'model_urls': {'glb': '/static/model.glb'}})
+
+    assert finished(job).status == 'succeeded'
+    assert job.result == {'model_url': '/static/model.glb'}
+    assert ran_on[0].startswith('job-worker')
+
+
+def test_failed_parent_fails_every_dependent(queue):
+    upstream = Future()
+    calls = []
+
+    def chain(job):
+        converted = queue.then(upstream, lambda status: calls.append('download') or status)
+        return queue.then(converted, lambda status: calls.append('index') or status)
+
+    job = queue.submit('convert-to-3d', chain)
+    upstream.set_exception(RuntimeError('3D conversion failed: Image has no subject'))
+
+    assert finished(job).status == 'failed'
+    assert job.error == '3D conversion failed: Image has no subject'
+    assert calls == []
+
+
+def test_failing_dependent_fails_the_job(queue):
+    upstream = Future()
+
+    def download(status):
+        raise IOError('Model download interrupted')
+
+    job = queue.submit('convert-to-3d', lambda job: queue.then(upstream, download))
+    upstream.set_result({'status': 'SUCCEEDED'})
+
+    assert finished(job).status == 'failed'
+    assert job.error == 'Model download interrupted'
+
+
+def test_restored_job_resumes_from_stored_task_id(tmp_path):
+    db_path = str(tmp_path / 'jobs.db')
+    crashed = JobQueue(max_workers=1, store=JobStore(db_path, owner='worker-a'))
+    task_created = threading.Event()
+
+    def first_run(job):
+        job.update(task_id='meshy-task-1', progress=40)
+        task_created.set()
+        # The worker dies while Meshy is still working
+        return Future()
+
+    original = crashed.submit('convert-to-3d', first_run, params={'image_path': 'cat.png'})
+    assert task_created.wait(5)
+
+    store = JobStore(db_path, owner='worker-b')
+    queue = JobQueue(max_workers=1, store=store)
+    [job_data] = store.claim(stale_after=0)
+    resumed_from = []
+
+    def resume(job, image_path):
+        resumed_from.append((job.task_id, job.progress, image_path))
+        return {'model_url': '/static/model.glb'}
+
+    job = queue.restore(job_data, resume, job_data['params']['image_path'])
+
+    assert finished(job).id == original.id
+    assert resumed_from == [('meshy-task-1', 40, 'cat.png')]
+    stored = store.get(original.id)
+    assert (stored['status'], stored['task_id'], stored['owner']) == ('succeeded', 'meshy-task-1', 'worker-b')
+    crashed._executor.shutdown(wait=False)
+    queue._executor.shutdown(wait=True)
+
+
+class LosingStore:
+    """
+    A store that has handed the job to another worker after its first save
+    """
+
+    def __init__(self):
+        self.saves = 0
+
+    def create(self, job_data, dedupe_key=None):
+        return None
+
+    def save(self, job_data):
+        self.saves += 1
+        return self.saves == 1
+
+
+def test_job_taken_over_by_another_worker_is_dropped():
+    queue = JobQueue(max_workers=1, store=LosingStore())
+    ran = []
+
+    job = queue.submit('convert-to-3d', lambda job: ran.append(job.id) or job.update(progress=10))
+
+    assert job.wait(5)
+    assert job.lost and job.status == 'running'
+    assert not queue.is_local(job.id)
+    assert ran == [job.id]
+    queue._executor.shutdown(wait=True)
@@ -0,0 +1,217 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import meshy_poller
+from meshy_poller import AsyncMeshyPoller, MeshyPoller, MeshyTaskError
+
+
+IN_PROGRESS = {'status': 'IN_PROGRESS', 'progress': 50}
+SUCCEEDED = {'status': 'SUCCEEDED', 'progress': 100, 'model_urls': {'glb': 'https://assets.meshy.test/model.glb'}}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(meshy_poller, 'time', SimpleNamespace(monotonic=clock))
+    return clock
+
+
+class StubMeshy:
+    """
+    fetch_status() answering from a script of replies per task (the last one
+    repeats; exceptions are raised), held while `gate` is clear
+    """
+
+    def __init__(self, clock, replies):
+        self.clock = clock
+        self.replies = replies
+        self.fetches = []
+        self.gate = threading.Event()
+        self.gate.set()
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def fetch_status(self, task_id):
+        with self._lock:
+            self.fetches.append((task_id, self.clock.now))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            assert self.gate.wait(5)
+            script = self.replies[task_id]
+            reply = script.pop(0) if len(script) > 1 else script[0]
+        finally:
+            with self._lock:
+                self.active -= 1
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+
+def make_poller(stub, **kwargs):
+    settings = dict(min_interval=2, max_interval=15, jitter=0, timeout=300, fetch_workers=2)
+    settings.update(kwargs)
+    return MeshyPoller(stub.fetch_status, **settings)
+
+
+def advance(clock, poller, seconds):
+    # The scheduler sleeps on its condition in real time: wake it to look at the new time
+    clock.now += seconds
+    with poller._condition:
+        poller._condition.notify_all()
+
+
+def scheduled(poller):
+    with poller._condition:
+        return {task_id: due for due, _, task_id in poller._schedule}
+
+
+def eventually(predicate, timeout=2.0):
+    deadline = time.time() + timeout
+    while not predicate():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_polls_each_task_when_due_at_a_progress_adaptive_interval(clock):
+    stub = StubMeshy(clock, {'a': [IN_PROGRESS, SUCCEEDED], 'b': [RuntimeError('502 Bad Gateway'), IN_PROGRESS]})
+    poller = make_poller(stub)
+
+    done = poller.track('a')
+    clock.now += 5
+    poller.track('b')
+    # First poll after max_interval: nothing is known about progress yet
+    assert scheduled(poller) == {'a': 1015, 'b': 1020}
+
+    advance(clock, poller, 10)
+    eventually(lambda: scheduled(poller).get('a') == 1023.5)
+    # 50% done: halfway between max_interval and min_interval
+    assert stub.fetches == [('a', 1015)]
+
+    advance(clock, poller, 5)
+    # A failed fetch backs off from min_interval instead
+    eventually(lambda: scheduled(poller) == {'a': 1023.5, 'b': 1024})
+    assert stub.fetches == [('a', 1015), ('b', 1020)]
+
+    advance(clock, poller, 3.5)
+    assert done.result(2) == SUCCEEDED
+    assert stub.fetches[-1] == ('a', 1023.5)
+    assert poller.in_flight() == 1
+    assert poller.polls == 3
+
+
+def test_fetches_run_on_a_bounded_pool(clock):
+    task_ids = [f'task-{n}' for n in range(5)]
+    stub = StubMeshy(clock, {task_id: [SUCCEEDED] for task_id in task_ids})
+    poller = make_poller(stub, fetch_workers=2)
+    stub.gate.clear()
+
+    futures = [poller.track(task_id) for task_id in task_ids]
+    advance(clock, poller, 15)
+    eventually(lambda: stub.active == 2)
+    time.sleep(0.05)
+    assert len(stub.fetches) == 2
+
+    stub.gate.set()
+    assert [future.result(2) for future in futures] == [SUCCEEDED] * 5
+    assert stub.max_active == 2
+    assert len(stub.fetches) == 5
+
+
+def test_pushed_status_settles_without_polling(clock):
+    stub = StubMeshy(clock, {'a': [IN_PROGRESS]})
+    poller = make_poller(stub)
+    progress = []
+
+    done = poller.track('a', on_progress=progress.append)
+    assert poller.push('a', {'status': 'IN_PROGRESS', 'progress': 40})
+    assert progress == [40] and not done.done()
+
+    assert poller.push('a', SUCCEEDED)
+    assert done.result(0) == SUCCEEDED
+    assert progress == [40, 100]
+    assert poller.in_flight() == 0
+    assert not poller.push('a', SUCCEEDED)
+
+    # The poll that was scheduled finds nothing left to do
+    advance(clock, poller, 15)
+    time.sleep(0.05)
+    assert stub.fetches == []
+    assert (poller.polls, poller.pushes) == (0, 2)
+
+
+def test_poll_answered_after_a_push_is_ignored(clock):
+    stub = StubMeshy(clock, {'a': [{'status': 'FAILED', 'task_error': {'message': 'stale'}}]})
+    poller = make_poller(stub)
+    stub.gate.clear()
+
+    done = poller.track('a')
+    advance(clock, poller, 15)
+    eventually(lambda: stub.active == 1)
+    poller.push('a', SUCCEEDED)
+    stub.gate.set()
+
+    assert done.result(2) == SUCCEEDED
+    eventually(lambda: stub.active == 0)
+    assert scheduled(poller) == {}
+
+
+def test_failed_and_timed_out_tasks(clock):
+    stub = StubMeshy(clock, {
+        'failed': [{'status': 'FAILED', 'task_error': {'message': 'Image has no subject'}}],
+        'slow': [{'status': 'IN_PROGRESS', 'progress': 0}]
+    })
+    poller = make_poller(stub, timeout=20)
+
+    failed = poller.track('failed')
+    slow = poller.track('slow')
+    advance(clock, poller, 15)
+    with pytest.raises(MeshyTaskError, match='3D conversion failed: Image has no subject'):
+        failed.result(2)
+
+    # The next poll is moved up to the deadline, and fails the task when it isn't done by then
+    eventually(lambda: scheduled(poller) == {'slow': 1020})
+    advance(clock, poller, 5)
+    with pytest.raises(MeshyTaskError, match='timed out after 20 seconds'):
+        slow.result(2)
+    assert [task_id for task_id, _ in stub.fetches] == ['failed', 'slow', 'slow']
+
+
+def test_async_poller_follows_progress_and_pushes():
+    replies = {'a': [IN_PROGRESS, SUCCEEDED], 'b': [IN_PROGRESS]}
+    fetches = []
+
+    async def fetch_status(task_id):
+        fetches.append(task_id)
+        return replies[task_id].pop(0) if len(replies[task_id]) > 1 else replies[task_id][0]
+
+    async def scenario():
+        poller = AsyncMeshyPoller(fetch_status, min_interval=0.01, max_interval=0.02, jitter=0)
+        progress = []
+        polled = poller.track('a', on_progress=progress.append)
+        pushed = poller.track('b')
+        poller.push('b', SUCCEEDED)
+
+        assert await asyncio.wait_for(polled, 2) == SUCCEEDED
+        assert await pushed == SUCCEEDED
+        await asyncio.sleep(0.05)
+        return poller, progress
+
+    poller, progress = asyncio.run(scenario())
+
+    assert fetches == ['a', 'a']
+    assert progress == [50, 100]
+    assert poller.in_flight() == 0
@@ -0,0 +1,120 @@
+import io
+import logging
+import os
+import time
+
+import pytest
+
+from logging_setup import configure_logging
+from metrics import Counter, Gauge, Histogram, Registry, SharedMetrics
+
+
+def make_metrics():
+    registry = Registry()
+    requests = Counter('requests_total', 'Requests', ['route'], registry=registry)
+    depth = Gauge('queue_depth', 'Queued jobs', registry=registry)
+    latency = Histogram('latency_seconds', 'Latency', buckets=(0.1, 1), registry=registry)
+    return registry, requests, depth, latency
+
+
+def test_render_exposition_format():
+    registry, requests, depth, latency = make_metrics()
+    requests.inc(route='/api/generate-image')
+    depth.set_function(lambda: 3)
+    latency.observe(0.5)
+
+    text = registry.render()
+
+    assert '# TYPE requests_total counter\nrequests_total{route="/api/generate-image"} 1\n' in text
+    assert 'queue_depth 3\n' in text
+    assert 'latency_seconds_bucket{le="0.1"} 0\n' in text
+    assert 'latency_seconds_bucket{le="1"} 1\n' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 1\n' in text
+    assert 'latency_seconds_count 1\n' in text
+
+
+def test_shared_metrics_sum_every_worker(tmp_path, monkeypatch):
+    # Two worker processes, played by two registries writing to one folder
+    worker_a, requests_a, depth_a, latency_a = make_metrics()
+    worker_b, requests_b, depth_b, latency_b = make_metrics()
+    requests_a.inc(2, route='/api/convert-to-3d')
+    requests_b.inc(5, route='/api/convert-to-3d')
+    requests_b.inc(route='/api/health')
+    depth_a.set(1)
+    depth_b.set(4)
+    latency_a.observe(0.05)
+    latency_b.observe(2)
+
+    shared_b = SharedMetrics(str(tmp_path), registry=worker_b)
+    monkeypatch.setattr(os, 'getpid', lambda: 2)
+    shared_b.dump()
+    monkeypatch.setattr(os, 'getpid', lambda: 1)
+    text = SharedMetrics(str(tmp_path), registry=worker_a).render()
+
+    assert 'requests_total{route="/api/convert-to-3d"} 7\n' in text
+    assert 'requests_total{route="/api/health"} 1\n' in text
+    assert 'queue_depth 5\n' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1\n' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 2\n' in text
+    assert 'latency_seconds_sum 2.05\n' in text
+
+
+def test_stopped_worker_keeps_counters_but_not_gauges(tmp_path, monkeypatch):
+    live, live_requests, live_depth, _ = make_metrics()
+    stopped, stopped_requests, stopped_depth, _ = make_metrics()
+    live_requests.inc(route='/')
+    stopped_requests.inc(3, route='/')
+    live_depth.set(2)
+    stopped_depth.set(9)
+
+    monkeypatch.setattr(os, 'getpid', lambda: 2)
+    old = SharedMetrics(str(tmp_path), registry=stopped)
+    old.dump()
+    an_hour_ago = time.time() - 3600
+    os.utime(old.path(), (an_hour_ago, an_hour_ago))
+
+    monkeypatch.setattr(os, 'getpid', lambda: 1)
+    shared = SharedMetrics(str(tmp_path), registry=live, gauge_max_age=60)
+    text = shared.render()
+
+    assert 'requests_total{route="/"} 4\n' in text
+    assert 'queue_depth 2\n' in text
+
+    # Past retain_seconds the file is dropped altogether
+    shared.retain_seconds = 60
+    text = shared.render()
+    assert 'requests_total{route="/"} 1\n' in text
+    assert not os.path.exists(old.path())
+
+
+@pytest.fixture
+def root_logger():
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield root
+    root.handlers[:] = handlers
+    root.setLevel(level)
+
+
+def test_configure_logging_keeps_other_handlers(root_logger):
+    existing = logging.NullHandler()
+    root_logger.addHandler(existing)
+    first, second = io.StringIO(), io.StringIO()
+
+    configure_logging('INFO', stream=first)
+    configure_logging('INFO', log_format='json', stream=second)
+    logging.getLogger('backend').info("🎨 hello", extra={'job_id': 'j1'})
+
+    assert existing in root_logger.handlers
+    # The second call replaced the handler of the first rather than adding another
+    assert first.getvalue() == ''
+    assert '"job_id": "j1"' in second.getvalue()
+
+
+def test_configure_logging_replace(root_logger):
+    root_logger.addHandler(logging.NullHandler())
+
+    configure_logging('WARNING', stream=io.StringIO(), replace=True)
+
+    assert len(root_logger.handlers) == 1
+    assert root_logger.level == logging.WARNING
@@ -0,0 +1,209 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from types import SimpleNamespace
+
+import pytest
+
+import rate_limit
+from rate_limit import (
+    BATCH, INTERACTIVE, RateLimiter, RateLimitTimeout, parse_limits, parse_retry_after, request_priority
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    # Replaces the module's reference only: the asyncio event loop keeps the real clock
+    monkeypatch.setattr(rate_limit, 'time', SimpleNamespace(monotonic=clock, time=time.time))
+    return clock
+
+
+def advance(clock, limiter, seconds):
+    # Waiting threads sleep on the condition in real time: wake them to look at the new time
+    clock.now += seconds
+    with limiter._condition:
+        limiter._condition.notify_all()
+
+
+def eventually(predicate, timeout=2.0):
+    deadline = time.time() + timeout
+    while not predicate():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+class Waiter(threading.Thread):
+    """
+    acquire() on a thread, at the priority set through request_priority
+    """
+
+    def __init__(self, limiter, name, priority=INTERACTIVE, served=None):
+        super().__init__(daemon=True)
+        self.limiter, self.name_, self.priority = limiter, name, priority
+        self.served = served if served is not None else []
+        self.waited = None
+        self.start()
+
+    def run(self):
+        with request_priority(self.priority):
+            self.waited = self.limiter.acquire(self.name_)
+        self.served.append(self.priority)
+
+
+def waiting(limiter, name):
+    return limiter.stats()[name]['waiting']
+
+
+def test_burst_then_refill_at_rate(clock):
+    limiter = RateLimiter({'meshy:status': (2, 2)})
+
+    assert limiter.acquire('meshy:status') == 0.0
+    assert limiter.acquire('meshy:status') == 0.0
+
+    waiter = Waiter(limiter, 'meshy:status')
+    eventually(lambda: waiting(limiter, 'meshy:status') == 1)
+    advance(clock, limiter, 0.25)
+    time.sleep(0.02)
+    assert waiter.is_alive()
+
+    # One token every 1 / rate seconds
+    advance(clock, limiter, 0.25)
+    waiter.join(2)
+    assert waiter.waited == 0.5
+
+
+def test_idle_credit_is_capped_at_burst(clock):
+    limiter = RateLimiter({'openai:generation': (1, 3)})
+    for _ in range(3):
+        limiter.acquire('openai:generation')
+
+    clock.now += 100
+    for _ in range(3):
+        assert limiter.acquire('openai:generation') == 0.0
+
+    waiter = Waiter(limiter, 'openai:generation')
+    eventually(lambda: waiting(limiter, 'openai:generation') == 1)
+    advance(clock, limiter, 1)
+    waiter.join(2)
+    assert waiter.waited == 1
+
+
+def test_interactive_call_overtakes_queued_batch_call(clock):
+    limiter = RateLimiter({'meshy:create': (1, 1)})
+    limiter.acquire('meshy:create')
+    served = []
+
+    batch = Waiter(limiter, 'meshy:create', BATCH, served)
+    eventually(lambda: waiting(limiter, 'meshy:create') == 1)
+    interactive = Waiter(limiter, 'meshy:create', INTERACTIVE, served)
+    eventually(lambda: waiting(limiter, 'meshy:create') == 2)
+
+    advance(clock, limiter, 1)
+    interactive.join(2)
+    time.sleep(0.02)
+    assert served == [INTERACTIVE]
+
+    advance(clock, limiter, 1)
+    batch.join(2)
+    assert served == [INTERACTIVE, BATCH]
+
+
+def test_penalize_delays_next_acquire_by_retry_after(clock):
+    limiter = RateLimiter({'openai:generation': (10, 5)})
+    limiter.acquire('openai:generation')
+
+    assert limiter.penalize('openai:generation', parse_retry_after('30'))
+    assert limiter.stats()['openai:generation']['paused_for'] == 30
+    assert limiter.stats()['openai:generation']['throttled'] == 1
+
+    waiter = Waiter(limiter, 'openai:generation')
+    eventually(lambda: waiting(limiter, 'openai:generation') == 1)
+    advance(clock, limiter, 29)
+    time.sleep(0.02)
+    assert waiter.is_alive()
+
+    advance(clock, limiter, 1)
+    waiter.join(2)
+    assert waiter.waited == 30
+
+
+def test_only_one_call_right_after_a_pause(clock):
+    limiter = RateLimiter({'meshy:status': (1, 5)})
+    limiter.penalize('meshy:status', 10)
+
+    clock.now += 10
+    assert limiter.acquire('meshy:status') == 0.0
+    # No credit built up during the pause
+    with pytest.raises(RateLimitTimeout):
+        limiter.acquire('meshy:status', timeout=0)
+    assert waiting(limiter, 'meshy:status') == 0
+
+
+def test_unlimited_names_pass_and_penalize_reports_it(clock):
+    limiter = RateLimiter({'meshy:status': (1, 1)})
+
+    assert limiter.acquire('assets:download') == 0.0
+    assert not limiter.penalize('assets:download', 5)
+    assert limiter.stats()['meshy:status']['throttled'] == 0
+
+
+def test_async_waiters_follow_priority_and_pause(clock):
+    limiter = RateLimiter({'meshy:create': (10, 1)})
+    limiter.acquire('meshy:create')
+    served = []
+
+    async def call(priority):
+        with request_priority(priority):
+            waited = await limiter.acquire_async('meshy:create', recheck_interval=0.01)
+        served.append(priority)
+        return waited
+
+    async def scenario():
+        batch = asyncio.create_task(call(BATCH))
+        await asyncio.sleep(0.02)
+        interactive = asyncio.create_task(call(INTERACTIVE))
+        await asyncio.sleep(0.02)
+        assert served == []
+
+        clock.now += 0.1
+        assert await interactive == pytest.approx(0.1)
+        await asyncio.sleep(0.02)
+        assert served == [INTERACTIVE]
+
+        limiter.penalize('meshy:create', 0.2)
+        clock.now += 0.1
+        await asyncio.sleep(0.05)
+        assert not batch.done()
+        clock.now += 0.1
+        await batch
+        assert served == [INTERACTIVE, BATCH]
+
+    asyncio.run(scenario())
+
+
+def test_parse_retry_after():
+    assert parse_retry_after('7') == 7.0
+    assert parse_retry_after('-3') == 0.0
+    assert parse_retry_after(None, default=2.0) == 2.0
+    assert parse_retry_after('soon', default=2.0) == 2.0
+
+    later = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=60), usegmt=True)
+    assert 55 <= parse_retry_after(later) <= 60
+
+
+def test_parse_limits():
+    assert parse_limits('openai:generation=0.5/5, meshy:status=10') == {
+        'openai:generation': (0.5, 5.0),
+        'meshy:status': (10.0, 10.0)
+    }
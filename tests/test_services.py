@@ -0,0 +1,84 @@
+import os
+from concurrent.futures import Future
+
+import pytest
+
+from jobs import Job
+
+config = pytest.importorskip('text_to_3d.config')
+services_module = pytest.importorskip('text_to_3d.services')
+
+
+@pytest.fixture
+def services(tmp_path):
+    static = tmp_path / 'static'
+    settings = config.load_config({
+        'STATIC_FOLDER': str(static),
+        'UPLOAD_FOLDER': str(static / 'generated_images'),
+        'MODELS_FOLDER': str(static / '3d_models'),
+        'DERIVATIVES_FOLDER': str(static / 'derivatives'),
+        'DATA_FOLDER': str(tmp_path / 'data'),
+        'STORAGE_BACKEND': 'local'
+    })
+    services = services_module.Services(settings).start(background=False)
+    yield services
+    services.derivative_executor.shutdown()
+
+
+def test_local_image_path_inside_asset_folders(services):
+    key, path = services.asset_store.allocate('generated_images', 'image.png')
+    with open(path, 'wb') as f:
+        f.write(b'png')
+
+    assert services.local_image_path(path) == path
+    assert os.path.samefile(services.local_image_path(services.image_url_for(path)), path)
+
+
+@pytest.mark.parametrize('outside', [
+    '/etc/passwd',
+    '/static/../../etc/passwd',
+    'static/generated_images/../../../../etc/passwd'
+])
+def test_local_image_path_rejects_other_files(services, outside):
+    assert services.local_image_path(outside) is None
+
+
+def test_local_image_path_rejects_symlink_out(services, tmp_path):
+    secret = tmp_path / 'secret.txt'
+    secret.write_text('api key')
+    link = os.path.join(services.config['UPLOAD_FOLDER'], 'innocent.png')
+    os.symlink(secret, link)
+
+    assert services.local_image_path(link) is None
+    assert services.prepare_conversion(link) == (link, None, None)
+
+
+class StubPoller:
+    def __init__(self):
+        self.tracked = []
+
+    def track(self, task_id, on_progress=None, timeout=None):
+        self.tracked.append(task_id)
+        future = Future()
+        future.set_result({'status': 'SUCCEEDED', 'model_urls': {'glb': 'https://assets.meshy.test/model.glb'}})
+        return future
+
+
+def test_restored_conversion_polls_its_stored_meshy_task(services, monkeypatch):
+    def create_meshy_task(image_path):
+        raise AssertionError("a restored job must not pay for a new Meshy task")
+
+    monkeypatch.setattr(services, 'create_meshy_task', create_meshy_task)
+    monkeypatch.setattr(services, 'download_meshy_model', lambda status_data: '/static/3d_models/model.glb')
+    monkeypatch.setattr(services, 'remember_model', lambda image_hash, model_url, image_path: None)
+    services.meshy_poller = StubPoller()
+    job_data = Job('convert-to-3d', {'image_path': 'cat.png', 'image_hash': 'abc'}).to_dict()
+    job_data.update(status='running', task_id='meshy-task-1')
+
+    assert services.restore_jobs([job_data]) == 1
+
+    job = services.job_queue.get(job_data['job_id'])
+    assert job.wait(5)
+    assert job.status == 'succeeded'
+    assert job.result == {'model_url': '/static/3d_models/model.glb'}
+    assert services.meshy_poller.tracked == ['meshy-task-1']
@@ -0,0 +1,177 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from singleflight import AsyncSingleFlight, SingleFlight
+
+
+class Call:
+    """
+    A blocking upstream call that waits for `finish` and counts its runs
+    """
+
+    def __init__(self, error=None):
+        self.error = error
+        self.runs = 0
+        self.started = threading.Event()
+        self.finish = threading.Event()
+
+    def __call__(self, value):
+        self.runs += 1
+        self.started.set()
+        assert self.finish.wait(5)
+        if self.error:
+            raise self.error
+        return value * 2
+
+
+def run_concurrently(flight, call, callers=5):
+    """
+    One leading do() plus callers - 1 joining it while it runs; returns the
+    (result, shared) or exception of each caller
+    """
+    outcomes = []
+
+    def caller():
+        try:
+            outcomes.append(flight.do('image-hash', call, 21))
+        except Exception as e:
+            outcomes.append(e)
+
+    threads = [threading.Thread(target=caller)]
+    threads[0].start()
+    assert call.started.wait(5)
+    threads += [threading.Thread(target=caller) for _ in range(callers - 1)]
+    for thread in threads[1:]:
+        thread.start()
+    # Let the followers reach the in-flight call before it finishes
+    time.sleep(0.05)
+    call.finish.set()
+    for thread in threads:
+        thread.join(5)
+    return outcomes
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    call = Call()
+
+    outcomes = run_concurrently(flight, call)
+
+    assert call.runs == 1
+    assert sorted(outcomes) == [(42, False)] + [(42, True)] * 4
+    assert flight.in_flight() == 0
+
+
+def test_exception_reaches_every_waiter_and_key_is_released():
+    flight = SingleFlight()
+    call = Call(error=RuntimeError('Meshy AI is down'))
+
+    outcomes = run_concurrently(flight, call)
+
+    assert call.runs == 1
+    assert len(outcomes) == 5
+    assert all(isinstance(outcome, RuntimeError) for outcome in outcomes)
+    assert flight.in_flight() == 0
+
+    # The failure isn't cached: the next call runs again
+    call.error = None
+    assert flight.do('image-hash', call, 1) == (2, False)
+    assert call.runs == 2
+
+
+def test_share_hands_out_one_handle_until_done():
+    flight = SingleFlight()
+    started = []
+
+    def start():
+        started.append(Future())
+        return started[-1]
+
+    first, shared_first = flight.share('prompt', start)
+    second, shared_second = flight.share('prompt', start)
+
+    assert first is second
+    assert (shared_first, shared_second) == (False, True)
+    assert flight.in_flight() == 1
+
+    first.set_result('job done')
+    assert flight.in_flight() == 0
+    third, shared_third = flight.share('prompt', start)
+    assert third is not first and not shared_third
+    assert len(started) == 2
+
+
+def test_keys_do_not_share():
+    flight = SingleFlight()
+
+    assert flight.do('a', lambda: 'A') == ('A', False)
+    assert flight.do('b', lambda: 'B') == ('B', False)
+
+
+def test_async_callers_share_one_run():
+    flight = AsyncSingleFlight()
+    runs = []
+
+    async def convert(value, finish):
+        runs.append(value)
+        await finish.wait()
+        return value * 2
+
+    async def scenario():
+        finish = asyncio.Event()
+        callers = [asyncio.create_task(flight.do('image-hash', convert, 21, finish)) for _ in range(5)]
+        await asyncio.sleep(0)
+        assert flight.in_flight() == 1
+        finish.set()
+        return await asyncio.gather(*callers)
+
+    outcomes = asyncio.run(scenario())
+
+    assert runs == [21]
+    assert sorted(outcomes) == [(42, False)] + [(42, True)] * 4
+    assert flight.in_flight() == 0
+
+
+def test_async_exception_reaches_every_waiter():
+    flight = AsyncSingleFlight()
+
+    async def fail(finish):
+        await finish.wait()
+        raise RuntimeError('OpenAI is down')
+
+    async def scenario():
+        finish = asyncio.Event()
+        callers = [asyncio.create_task(flight.do('prompt', fail, finish)) for _ in range(3)]
+        await asyncio.sleep(0)
+        finish.set()
+        return await asyncio.gather(*callers, return_exceptions=True)
+
+    outcomes = asyncio.run(scenario())
+
+    assert len(outcomes) == 3
+    assert all(isinstance(outcome, RuntimeError) for outcome in outcomes)
+    assert flight.in_flight() == 0
+
+
+def test_async_waiter_giving_up_leaves_the_leader_running():
+    flight = AsyncSingleFlight()
+
+    async def convert(finish):
+        await finish.wait()
+        return 'model.glb'
+
+    async def scenario():
+        finish = asyncio.Event()
+        leader = asyncio.create_task(flight.do('image-hash', convert, finish))
+        await asyncio.sleep(0)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(flight.do('image-hash', convert, finish), 0.01)
+        finish.set()
+        return await leader
+
+    assert asyncio.run(scenario()) == ('model.glb', False)
+    assert flight.in_flight() == 0
@@ -0,0 +1,126 @@
+import gzip
+import hashlib
+
+import pytest
+from flask import Flask
+
+from static_files import IMMUTABLE_MAX_AGE, StaticFiles
+
+
+BODY = b'glTF' + bytes(range(256)) * 16
+
+
+@pytest.fixture
+def root(tmp_path):
+    (tmp_path / '3d_models').mkdir()
+    (tmp_path / '3d_models' / 'model.glb').write_bytes(BODY)
+    (tmp_path / 'app.js').write_bytes(b'console.log("hello");\n' * 200)
+    return tmp_path
+
+
+def client_for(files):
+    app = Flask(__name__, static_folder=None)
+    app.add_url_rule('/static/<path:relative_path>', 'static', files.serve)
+    return app.test_client()
+
+
+@pytest.fixture
+def client(root):
+    return client_for(StaticFiles(str(root), immutable_prefixes=('3d_models/',)))
+
+
+def test_etag_is_content_hash_and_revalidates_to_304(client):
+    response = client.get('/static/3d_models/model.glb')
+    etag = hashlib.sha256(BODY).hexdigest()
+
+    assert response.status_code == 200
+    assert response.data == BODY
+    assert response.get_etag() == (etag, False)
+    assert response.headers['Accept-Ranges'] == 'bytes'
+
+    revalidated = client.get('/static/3d_models/model.glb', headers={'If-None-Match': f'"{etag}"'})
+    assert revalidated.status_code == 304
+    assert revalidated.data == b''
+
+    changed = client.get('/static/3d_models/model.glb', headers={'If-None-Match': '"something-else"'})
+    assert changed.status_code == 200
+
+
+def test_cache_control_immutable_vs_mutable(client):
+    immutable = client.get('/static/3d_models/model.glb').cache_control
+    assert immutable.public and immutable.immutable
+    assert immutable.max_age == IMMUTABLE_MAX_AGE
+
+    mutable = client.get('/static/app.js').cache_control
+    assert mutable.public and mutable.no_cache
+    assert not mutable.immutable
+
+
+def test_range_request_returns_partial_content(client):
+    response = client.get('/static/3d_models/model.glb', headers={'Range': 'bytes=100-199'})
+
+    assert response.status_code == 206
+    assert response.data == BODY[100:200]
+    assert response.headers['Content-Range'] == f'bytes 100-199/{len(BODY)}'
+    assert response.headers['Content-Length'] == '100'
+
+    tail = client.get('/static/3d_models/model.glb', headers={'Range': 'bytes=4000-'})
+    assert tail.status_code == 206
+    assert tail.data == BODY[4000:]
+
+
+def test_range_beyond_end_is_not_satisfiable(client):
+    response = client.get('/static/3d_models/model.glb', headers={'Range': f'bytes={len(BODY) + 10}-'})
+
+    assert response.status_code == 416
+    assert response.headers['Content-Range'] == f'bytes */{len(BODY)}'
+
+
+def test_if_range_with_stale_etag_sends_whole_file(client):
+    current = hashlib.sha256(BODY).hexdigest()
+
+    resumed = client.get('/static/3d_models/model.glb', headers={'Range': 'bytes=100-', 'If-Range': f'"{current}"'})
+    assert resumed.status_code == 206
+
+    restarted = client.get('/static/3d_models/model.glb', headers={'Range': 'bytes=100-', 'If-Range': '"stale"'})
+    assert restarted.status_code == 200
+    assert restarted.data == BODY
+
+
+def test_precompressed_variant_for_clients_that_accept_it(root, client):
+    files = StaticFiles(str(root))
+    assert 'gzip' in files.precompress(str(root / 'app.js'))
+
+    plain = client.get('/static/app.js')
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.headers['Vary'] == 'Accept-Encoding'
+
+    compressed = client.get('/static/app.js', headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert compressed.headers['Vary'] == 'Accept-Encoding'
+    assert gzip.decompress(compressed.data) == plain.data
+    # Each representation has its own ETag, and revalidates against it
+    assert compressed.get_etag()[0] == f"{plain.get_etag()[0]}-gzip"
+    revalidated = client.get('/static/app.js', headers={
+        'Accept-Encoding': 'gzip', 'If-None-Match': f'"{compressed.get_etag()[0]}"'
+    })
+    assert revalidated.status_code == 304
+
+
+def test_x_accel_redirect_leaves_bytes_to_proxy(root):
+    client = client_for(StaticFiles(str(root), sendfile_mode='x-accel', accel_prefix='internal'))
+    etag = hashlib.sha256(BODY).hexdigest()
+
+    response = client.get('/static/3d_models/model.glb')
+    assert response.headers['X-Accel-Redirect'] == '/internal/3d_models/model.glb'
+    assert response.data == b''
+
+    revalidated = client.get('/static/3d_models/model.glb', headers={'If-None-Match': f'"{etag}"'})
+    assert revalidated.status_code == 304
+
+
+@pytest.mark.parametrize('path', ['..%2Fsecret.txt', '3d_models/missing.glb', '3d_models'])
+def test_missing_or_escaping_paths_are_404(root, client, path):
+    (root.parent / 'secret.txt').write_text('nope')
+
+    assert client.get(f'/static/{path}').status_code == 404
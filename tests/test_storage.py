@@ -0,0 +1,113 @@
+import os
+
+import pytest
+
+from storage import AssetStore, LocalBackend, S3Backend, shard_key
+
+
+BUCKET = 'assets'
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    """
+    A moto-backed bucket; yields the boto3 client the backend will talk to
+    """
+    boto3 = pytest.importorskip('boto3')
+    moto = pytest.importorskip('moto')
+
+    for name, value in (('AWS_ACCESS_KEY_ID', 'testing'), ('AWS_SECRET_ACCESS_KEY', 'testing'),
+                        ('AWS_SESSION_TOKEN', 'testing'), ('AWS_DEFAULT_REGION', 'us-east-1')):
+        monkeypatch.setenv(name, value)
+
+    with moto.mock_aws():
+        client = boto3.client('s3', region_name='us-east-1')
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def write_asset(store, folder, filename, data):
+    key, path = store.allocate(folder, filename)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return key, path
+
+
+def s3_keys(client):
+    return sorted(item['Key'] for item in client.list_objects_v2(Bucket=BUCKET).get('Contents', []))
+
+
+def test_s3_put_uploads_under_prefix(tmp_path, s3):
+    backend = S3Backend(str(tmp_path / 'work'), BUCKET, prefix='/prod/', region='us-east-1')
+    store = AssetStore(str(tmp_path / 'assets.db'), backend)
+
+    key, path = write_asset(store, 'generated_images', 'cat.png', b'png bytes')
+    store.add(key, 'image')
+
+    assert key == shard_key('generated_images', 'cat.png')
+    assert path == os.path.join(str(tmp_path / 'work'), *key.split('/'))
+    assert s3_keys(s3) == [f'prod/{key}']
+    assert s3.get_object(Bucket=BUCKET, Key=f'prod/{key}')['Body'].read() == b'png bytes'
+
+
+def test_s3_refetches_missing_working_copy(tmp_path, s3):
+    backend = S3Backend(str(tmp_path / 'work'), BUCKET, region='us-east-1')
+    store = AssetStore(str(tmp_path / 'assets.db'), backend)
+    key, path = write_asset(store, '3d_models', 'model.glb', b'glb bytes')
+    store.add(key, 'model')
+
+    os.remove(path)
+
+    assert store.ensure_local(key) == path
+    with open(path, 'rb') as f:
+        assert f.read() == b'glb bytes'
+    assert not [name for name in os.listdir(os.path.dirname(path)) if name.endswith('.part')]
+    assert store.locate('3d_models', 'model.glb') == path
+
+
+def test_s3_fetch_of_unknown_object(tmp_path, s3):
+    backend = S3Backend(str(tmp_path / 'work'), BUCKET, region='us-east-1')
+    store = AssetStore(str(tmp_path / 'assets.db'), backend)
+    key = shard_key('3d_models', 'missing.glb')
+
+    # Untracked: the bucket isn't even asked
+    assert store.ensure_local(key) is None
+    # A 404 from the bucket is a miss, and leaves no stray .part file behind
+    assert backend.fetch(key) is False
+    assert os.listdir(os.path.dirname(backend.local_path(key))) == []
+
+
+def test_s3_evict_deletes_objects_and_working_copies(tmp_path, s3):
+    backend = S3Backend(str(tmp_path / 'work'), BUCKET, region='us-east-1')
+    evicted = []
+    store = AssetStore(str(tmp_path / 'assets.db'), backend, quota_bytes=15,
+                       on_evict=lambda key, kind: evicted.append((key, kind)))
+
+    old_key, old_path = write_asset(store, '3d_models', 'old.glb', b'0123456789')
+    lod_path = old_path.replace('.glb', '.lod1.glb')
+    with open(lod_path, 'wb') as f:
+        f.write(b'lod')
+    store.add(old_key, 'model', extra_paths=[lod_path])
+    assert len(s3_keys(s3)) == 2
+
+    new_key, new_path = write_asset(store, '3d_models', 'new.glb', b'abcdefghij')
+    store.add(new_key, 'model')
+
+    assert evicted == [(old_key, 'model')]
+    assert s3_keys(s3) == [new_key]
+    assert not os.path.exists(old_path)
+    assert not os.path.exists(lod_path)
+    assert os.path.exists(new_path)
+    assert store.ensure_local(old_key) is None
+    assert store.stats()['kinds'] == {'model': {'assets': 1, 'bytes': 10}}
+
+
+def test_local_backend_evicts_by_ttl(tmp_path):
+    store = AssetStore(str(tmp_path / 'assets.db'), LocalBackend(str(tmp_path / 'static')), ttl=60)
+    key, path = write_asset(store, 'generated_images', 'cat.png', b'png bytes')
+    store.add(key, 'image')
+
+    assert store.evict() == []
+    assert store.evict(now=os.path.getmtime(path) + 3600) == [key]
+    assert not os.path.exists(path)
+    assert store.locate('generated_images', 'cat.png') is None
@@ -0,0 +1,51 @@
+import json
+
+import pytest
+
+from webhooks import sign, verify
+
+
+SECRET = 'whsec_test'
+BODY = json.dumps({'id': 'task-1', 'status': 'SUCCEEDED'}).encode('utf-8')
+
+
+def test_sign_is_prefixed_hmac_sha256():
+    signature = sign(SECRET, BODY)
+
+    assert signature.startswith('sha256=')
+    assert len(signature) == len('sha256=') + 64
+    assert signature == sign(SECRET, BODY)
+
+
+def test_verify_accepts_own_signature_with_or_without_prefix():
+    signature = sign(SECRET, BODY)
+
+    assert verify(SECRET, BODY, signature)
+    assert verify(SECRET, BODY, signature[len('sha256='):])
+    assert verify(SECRET, BODY, f"{signature}\n")
+
+
+@pytest.mark.parametrize('secret, body, signature', [
+    (SECRET, BODY + b' ', sign(SECRET, BODY)),              # body changed after signing
+    (SECRET, BODY, sign('another secret', BODY)),            # signed with another secret
+    (SECRET, BODY, 'sha256=' + '0' * 64),
+    (SECRET, BODY, 'md5=' + sign(SECRET, BODY)[7:]),
+    (SECRET, BODY, ''),
+    (SECRET, BODY, None),
+    ('', BODY, sign('', BODY)),                              # webhooks not configured
+    (None, BODY, 'sha256=' + '0' * 64),
+])
+def test_verify_rejects(secret, body, signature):
+    assert not verify(secret, body, signature)
+
+
+def test_read_meshy_webhook():
+    routes = pytest.importorskip('text_to_3d.routes')
+    config = {'MESHY_WEBHOOK_SECRET': SECRET}
+
+    assert routes.read_meshy_webhook(config, BODY, sign(SECRET, BODY)) == (json.loads(BODY), None)
+    assert routes.read_meshy_webhook({'MESHY_WEBHOOK_SECRET': None}, BODY, sign(SECRET, BODY))[1][1] == 404
+    assert routes.read_meshy_webhook(config, BODY, sign('forged', BODY))[1] == ('Invalid signature', 401)
+
+    for body, error in ((b'{not json', 'Invalid JSON'), (b'[1, 2]', 'No task id'), (b'{"status": "FAILED"}', 'No task id')):
+        assert routes.read_meshy_webhook(config, body, sign(SECRET, body)) == (None, (error, 400))
@@ -0,0 +1,73 @@
+"""
+AI Image Generator backend (Flask app factory)
+- Direct OpenAI DALL-E 3 image generation
+- Meshy AI 3D model conversion (FULLY CORRECTED)
+- Background job queue so 3D conversions never block a request thread
+- One-shot text-to-3D jobs: Meshy starts from DALL-E's URL while the image is
+  saved and indexed alongside; per-stage timings in the job result
+- One shared, progress-adaptive poller for all in-flight Meshy tasks
+- Signed Meshy webhooks settle tasks at once (MESHY_WEBHOOK_SECRET); polling
+  then only catches lost callbacks
+- Pooled keep-alive HTTP sessions for every upstream call
+- Streamed, verified asset downloads (memory use independent of file size)
+- Images handed to Meshy by URL when possible, streamed base64 otherwise
+- Prompt -> image cache so repeat prompts don't pay for another generation
+- Image-hash -> GLB cache so the same image is only converted once
+- Identical concurrent requests share one in-flight upstream operation
+- Durable job table; unfinished Meshy tasks are resumed after a restart
+- Server-Sent Events stream of job progress
+- Batch generation endpoint with bounded parallelism and streamed results
+- Client-side rate limiting per upstream endpoint, honouring 429 Retry-After
+- Per-upstream circuit breakers: fail fast with 503 while an upstream is down
+- Downloaded GLBs are deduplicated, quantized and written as LOD variants
+- Downloaded GLBs are validated and indexed (vertex/triangle counts, textures, bounds)
+- Thumbnails / WebP derivatives of generated images; recompressed GLB textures
+- Static assets with content-hash ETags, immutable caching, Range and precompression
+- Hash-sharded asset storage with quota / TTL eviction, on local disk or S3
+- Generation history with cursor pagination, date filters and full-text prompt search
+- Prometheus /metrics (requests, per-stage latency, queue depth, upstream codes) and structured logs
+- Asyncio serving mode on aiohttp (text_to_3d.aio)
+- create_app(config) factory with lazy start-up; multi-worker serving under gunicorn
+  (gunicorn.conf.py), any worker answers for jobs run by another
+
+    create_app({'SERVE_PAGES': True})      # settings override the environment
+    gunicorn -c gunicorn.conf.py text_to_3d.wsgi:app
+"""
+
+from flask import Flask
+from flask_cors import CORS
+
+from logging_setup import configure_logging
+
+from .config import load_config
+from .routes import api, pages
+from .services import Services
+
+
+def create_app(config=None):
+    """
+    Build the Flask app from the environment plus the config overrides (a dict).
+    Nothing is written or connected until the first request or an explicit
+    services(app).start(), so the app can be created before a server forks.
+    """
+    config = load_config(config)
+    configure_logging(config['LOG_LEVEL'], config['LOG_FORMAT'])
+
+    # Flask's built-in static route would shadow serve_static(), which adds caching headers
+    app = Flask(__name__, static_folder=None)
+    CORS(app)
+    app.use_x_sendfile = config['STATIC_SENDFILE'] == 'x-sendfile'
+    app.extensions['text_to_3d'] = Services(config)
+
+    app.register_blueprint(api)
+    if config['SERVE_PAGES']:
+        app.register_blueprint(pages)
+
+    return app
+
+
+def services(app):
+    """
+    The Services of an app made by create_app()
+    """
+    return app.extensions['text_to_3d']
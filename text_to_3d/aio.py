@@ -0,0 +1,955 @@
+"""
+Asyncio serving mode of the AI Image Generator backend (needs aiohttp)
+- Same routes and JSON contracts as the Flask app, with whose Services (config,
+  stores, caches, indexes) it shares everything durable
+- DALL-E generation, Meshy task creation, status polling and downloads run as coroutines on aiohttp
+- A pending conversion is a small task plus one polling coroutine instead of a thread,
+  so one process holds thousands of them
+- Blocking work (SQLite, hashing, GLB validation / LODs, derivatives) runs on a bounded thread pool
+- Routes that only read local state (static files, image derivatives, models, history, metrics)
+  are answered by the Flask app on that pool, so they behave identically
+
+    python -m text_to_3d.aio --port 5000
+    gunicorn -c gunicorn.conf.py --worker-class aiohttp.GunicornWebWorker 'text_to_3d.aio:create_async_app()'
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import re
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+
+try:
+    from aiohttp import web
+except ImportError:
+    raise ImportError("text_to_3d.aio needs aiohttp (pip install aiohttp)") from None
+from werkzeug.test import EnvironBuilder, run_wsgi_app
+
+from async_clients import AsyncUpstreamClient, ThreadedBody, stream_download
+from circuit_breaker import CircuitOpenError
+from http_clients import client_from_env
+from image_cache import cache_key
+from job_store import QueuedJobStore
+from jobs import AsyncJobQueue, QueueFullError
+from meshy_poller import AsyncMeshyPoller
+from rate_limit import BATCH, RateLimitTimeout, request_priority
+from singleflight import AsyncSingleFlight, SingleFlight
+from webhooks import SIGNATURE_HEADER
+
+from . import create_app, services as services_of
+from .routes import PAGE_FILES, read_meshy_webhook
+from .services import (
+    HTTP_REQUESTS, HTTP_SECONDS, JOBS, MESHY_IN_FLIGHT, QUEUE_DEPTH, STAGE_SECONDS, PipelineResult,
+    image_generation_errors, job_payload, meshy_poll_intervals, thumbnail_url
+)
+
+log = logging.getLogger('backend')
+
+
+class AsyncPipeline:
+    """
+    The coroutine side of the backend for one event loop: async upstream
+    clients, job queue and poller on top of the Services. Its attributes
+    exist once start() has run.
+    """
+
+    def __init__(self, services):
+        self.services = services
+        self.config = services.config
+        self._lease_keeper = None
+        self._relay = None
+
+    async def start(self):
+        """
+        Start the Services (folders, stores) off the loop, then build the async
+        side and take over unfinished conversions; runs in the serving process
+        """
+        services = self.services
+        config = self.config
+        await asyncio.to_thread(services.start, background=False)
+
+        # Threads for blocking work: SQLite, hashing, GLB post-processing, static files
+        self.io_executor = ThreadPoolExecutor(max_workers=config['ASYNC_IO_WORKERS'], thread_name_prefix='async-io')
+
+        self.openai_client = client_from_env(
+            "openai", config['OPENAI_API_URL'], pool_size=config['ASYNC_POOL_SIZE'], timeout=60,
+            rate_limiter=services.rate_limiter, circuit_breaker=services.openai_breaker,
+            client_class=AsyncUpstreamClient
+        )
+        self.meshy_client = client_from_env(
+            "meshy", config['MESHY_API_URL'], pool_size=config['ASYNC_POOL_SIZE'], timeout=30,
+            rate_limiter=services.rate_limiter, circuit_breaker=services.meshy_breaker,
+            client_class=AsyncUpstreamClient
+        )
+        self.asset_client = client_from_env(
+            "assets", pool_size=config['ASYNC_POOL_SIZE'], timeout=60,
+            rate_limiter=services.rate_limiter, circuit_breaker=services.asset_breaker,
+            client_class=AsyncUpstreamClient
+        )
+
+        self.job_queue = AsyncJobQueue(
+            max_workers=config['CONVERSION_WORKERS'],
+            max_pending=config['ASYNC_MAX_PENDING_JOBS'],
+            store=QueuedJobStore(services.job_store)
+        )
+
+        # Shared by all batch requests, like the Flask app's batch worker pool
+        self.batch_slots = asyncio.Semaphore(config['BATCH_CONCURRENCY'])
+
+        self.image_flight = AsyncSingleFlight()
+        self.conversion_flight = SingleFlight()
+        self.pipeline_flight = SingleFlight()
+
+        min_interval, max_interval = meshy_poll_intervals(config)
+        self.meshy_poller = AsyncMeshyPoller(
+            self.fetch_meshy_status,
+            min_interval=min_interval,
+            max_interval=max_interval,
+            timeout=config['MESHY_POLL_TIMEOUT']
+        )
+
+        # The gauges read this loop's queue and poller, not the Flask app's idle ones
+        JOBS.set_function(lambda: self.job_queue.stats()['jobs'])
+        QUEUE_DEPTH.set_function(lambda: self.job_queue.stats()['jobs'].get('queued', 0))
+        MESHY_IN_FLIGHT.set_function(lambda: self.meshy_poller.in_flight())
+
+        await self.resume_unfinished_jobs(0 if config['WORKERS'] <= 1 else config['JOB_LEASE_SECONDS'])
+        await self.run_sync(services.asset_store.evict)
+        self._lease_keeper = asyncio.create_task(self.keep_leases())
+        if config['MESHY_WEBHOOK_SECRET'] and config['WORKERS'] > 1:
+            self._relay = asyncio.create_task(self.apply_relayed_statuses())
+
+    async def run_sync(self, fn, *args, **kwargs):
+        """
+        Run blocking work on the I/O pool without holding up the event loop
+        """
+        return await asyncio.get_running_loop().run_in_executor(self.io_executor, partial(fn, *args, **kwargs))
+
+    # The coroutine twins of the Services upstream calls and job functions:
+    # requests, replies, keys and bookkeeping come from the Services helpers,
+    # only the awaiting happens here.
+
+    async def request_dalle_image(self, prompt):
+        """
+        Ask DALL-E 3 for an image; returns its (temporary) upstream URL
+        """
+        url, kwargs = self.services.dalle_request(prompt)
+        with STAGE_SECONDS.time(stage='dalle_generate'):
+            response = await self.openai_client.post(url, **kwargs)
+
+        return self.services.dalle_image_url(response)
+
+    async def download_image(self, source_url):
+        """
+        Download a generated image and save it locally (streamed straight to disk)
+        Returns (image_url, image_path, sha256)
+        """
+        services = self.services
+        image_key, image_path = await self.run_sync(services.image_destination)
+        with STAGE_SECONDS.time(stage='image_download'):
+            download = await stream_download(
+                self.asset_client, source_url, image_path, rate_class="download", executor=self.io_executor
+            )
+
+        image_url = await self.run_sync(services.save_image, image_key, image_path, source_url, download)
+        return image_url, image_path, download['sha256']
+
+    async def generate_image_dalle(self, prompt):
+        """
+        Generate image using OpenAI DALL-E 3
+        """
+        with image_generation_errors():
+            image_url, image_path, _ = await self.download_image(await self.request_dalle_image(prompt))
+        return image_url, image_path
+
+    async def create_meshy_task(self, image_path, image_url=None):
+        """
+        Start a Meshy AI image-to-3D task (see Services.meshy_create_request);
+        a base64 body is read from disk on the I/O pool. Returns the task id.
+        """
+        services = self.services
+        url, payload, body = services.meshy_create_request(image_path, image_url)
+        headers = services.meshy_headers()
+
+        with STAGE_SECONDS.time(stage='meshy_create'):
+            if body is None:
+                response = await self.meshy_client.post(url, headers=headers, json=payload, rate_class="create")
+            else:
+                headers["Content-Length"] = str(len(body))
+                response = await self.meshy_client.post(
+                    url, headers=headers, data=ThreadedBody(body, self.io_executor), rate_class="create"
+                )
+        if body is not None:
+            STAGE_SECONDS.observe(body.encode_seconds, stage='base64_encode')
+
+        return services.meshy_task_id(response)
+
+    async def fetch_meshy_status(self, task_id):
+        """
+        Fetch the current status JSON of a Meshy task (called by the poller)
+        """
+        url, kwargs = self.services.meshy_status_request(task_id)
+        return self.services.meshy_status_data(await self.meshy_client.get(url, **kwargs))
+
+    async def download_meshy_model(self, status_data):
+        """
+        Download the GLB of a finished Meshy task, then validate and store it on the I/O pool
+        """
+        services = self.services
+        glb_url, model_key, model_path = await self.run_sync(services.model_destination, status_data)
+        with STAGE_SECONDS.time(stage='glb_download'):
+            download = await stream_download(
+                self.asset_client, glb_url, model_path, rate_class="download", executor=self.io_executor
+            )
+
+        return await self.run_sync(services.save_model, model_key, model_path, download)
+
+    async def generate_and_cache(self, prompt, cache_params):
+        """
+        Generate an image with DALL-E and record it in the prompt cache
+        """
+        image_url, image_path = await self.generate_image_dalle(prompt)
+        await self.run_sync(self.services.cache_generation, prompt, image_url, image_path, cache_params)
+        return image_url, image_path
+
+    async def generate_or_reuse(self, prompt, fresh=False, variant=0):
+        """
+        Return (image_url, image_path, cached) for a prompt; see Services.generate_or_reuse
+        """
+        services = self.services
+        cache_params = services.prompt_cache_params(variant)
+        cached = await self.run_sync(services.cached_generation, prompt, cache_params, fresh)
+        if cached:
+            return cached
+
+        key = cache_key(prompt, **cache_params)
+        (image_url, image_path), shared = await self.image_flight.do(key, self.generate_and_cache, prompt, cache_params)
+        if shared:
+            log.info("🔗 Shared in-flight generation", extra={'image_url': image_url})
+
+        return image_url, image_path, False
+
+    async def run_conversion_job(self, job, image_path, image_hash):
+        """
+        Job coroutine: start one Meshy task (or pick up the one a restarted job
+        already has) and hand it to the poller. The worker slot is released
+        while the task runs; the GLB download takes one again.
+        """
+        services = self.services
+        task_id = services.resumed_task_id(job, "🎭 Conversion job started", image_path=image_path)
+        if not task_id:
+            task_id = await self.create_meshy_task(image_path)
+            job.update(task_id=task_id)
+
+        status_future = services.track_job_task(self.meshy_poller, job, task_id)
+
+        async def finish(status_data):
+            job.check_lease()
+            model_url = await self.download_meshy_model(status_data)
+            return await self.run_sync(services.finish_conversion, job, image_hash, image_path, model_url)
+
+        return self.job_queue.then(status_future, finish)
+
+    def submit_conversion(self, image_path, image_hash, prompt=None):
+        """
+        Queue a conversion job on this loop; see Services.submit_conversion
+        Returns (job, shared)
+        """
+        return self.services.submit_conversion(image_path, image_hash, prompt, runner=self)
+
+    async def save_pipeline_image(self, result, prompt, source_url):
+        """
+        Download, store and index a text-to-3D image, recording the image_save stage
+        """
+        started = time.monotonic()
+        image_url, image_path, sha256 = await self.download_image(source_url)
+        await self.run_sync(
+            self.services.record_pipeline_image, result, prompt, started, image_url, image_path, sha256
+        )
+
+    async def run_pipeline_job(self, job, prompt, fresh=False):
+        """
+        Job coroutine of /api/text-to-3d: DALL-E's image URL goes to Meshy
+        while a separate task saves the image; see Services.run_pipeline_job
+        """
+        services = self.services
+        result = PipelineResult(job)
+        image_saved = None
+
+        task_id = services.resumed_task_id(job, "🚀 Text-to-3D job started", prompt=prompt)
+        if not task_id:
+            started = time.monotonic()
+            reused = None if fresh else await self.run_sync(services.reuse_generation, prompt)
+
+            if reused:
+                result.record('image', started, **reused)
+                if 'model_url' in reused:
+                    return result.final()
+                image_path, source_url = reused['image_path'], None
+            else:
+                source_url = await self.request_dalle_image(prompt)
+                result.record('dalle_generate', started)
+                image_path = None
+                image_saved = asyncio.create_task(self.save_pipeline_image(result, prompt, source_url))
+
+            started = time.monotonic()
+            try:
+                task_id = await self.create_meshy_task(image_path, image_url=source_url)
+            except Exception:
+                if image_saved:
+                    # The image is still worth keeping for the gallery
+                    await asyncio.gather(image_saved, return_exceptions=True)
+                raise
+            job.update(task_id=task_id)
+            result.record('meshy_create', started)
+
+        started = time.monotonic()
+        status_future = services.track_job_task(self.meshy_poller, job, task_id)
+
+        async def finish(status_data):
+            job.check_lease()
+            result.record('meshy_task', started)
+            if image_saved:
+                # Long done in practice; raises if the image could not be saved
+                await image_saved
+
+            model_started = time.monotonic()
+            model_url = await self.download_meshy_model(status_data)
+            result.record('model_save', model_started, model_url=model_url)
+            return await self.run_sync(services.finish_pipeline, job, result, model_url)
+
+        return self.job_queue.then(status_future, finish)
+
+    def submit_text_to_3d(self, prompt, fresh=False):
+        """
+        Queue a text-to-3D job on this loop; see Services.submit_text_to_3d
+        Returns (job, shared)
+        """
+        return self.services.submit_text_to_3d(prompt, fresh, runner=self)
+
+    async def resume_unfinished_jobs(self, stale_after=0):
+        """
+        Take over jobs left unfinished by a stopped server or a worker
+        whose lease ran out: claimed on the I/O pool, restored on this loop
+        """
+        claimed = await self.run_sync(self.services.claim_unfinished_jobs, self.job_queue.store, stale_after)
+        return self.services.restore_jobs(claimed, runner=self)
+
+    async def keep_leases(self):
+        """
+        Heartbeat this worker's jobs and take over those of silent workers, forever
+        """
+        while True:
+            await asyncio.sleep(self.config['JOB_HEARTBEAT_SECONDS'])
+            try:
+                await self.run_sync(self.job_queue.store.heartbeat)
+                await self.resume_unfinished_jobs(self.config['JOB_LEASE_SECONDS'])
+                if self.services.shared_metrics:
+                    await self.run_sync(self.services.shared_metrics.dump)
+            except Exception as e:
+                log.warning(f"⚠️ Job lease upkeep failed: {e}")
+
+    async def apply_relayed_statuses(self):
+        """
+        Apply webhooks for this worker's tasks that another worker received, forever
+        """
+        while True:
+            await asyncio.sleep(self.config['SHARED_JOB_POLL_SECONDS'])
+            try:
+                for task_id, status_data in await self.run_sync(self.job_queue.store.take_pushed):
+                    self.meshy_poller.push(task_id, status_data)
+            except Exception as e:
+                log.warning(f"⚠️ Could not apply relayed Meshy statuses: {e}")
+
+    async def receive_meshy_status(self, status_data):
+        """
+        Apply a status from the Meshy webhook; see Services.receive_meshy_status
+        """
+        task_id = status_data['id']
+        if self.meshy_poller.push(task_id, status_data):
+            outcome = 'applied'
+        elif await self.run_sync(self.services.relay_meshy_status, task_id, status_data):
+            outcome = 'relayed'
+        else:
+            outcome = 'ignored'
+
+        return self.services.note_meshy_webhook(status_data, outcome)
+
+    async def close(self):
+        self._lease_keeper.cancel()
+        if self._relay:
+            self._relay.cancel()
+        for client in (self.openai_client, self.meshy_client, self.asset_client):
+            await client.close()
+        await self.run_sync(self.job_queue.store.flush)
+
+
+FLASK_APP = web.AppKey('flask_app', object)
+PIPELINE = web.AppKey('pipeline', AsyncPipeline)
+
+
+def read_chunks(chunks, limit=256 * 1024):
+    """
+    Next piece of a WSGI response body: whole chunks up to about limit bytes
+    """
+    data = bytearray()
+    for chunk in chunks:
+        data += chunk
+        if len(data) >= limit:
+            break
+    return bytes(data)
+
+
+# ==================== API ROUTES ====================
+
+routes = web.RouteTableDef()
+
+
+@routes.post('/api/generate-image')
+async def generate_image(request):
+    """
+    Generate image from user prompt (no Claude enhancement)
+    """
+    pipeline = request.app[PIPELINE]
+    try:
+        data = await request.json()
+        user_prompt = data.get('idea', '').strip()
+
+        if not user_prompt:
+            return web.json_response({
+                'success': False,
+                'error': 'No prompt provided'
+            }, status=400)
+
+        log.info("🎨 New image generation request", extra={'prompt': user_prompt})
+
+        image_url, image_path, cached = await pipeline.generate_or_reuse(user_prompt, fresh=data.get('fresh'))
+
+        image_id = str(uuid.uuid4())
+        await pipeline.run_sync(pipeline.services.history.add, image_id, user_prompt, image_url, image_path, cached=cached)
+
+        log.info("✨ Image generation complete", extra={'image_id': image_id, 'image_url': image_url, 'cached': cached})
+
+        return web.json_response({
+            'success': True,
+            'image_id': image_id,
+            'image_url': image_url,
+            'thumbnail_url': thumbnail_url(image_url),
+            'image_path': image_path,  # Store for 3D conversion
+            'prompt': user_prompt,
+            'cached': cached,
+            'timestamp': datetime.now().isoformat()
+        })
+
+    except (CircuitOpenError, RateLimitTimeout) as e:
+        log.warning(f"⚠️ {e}")
+        return web.json_response({
+            'success': False,
+            'error': str(e)
+        }, status=503)
+
+    except Exception as e:
+        log.exception(f"❌ Error: {e}")
+        return web.json_response({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+@routes.post('/api/generate-images')
+async def generate_images(request):
+    """
+    Batch image generation: {"prompts": [...], "variants": 1, "concurrency": 4, "fresh": false}
+    Results are streamed as NDJSON lines as they finish, then a summary line
+    """
+    pipeline = request.app[PIPELINE]
+    batch_concurrency = pipeline.config['BATCH_CONCURRENCY']
+    max_batch_items = pipeline.config['MAX_BATCH_ITEMS']
+
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    data = data if isinstance(data, dict) else {}
+    prompts = data.get('prompts')
+
+    if not isinstance(prompts, list) or not prompts:
+        return web.json_response({
+            'success': False,
+            'error': 'prompts must be a non-empty list'
+        }, status=400)
+
+    prompts = [str(prompt).strip() for prompt in prompts]
+    if not all(prompts):
+        return web.json_response({
+            'success': False,
+            'error': 'prompts must not be empty'
+        }, status=400)
+
+    try:
+        variants = int(data.get('variants', 1))
+        concurrency = int(data.get('concurrency', batch_concurrency))
+    except (TypeError, ValueError):
+        return web.json_response({
+            'success': False,
+            'error': 'variants and concurrency must be integers'
+        }, status=400)
+
+    items = [(prompt, variant) for prompt in prompts for variant in range(max(1, variants))]
+    if len(items) > max_batch_items:
+        return web.json_response({
+            'success': False,
+            'error': f'Batch too large: {len(items)} items (max {max_batch_items})'
+        }, status=400)
+
+    concurrency = min(max(1, concurrency), batch_concurrency)
+    fresh = bool(data.get('fresh'))
+    request_slots = asyncio.Semaphore(concurrency)
+
+    log.info("🎨 Batch generation request", extra={'items': len(items), 'concurrency': concurrency})
+
+    async def run_item(index, prompt, variant):
+        async with request_slots, pipeline.batch_slots:
+            try:
+                # Batch items queue behind interactive requests for upstream rate limits
+                with request_priority(BATCH):
+                    image_url, image_path, cached = await pipeline.generate_or_reuse(prompt, fresh=fresh, variant=variant)
+                image_id = str(uuid.uuid4())
+                await pipeline.run_sync(pipeline.services.history.add, image_id, prompt, image_url, image_path, cached=cached)
+                return {
+                    'index': index,
+                    'success': True,
+                    'image_id': image_id,
+                    'image_url': image_url,
+                    'thumbnail_url': thumbnail_url(image_url),
+                    'image_path': image_path,
+                    'prompt': prompt,
+                    'variant': variant,
+                    'cached': cached,
+                    'timestamp': datetime.now().isoformat()
+                }
+            except Exception as e:
+                log.error(f"❌ Batch item failed: {e}", extra={'index': index})
+                return {
+                    'index': index,
+                    'success': False,
+                    'prompt': prompt,
+                    'variant': variant,
+                    'error': str(e)
+                }
+
+    response = web.StreamResponse(headers={
+        'Content-Type': 'application/x-ndjson',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    await response.prepare(request)
+
+    tasks = [asyncio.create_task(run_item(index, prompt, variant)) for index, (prompt, variant) in enumerate(items)]
+    succeeded = failed = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            result = await next_done
+            if result['success']:
+                succeeded += 1
+            else:
+                failed += 1
+            await response.write((json.dumps(result) + "\n").encode())
+    finally:
+        # Client went away: don't start work nobody will read
+        for task in tasks:
+            task.cancel()
+
+    log.info("✨ Batch complete", extra={'succeeded': succeeded, 'failed': failed})
+    await response.write((json.dumps({
+        'done': True,
+        'total': len(items),
+        'succeeded': succeeded,
+        'failed': failed
+    }) + "\n").encode())
+    await response.write_eof()
+    return response
+
+
+@routes.post('/api/convert-to-3d')
+async def convert_to_3d(request):
+    """
+    Queue conversion of a generated image to a 3D model using Meshy AI.
+    Returns a job id right away; poll /api/jobs/<job_id> for the result.
+    """
+    pipeline = request.app[PIPELINE]
+    try:
+        data = await request.json()
+        image_path = data.get('image_path')
+        prompt = data.get('prompt')
+
+        if not image_path:
+            return web.json_response({
+                'success': False,
+                'error': 'No image path provided'
+            }, status=400)
+
+        image_path, image_hash, cached = await pipeline.run_sync(pipeline.services.prepare_conversion, image_path)
+
+        if image_hash is None:
+            return web.json_response({
+                'success': False,
+                'error': f'Image not found: {image_path}'
+            }, status=404)
+
+        log.info("🎭 3D conversion request", extra={'image_path': image_path})
+
+        if cached:
+            log.info("♻️ Conversion cache hit", extra={'model_url': cached['model_url']})
+            return web.json_response({
+                'success': True,
+                'model_url': cached['model_url'],
+                'cached': True
+            })
+
+        # Meshy is failing: say so now rather than queue a job that will fail
+        if not pipeline.services.meshy_breaker.available():
+            raise CircuitOpenError("Meshy AI is unavailable right now, please retry shortly")
+
+        job, shared = pipeline.submit_conversion(image_path, image_hash, prompt)
+
+        if shared:
+            log.info("🔗 Joined in-flight conversion job", extra={'job_id': job.id})
+        else:
+            log.info("📥 Queued conversion job", extra={'job_id': job.id})
+
+        return web.json_response({
+            'success': True,
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': f"/api/jobs/{job.id}",
+            'coalesced': shared
+        }, status=202)
+
+    except (QueueFullError, CircuitOpenError) as e:
+        log.warning(f"⚠️ {e}")
+        return web.json_response({
+            'success': False,
+            'error': str(e)
+        }, status=503)
+
+    except Exception as e:
+        log.exception(f"❌ 3D conversion error: {e}")
+        return web.json_response({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+@routes.post('/api/text-to-3d')
+async def text_to_3d(request):
+    """
+    Prompt to 3D model in one job: {"idea": "...", "fresh": false}
+    Returns a job id right away; see the Flask route for the stages
+    """
+    pipeline = request.app[PIPELINE]
+    services = pipeline.services
+    try:
+        try:
+            data = await request.json()
+        except ValueError:
+            data = None
+        data = data if isinstance(data, dict) else {}
+        user_prompt = str(data.get('idea', '')).strip()
+
+        if not user_prompt:
+            return web.json_response({
+                'success': False,
+                'error': 'No prompt provided'
+            }, status=400)
+
+        log.info("🚀 Text-to-3D request", extra={'prompt': user_prompt})
+
+        # An upstream is failing: say so now rather than queue a job that will fail
+        for breaker in (services.openai_breaker, services.meshy_breaker):
+            if not breaker.available():
+                raise CircuitOpenError(f"{breaker.name} is unavailable right now, please retry shortly")
+
+        job, shared = pipeline.submit_text_to_3d(user_prompt, fresh=bool(data.get('fresh')))
+
+        if shared:
+            log.info("🔗 Joined in-flight text-to-3D job", extra={'job_id': job.id})
+        else:
+            log.info("📥 Queued text-to-3D job", extra={'job_id': job.id})
+
+        return web.json_response({
+            'success': True,
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': f"/api/jobs/{job.id}",
+            'coalesced': shared
+        }, status=202)
+
+    except (QueueFullError, CircuitOpenError) as e:
+        log.warning(f"⚠️ {e}")
+        return web.json_response({
+            'success': False,
+            'error': str(e)
+        }, status=503)
+
+    except Exception as e:
+        log.exception(f"❌ Text-to-3D error: {e}")
+        return web.json_response({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+@routes.get('/api/jobs/{job_id}')
+async def get_job(request):
+    """
+    Report status, progress and result of a background job
+    """
+    pipeline = request.app[PIPELINE]
+    job = await pipeline.run_sync(pipeline.job_queue.get, request.match_info['job_id'])
+
+    if not job:
+        return web.json_response({
+            'success': False,
+            'error': 'Job not found'
+        }, status=404)
+
+    return web.json_response(job_payload(job.to_dict()))
+
+
+@routes.get('/api/jobs/{job_id}/events')
+async def job_events(request):
+    """
+    Server-Sent Events stream of a job's status and progress changes.
+    Sends a 'progress' event per change and a final 'done' event, then closes.
+    """
+    pipeline = request.app[PIPELINE]
+    job_queue = pipeline.job_queue
+    keepalive = pipeline.config['SSE_KEEPALIVE_SECONDS']
+    shared_poll = pipeline.config['SHARED_JOB_POLL_SECONDS']
+    job_id = request.match_info['job_id']
+    job = await pipeline.run_sync(job_queue.get, job_id)
+
+    if not job:
+        return web.json_response({
+            'success': False,
+            'error': 'Job not found'
+        }, status=404)
+
+    response = web.StreamResponse(headers={
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    await response.prepare(request)
+
+    version, sent = None, 0
+    idle_since = refreshed_at = time.monotonic()
+    while True:
+        if job.version == version:
+            await asyncio.sleep(pipeline.config['SSE_POLL_SECONDS'])
+            now = time.monotonic()
+            if now - idle_since >= keepalive:
+                # Keep proxies from closing the idle connection
+                await response.write(b": keep-alive\n\n")
+                idle_since = now
+            # A job run by another worker only changes in the job table
+            if not job_queue.is_local(job_id) and now - refreshed_at >= shared_poll:
+                refreshed_at = now
+                refreshed = await pipeline.run_sync(job_queue.get, job_id)
+                if refreshed is not None and refreshed is not job and refreshed.to_dict() != job.to_dict():
+                    job, version = refreshed, None
+            continue
+
+        version, job_data = job.version, job.to_dict()
+        idle_since, sent = time.monotonic(), sent + 1
+        finished = job_data['status'] in ('succeeded', 'failed')
+        event = 'done' if finished else 'progress'
+        await response.write(f"id: {sent}\nevent: {event}\ndata: {json.dumps(job_payload(job_data))}\n\n".encode())
+
+        if finished:
+            await response.write_eof()
+            return response
+
+
+@routes.post('/api/webhooks/meshy')
+async def meshy_webhook(request):
+    """
+    Status push for a Meshy task, signed with MESHY_WEBHOOK_SECRET; see the Flask route
+    """
+    pipeline = request.app[PIPELINE]
+    status_data, error = read_meshy_webhook(pipeline.config, await request.read(), request.headers.get(SIGNATURE_HEADER))
+
+    if error:
+        message, code = error
+        return web.json_response({
+            'success': False,
+            'error': message
+        }, status=code)
+
+    return web.json_response({
+        'success': True,
+        'outcome': await pipeline.receive_meshy_status(status_data)
+    })
+
+
+@routes.get('/api/health')
+async def health_check(request):
+    """Health check endpoint"""
+    pipeline = request.app[PIPELINE]
+    return web.json_response(
+        await pipeline.run_sync(pipeline.services.health_report, pipeline.job_queue, pipeline.meshy_poller)
+    )
+
+
+async def delegate_to_flask(request):
+    """
+    Answer from the Flask app on the I/O pool. These routes only read local
+    state, so they keep its exact behaviour (ETags, Range, precompression,
+    derivatives, paging) and record their own metrics.
+    """
+    request['delegated'] = True
+    environ = EnvironBuilder(
+        path=request.path,
+        method=request.method,
+        query_string=request.query_string,
+        headers=list(request.headers.items()),
+        data=await request.read()
+    ).get_environ()
+    pipeline = request.app[PIPELINE]
+    body, status, headers = await pipeline.run_sync(run_wsgi_app, request.app[FLASK_APP].wsgi_app, environ)
+
+    try:
+        code, _, reason = status.partition(' ')
+        response = web.StreamResponse(status=int(code), reason=reason or None)
+        for name, value in headers.items():
+            if name.lower() not in ('connection', 'transfer-encoding'):
+                response.headers.add(name, value)
+        await response.prepare(request)
+
+        chunks = iter(body)
+        while True:
+            data = await pipeline.run_sync(read_chunks, chunks)
+            if not data:
+                break
+            await response.write(data)
+    finally:
+        if hasattr(body, 'close'):
+            await pipeline.run_sync(body.close)
+
+    await response.write_eof()
+    return response
+
+
+DELEGATED_ROUTES = ('/api/images/{filename}', '/api/models', '/api/models/{model_id}',
+                    '/api/generations', '/metrics', '/static/{path:.*}')
+
+
+@web.middleware
+async def answer_preflight(request, handler):
+    """
+    CORS preflights, answered for any origin like flask_cors does for the Flask app
+    """
+    if request.method == 'OPTIONS' and 'Access-Control-Request-Method' in request.headers:
+        response = web.Response()
+        response.headers['Access-Control-Allow-Methods'] = 'DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT'
+        if 'Access-Control-Request-Headers' in request.headers:
+            response.headers['Access-Control-Allow-Headers'] = request.headers['Access-Control-Request-Headers']
+        return response
+    return await handler(request)
+
+
+@web.middleware
+async def start_request_timer(request, handler):
+    request['metrics.started'] = time.monotonic()
+    return await handler(request)
+
+
+def route_label(request):
+    # Flask's spelling of the route pattern, so both modes share metric labels
+    resource = request.match_info.route.resource
+    if resource is None:
+        return 'unmatched'
+    return re.sub(r'\{(\w+)(:[^}]*)?\}', r'<\1>', resource.canonical)
+
+
+async def finish_headers(request, response):
+    """
+    Runs just before a response's headers go out (also for streams):
+    CORS header and request metrics, to the first byte like the Flask app
+    """
+    response.headers.setdefault('Access-Control-Allow-Origin', '*')
+
+    if request.get('delegated'):
+        return
+
+    route = route_label(request)
+    HTTP_REQUESTS.inc(method=request.method, route=route, status=response.status)
+    started = request.get('metrics.started')
+    if started is not None:
+        HTTP_SECONDS.observe(time.monotonic() - started, method=request.method, route=route)
+
+
+async def start_background_work(app):
+    await app[PIPELINE].start()
+
+
+async def stop_background_work(app):
+    await app[PIPELINE].close()
+
+
+def create_async_app(config=None):
+    """
+    Build the aiohttp app from the environment plus the config overrides (a dict);
+    like create_app(), nothing is started until the app runs
+    """
+    flask_app = create_app(config)
+
+    app = web.Application(middlewares=[answer_preflight, start_request_timer])
+    app[FLASK_APP] = flask_app
+    app[PIPELINE] = AsyncPipeline(services_of(flask_app))
+    app.add_routes(routes)
+    for path in DELEGATED_ROUTES:
+        app.router.add_get(path, delegate_to_flask)
+    if services_of(flask_app).config['SERVE_PAGES']:
+        for filename in PAGE_FILES:
+            app.router.add_get(f'/{filename}', delegate_to_flask)
+    app.on_response_prepare.append(finish_headers)
+    app.on_startup.append(start_background_work)
+    app.on_cleanup.append(stop_background_work)
+    return app
+
+
+# ==================== MAIN ====================
+
+def main(config=None):
+    parser = argparse.ArgumentParser(description="Run the asyncio backend")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    args = parser.parse_args()
+
+    app = create_async_app(config)
+    config = services_of(app[FLASK_APP]).config
+
+    print("\n" + "="*60)
+    print("🚀 AI Image Generator Backend (asyncio) Starting...")
+    print("="*60)
+    print(f"📸 OpenAI DALL-E: {'✅ Configured' if config['OPENAI_API_KEY'] else '❌ Not configured'}")
+    print(f"🎭 Meshy AI: {'✅ Configured' if config['MESHY_API_KEY'] else '❌ Not configured'}")
+    print(f"💾 Upload folder: {config['UPLOAD_FOLDER']}")
+    print(f"🎨 Models folder: {config['MODELS_FOLDER']}")
+    print(f"📥 Max pending conversions: {config['ASYNC_MAX_PENDING_JOBS']}")
+    print("="*60)
+    print(f"\n🌐 Server running on http://{args.host}:{args.port} (same API as the Flask app)")
+    print("\n" + "="*60 + "\n")
+
+    web.run_app(app, host=args.host, port=args.port, print=None)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+"""
+Backend settings
+- load_config() reads every setting from the environment once, at app creation
+- create_app(config) / create_async_app(config) take a dict of overrides on top
+- Nothing here touches the disk or the network; Services.start() does that
+"""
+
+import os
+
+
+def _numbers(value, cast):
+    return [cast(item) for item in value.split(',') if item.strip()]
+
+
+def _cpu_count():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def default_workers():
+    """
+    Worker processes for a production server (WEB_CONCURRENCY, else one per core, at most 8)
+    """
+    return int(os.getenv("WEB_CONCURRENCY") or min(_cpu_count(), 8))
+
+
+def load_config(overrides=None):
+    """
+    All backend settings as a dict: environment first, then overrides
+    """
+    config = {
+        # Logging: LOG_LEVEL=DEBUG adds per-poll Meshy status lines, LOG_FORMAT=json
+        # writes one JSON object per line
+        "LOG_LEVEL": os.getenv("LOG_LEVEL", "INFO"),
+        "LOG_FORMAT": os.getenv("LOG_FORMAT", "text"),
+
+        # Your API Keys
+        "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY"),
+        "MESHY_API_KEY": os.getenv("MESHY_API_KEY"),
+
+        # DALL-E generation settings (also part of the prompt cache key)
+        "DALLE_PARAMS": {
+            "model": "dall-e-3",
+            "size": "1024x1024",
+            "quality": "standard"
+        },
+
+        # Meshy image-to-3D settings (also part of the conversion cache key)
+        "MESHY_PARAMS": {
+            "should_remesh": False,
+            "target_polycount": int(os.getenv("MESHY_TARGET_POLYCOUNT", "2000"))
+        },
+
+        # Upstream API endpoints (point both at fake_upstream.py for offline runs and benchmarks)
+        "OPENAI_API_URL": os.getenv("OPENAI_API_URL", "https://api.openai.com").rstrip('/'),
+        "MESHY_API_URL": os.getenv("MESHY_API_URL", "https://api.meshy.ai").rstrip('/'),
+
+        # Externally reachable base URL of this server (e.g. https://example.com), used to
+        # hand Meshy a link to the image instead of uploading it. Leave unset when local-only.
+        "PUBLIC_BASE_URL": os.getenv("PUBLIC_BASE_URL", "").rstrip('/'),
+
+        # Outbound rate limits per "<upstream>:<endpoint class>" as rate/burst (requests per
+        # second / bucket size) for the whole server; each of the WORKERS processes gets
+        # its share. Over-limit calls queue for up to RATE_LIMIT_MAX_WAIT seconds.
+        "RATE_LIMITS": os.getenv(
+            "RATE_LIMITS",
+            "openai:generation=1/5,meshy:create=1/5,meshy:status=10/20,assets:download=20/40"
+        ),
+        "RATE_LIMIT_MAX_WAIT": float(os.getenv("RATE_LIMIT_MAX_WAIT", "120")),
+
+        # Circuit breakers: open when CIRCUIT_FAILURE_RATE of the calls in the last
+        # CIRCUIT_WINDOW seconds failed or were slower than the upstream's slow-call limit
+        # (at least CIRCUIT_MIN_CALLS calls), then fail fast for CIRCUIT_OPEN_SECONDS
+        "CIRCUIT_SETTINGS": {
+            "failure_rate": float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5")),
+            "min_calls": int(os.getenv("CIRCUIT_MIN_CALLS", "10")),
+            "window_seconds": float(os.getenv("CIRCUIT_WINDOW", "60")),
+            "open_seconds": float(os.getenv("CIRCUIT_OPEN_SECONDS", "30"))
+        },
+
+        # Storage folders
+        "STATIC_FOLDER": 'static',
+        "UPLOAD_FOLDER": 'static/generated_images',
+        "MODELS_FOLDER": 'static/3d_models',
+
+        # GLB post-processing: optimized LOD variants written next to each model
+        # (<name>.lod<percent>.glb + <name>.lods.json); the viewer loads the smallest first
+        "GLB_LODS_ENABLED": os.getenv("GLB_LODS_ENABLED", "1") == "1",
+        "GLB_LOD_RATIOS": _numbers(os.getenv("GLB_LOD_RATIOS", "1.0,0.5,0.1"), float),
+        "GLB_QUANTIZE": os.getenv("GLB_QUANTIZE", "1") == "1",
+        # Reduced LODs are skipped when they would have fewer triangles than this
+        "GLB_LOD_MIN_TRIANGLES": int(os.getenv("GLB_LOD_MIN_TRIANGLES", "500")),
+        # Re-encode / downscale embedded textures in the LODs (needs Pillow); smaller LODs get smaller caps
+        "GLB_RECOMPRESS_TEXTURES": os.getenv("GLB_RECOMPRESS_TEXTURES", "1") == "1",
+        "GLB_TEXTURE_MAX_SIZE": int(os.getenv("GLB_TEXTURE_MAX_SIZE", "2048")),
+
+        # Thumbnails / WebP copies of generated images (needs Pillow), made in the background at save time
+        "DERIVATIVES_FOLDER": 'static/derivatives',
+        "IMAGE_DERIVATIVE_WIDTHS": _numbers(os.getenv("IMAGE_DERIVATIVE_WIDTHS", "256,512"), int),
+        "DERIVATIVE_WORKERS": int(os.getenv("DERIVATIVE_WORKERS", "2")),
+
+        # Static serving: content-hash ETags, immutable caching of uuid / hash named assets and
+        # precompressed (.gz / .br) GLBs. STATIC_SENDFILE=x-sendfile or x-accel lets a front
+        # proxy send the bytes (for x-accel, map STATIC_ACCEL_PREFIX to the static folder in nginx)
+        "STATIC_SENDFILE": os.getenv("STATIC_SENDFILE") or None,
+        "STATIC_ACCEL_PREFIX": os.getenv("STATIC_ACCEL_PREFIX", "/protected-static/"),
+        "PRECOMPRESS_MODELS": os.getenv("PRECOMPRESS_MODELS", "1") == "1",
+
+        # Local databases (caches, indexes and the job table shared by all workers)
+        "DATA_FOLDER": os.getenv("DATA_FOLDER", "data"),
+
+        # Asset storage: new files go to hash-sharded folders (generated_images/ab/cd/<name>).
+        # STORAGE_QUOTA_BYTES evicts least recently used assets, STORAGE_TTL_SECONDS evicts
+        # assets not accessed for that long (0 = off). STORAGE_BACKEND=s3 stores objects in
+        # an S3-compatible bucket and keeps static/ as a local working copy.
+        "STORAGE_BACKEND": os.getenv("STORAGE_BACKEND", "local"),
+        "STORAGE_QUOTA_BYTES": int(os.getenv("STORAGE_QUOTA_BYTES", "0")),
+        "STORAGE_TTL_SECONDS": int(os.getenv("STORAGE_TTL_SECONDS", "0")),
+        "S3_BUCKET": os.getenv("S3_BUCKET"),
+        "S3_PREFIX": os.getenv("S3_PREFIX", ""),
+        "S3_ENDPOINT_URL": os.getenv("S3_ENDPOINT_URL") or None,
+        "S3_REGION": os.getenv("S3_REGION") or None,
+
+        # Background conversion workers (per process)
+        "CONVERSION_WORKERS": int(os.getenv("CONVERSION_WORKERS", "4")),
+        "MAX_PENDING_JOBS": int(os.getenv("MAX_PENDING_JOBS", "500")),
+
+        # Server processes sharing the data folder (gunicorn.conf.py exports WEB_CONCURRENCY).
+        # Each worker heartbeats the jobs it runs every JOB_HEARTBEAT_SECONDS; jobs of a
+        # worker silent for JOB_LEASE_SECONDS are taken over by the others.
+        "WORKERS": int(os.getenv("WEB_CONCURRENCY", "1")),
+        "JOB_HEARTBEAT_SECONDS": float(os.getenv("JOB_HEARTBEAT_SECONDS", "10")),
+        "JOB_LEASE_SECONDS": float(os.getenv("JOB_LEASE_SECONDS", "60")),
+        # Seconds between job table reads on /events streams of jobs run by another worker
+        "SHARED_JOB_POLL_SECONDS": float(os.getenv("SHARED_JOB_POLL_SECONDS", "1")),
+
+        # Batch generation: shared worker pool size (also the per-request concurrency cap)
+        "BATCH_CONCURRENCY": int(os.getenv("BATCH_CONCURRENCY", "4")),
+        "MAX_BATCH_ITEMS": int(os.getenv("MAX_BATCH_ITEMS", "50")),
+
+        # Seconds between keep-alive comments on idle /events streams
+        "SSE_KEEPALIVE_SECONDS": float(os.getenv("SSE_KEEPALIVE_SECONDS", "15")),
+
+        # Prompt -> image cache (IMAGE_CACHE_ENABLED=0 to always call DALL-E)
+        "IMAGE_CACHE_ENABLED": os.getenv("IMAGE_CACHE_ENABLED", "1") == "1",
+        "IMAGE_CACHE_TTL": int(os.getenv("IMAGE_CACHE_TTL", str(7 * 24 * 3600))),
+        "IMAGE_CACHE_MAX_ENTRIES": int(os.getenv("IMAGE_CACHE_MAX_ENTRIES", "5000")),
+
+        # Largest page of /api/generations
+        "MAX_HISTORY_PAGE": int(os.getenv("MAX_HISTORY_PAGE", "100")),
+
+        # Meshy status polling: adaptive interval between these bounds, give up after the timeout
+        "MESHY_POLL_MIN_INTERVAL": float(os.getenv("MESHY_POLL_MIN_INTERVAL", "2")),
+        "MESHY_POLL_MAX_INTERVAL": float(os.getenv("MESHY_POLL_MAX_INTERVAL", "15")),
+        "MESHY_POLL_TIMEOUT": float(os.getenv("MESHY_POLL_TIMEOUT", "300")),
+        # Status fetches run on this many poller threads and give up (retrying at the
+        # next poll) rather than wait longer than MESHY_STATUS_RATE_LIMIT_WAIT for a slot
+        "MESHY_STATUS_WORKERS": int(os.getenv("MESHY_STATUS_WORKERS", "4")),
+        "MESHY_STATUS_RATE_LIMIT_WAIT": float(os.getenv("MESHY_STATUS_RATE_LIMIT_WAIT", "1")),
+        # Meshy status webhooks (POST /api/webhooks/meshy, signed with this shared secret;
+        # point the Meshy webhook at that URL). While set, polling is only a safety net
+        # for lost callbacks, every MESHY_WEBHOOK_POLL_INTERVAL seconds.
+        "MESHY_WEBHOOK_SECRET": os.getenv("MESHY_WEBHOOK_SECRET"),
+        "MESHY_WEBHOOK_POLL_INTERVAL": float(os.getenv("MESHY_WEBHOOK_POLL_INTERVAL", "30")),
+
+        # Also serve the browser pages (index_simplified.html, viewer.html and their
+        # script / stylesheet) from this server, as backend_with_viewer.py does
+        "SERVE_PAGES": os.getenv("SERVE_PAGES", "0") == "1",
+
+        # Asyncio serving mode (text_to_3d.aio): threads for blocking work (SQLite,
+        # hashing, GLB post-processing, static files), connections per upstream host
+        # (<NAME>_POOL_SIZE still overrides per upstream), and a much deeper queue since
+        # a pending conversion only costs a task and a polling coroutine there.
+        # CONVERSION_WORKERS still bounds how many create / download at once.
+        "ASYNC_IO_WORKERS": int(os.getenv("ASYNC_IO_WORKERS", "16")),
+        "ASYNC_POOL_SIZE": int(os.getenv("ASYNC_POOL_SIZE", "100")),
+        "ASYNC_MAX_PENDING_JOBS": int(os.getenv("ASYNC_MAX_PENDING_JOBS", "10000")),
+        # Seconds between checks of a job for changes on asyncio /events streams
+        "SSE_POLL_SECONDS": float(os.getenv("SSE_POLL_SECONDS", "0.25"))
+    }
+    config.update(overrides or {})
+    return config
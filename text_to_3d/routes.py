@@ -0,0 +1,646 @@
+"""
+HTTP routes of the Flask backend
+- The api blueprint: generation, conversion jobs, models, history, health, metrics, static files
+- The pages blueprint: the browser pages, for servers that also serve the frontend
+- Handlers reach the run-time state through current_services()
+"""
+
+import json
+import os
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, wait
+from datetime import datetime
+
+from flask import Blueprint, Response, current_app, jsonify, request, send_from_directory
+
+from circuit_breaker import CircuitOpenError
+from history import InvalidCursor
+from image_derivatives import FORMATS, webp_supported
+from jobs import QueueFullError
+from metrics import CONTENT_TYPE
+from rate_limit import BATCH, RateLimitTimeout, request_priority
+from webhooks import SIGNATURE_HEADER, verify
+
+from .services import HTTP_REQUESTS, HTTP_SECONDS, MESHY_WEBHOOKS, job_payload, log, thumbnail_url
+
+api = Blueprint('api', __name__)
+pages = Blueprint('pages', __name__)
+
+# Files of the browser frontend, next to the package
+PAGES_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGE_FILES = ('index_simplified.html', 'viewer.html', 'frontend_final.js', 'style_simplified.css')
+
+
+def current_services():
+    """
+    The app's Services, started on first use in this process
+    """
+    return current_app.extensions['text_to_3d'].start()
+
+
+def read_meshy_webhook(config, body, signature):
+    """
+    Check and decode a Meshy webhook request body.
+    Returns (status_data, None), or (None, (error message, HTTP status)).
+    """
+    secret = config['MESHY_WEBHOOK_SECRET']
+    if not secret:
+        return None, ('Meshy webhooks are not enabled', 404)
+
+    if not verify(secret, body, signature):
+        MESHY_WEBHOOKS.inc(outcome='rejected')
+        log.warning("🚫 Meshy webhook with a bad signature")
+        return None, ('Invalid signature', 401)
+
+    try:
+        status_data = json.loads(body)
+    except ValueError:
+        return None, ('Invalid JSON', 400)
+
+    if not isinstance(status_data, dict) or not status_data.get('id'):
+        return None, ('No task id', 400)
+
+    return status_data, None
+
+
+@api.route('/api/generate-image', methods=['POST'])
+def generate_image():
+    """
+    Generate image from user prompt (no Claude enhancement)
+    """
+    services = current_services()
+    try:
+        data = request.get_json()
+        user_prompt = data.get('idea', '').strip()
+
+        if not user_prompt:
+            return jsonify({
+                'success': False,
+                'error': 'No prompt provided'
+            }), 400
+
+        log.info("🎨 New image generation request", extra={'prompt': user_prompt})
+
+        image_url, image_path, cached = services.generate_or_reuse(user_prompt, fresh=data.get('fresh'))
+
+        # Generate unique ID
+        image_id = str(uuid.uuid4())
+        services.history.add(image_id, user_prompt, image_url, image_path, cached=cached)
+
+        log.info("✨ Image generation complete", extra={'image_id': image_id, 'image_url': image_url, 'cached': cached})
+
+        return jsonify({
+            'success': True,
+            'image_id': image_id,
+            'image_url': image_url,
+            'thumbnail_url': thumbnail_url(image_url),
+            'image_path': image_path,  # Store for 3D conversion
+            'prompt': user_prompt,
+            'cached': cached,
+            'timestamp': datetime.now().isoformat()
+        })
+
+    except (CircuitOpenError, RateLimitTimeout) as e:
+        log.warning(f"⚠️ {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 503
+
+    except Exception as e:
+        log.exception(f"❌ Error: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@api.route('/api/generate-images', methods=['POST'])
+def generate_images():
+    """
+    Batch image generation: {"prompts": [...], "variants": 1, "concurrency": 4, "fresh": false}
+    Items run in parallel (at most `concurrency` at a time) and each result is
+    streamed back as one NDJSON line as soon as it finishes, followed by a
+    summary line. A failed item is reported on its own line; the rest carry on.
+    """
+    services = current_services()
+    batch_concurrency = services.config['BATCH_CONCURRENCY']
+    max_batch_items = services.config['MAX_BATCH_ITEMS']
+
+    data = request.get_json(silent=True) or {}
+    prompts = data.get('prompts')
+
+    if not isinstance(prompts, list) or not prompts:
+        return jsonify({
+            'success': False,
+            'error': 'prompts must be a non-empty list'
+        }), 400
+
+    prompts = [str(prompt).strip() for prompt in prompts]
+    if not all(prompts):
+        return jsonify({
+            'success': False,
+            'error': 'prompts must not be empty'
+        }), 400
+
+    try:
+        variants = int(data.get('variants', 1))
+        concurrency = int(data.get('concurrency', batch_concurrency))
+    except (TypeError, ValueError):
+        return jsonify({
+            'success': False,
+            'error': 'variants and concurrency must be integers'
+        }), 400
+
+    items = [(prompt, variant) for prompt in prompts for variant in range(max(1, variants))]
+    if len(items) > max_batch_items:
+        return jsonify({
+            'success': False,
+            'error': f'Batch too large: {len(items)} items (max {max_batch_items})'
+        }), 400
+
+    concurrency = min(max(1, concurrency), batch_concurrency)
+    fresh = bool(data.get('fresh'))
+
+    log.info("🎨 Batch generation request", extra={'items': len(items), 'concurrency': concurrency})
+
+    def run_item(index, prompt, variant):
+        try:
+            # Batch items queue behind interactive requests for upstream rate limits
+            with request_priority(BATCH):
+                image_url, image_path, cached = services.generate_or_reuse(prompt, fresh=fresh, variant=variant)
+            image_id = str(uuid.uuid4())
+            services.history.add(image_id, prompt, image_url, image_path, cached=cached)
+            return {
+                'index': index,
+                'success': True,
+                'image_id': image_id,
+                'image_url': image_url,
+                'thumbnail_url': thumbnail_url(image_url),
+                'image_path': image_path,
+                'prompt': prompt,
+                'variant': variant,
+                'cached': cached,
+                'timestamp': datetime.now().isoformat()
+            }
+        except Exception as e:
+            log.error(f"❌ Batch item failed: {e}", extra={'index': index})
+            return {
+                'index': index,
+                'success': False,
+                'prompt': prompt,
+                'variant': variant,
+                'error': str(e)
+            }
+
+    def stream():
+        pending = iter(enumerate(items))
+        in_flight = set()
+        succeeded = failed = 0
+
+        try:
+            while True:
+                # Top up to the concurrency limit, then emit whatever finishes first
+                for index, (prompt, variant) in pending:
+                    in_flight.add(services.batch_executor.submit(run_item, index, prompt, variant))
+                    if len(in_flight) >= concurrency:
+                        break
+
+                if not in_flight:
+                    break
+
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    if result['success']:
+                        succeeded += 1
+                    else:
+                        failed += 1
+                    yield json.dumps(result) + "\n"
+        finally:
+            # Client went away: don't start work nobody will read
+            for future in in_flight:
+                future.cancel()
+
+        log.info("✨ Batch complete", extra={'succeeded': succeeded, 'failed': failed})
+        yield json.dumps({
+            'done': True,
+            'total': len(items),
+            'succeeded': succeeded,
+            'failed': failed
+        }) + "\n"
+
+    return Response(stream(), mimetype='application/x-ndjson', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+@api.route('/api/convert-to-3d', methods=['POST'])
+def convert_to_3d():
+    """
+    Queue conversion of a generated image to a 3D model using Meshy AI.
+    Returns a job id right away; poll /api/jobs/<job_id> for the result.
+    """
+    services = current_services()
+    try:
+        data = request.get_json()
+        image_path = data.get('image_path')
+        prompt = data.get('prompt')
+
+        if not image_path:
+            return jsonify({
+                'success': False,
+                'error': 'No image path provided'
+            }), 400
+
+        image_path, image_hash, cached = services.prepare_conversion(image_path)
+
+        if image_hash is None:
+            return jsonify({
+                'success': False,
+                'error': f'Image not found: {image_path}'
+            }), 404
+
+        log.info("🎭 3D conversion request", extra={'image_path': image_path})
+
+        if cached:
+            log.info("♻️ Conversion cache hit", extra={'model_url': cached['model_url']})
+            return jsonify({
+                'success': True,
+                'model_url': cached['model_url'],
+                'cached': True
+            })
+
+        # Meshy is failing: say so now rather than queue a job that will fail
+        if not services.meshy_breaker.available():
+            raise CircuitOpenError("Meshy AI is unavailable right now, please retry shortly")
+
+        job, shared = services.submit_conversion(image_path, image_hash, prompt)
+
+        if shared:
+            log.info("🔗 Joined in-flight conversion job", extra={'job_id': job.id})
+        else:
+            log.info("📥 Queued conversion job", extra={'job_id': job.id})
+
+        return jsonify({
+            'success': True,
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': f"/api/jobs/{job.id}",
+            'coalesced': shared
+        }), 202
+
+    except (QueueFullError, CircuitOpenError) as e:
+        log.warning(f"⚠️ {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 503
+
+    except Exception as e:
+        log.exception(f"❌ 3D conversion error: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@api.route('/api/text-to-3d', methods=['POST'])
+def text_to_3d():
+    """
+    Prompt to 3D model in one job: {"idea": "...", "fresh": false}
+    The Meshy task starts as soon as DALL-E has made the image, while the image
+    is saved, thumbnailed and indexed alongside. Returns a job id right away;
+    /api/jobs/<job_id> shows the image once it is saved, then the model, with
+    the seconds spent in each stage under result.timings.
+    """
+    services = current_services()
+    try:
+        data = request.get_json(silent=True) or {}
+        user_prompt = str(data.get('idea', '')).strip()
+
+        if not user_prompt:
+            return jsonify({
+                'success': False,
+                'error': 'No prompt provided'
+            }), 400
+
+        log.info("🚀 Text-to-3D request", extra={'prompt': user_prompt})
+
+        # An upstream is failing: say so now rather than queue a job that will fail
+        for breaker in (services.openai_breaker, services.meshy_breaker):
+            if not breaker.available():
+                raise CircuitOpenError(f"{breaker.name} is unavailable right now, please retry shortly")
+
+        job, shared = services.submit_text_to_3d(user_prompt, fresh=bool(data.get('fresh')))
+
+        if shared:
+            log.info("🔗 Joined in-flight text-to-3D job", extra={'job_id': job.id})
+        else:
+            log.info("📥 Queued text-to-3D job", extra={'job_id': job.id})
+
+        return jsonify({
+            'success': True,
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': f"/api/jobs/{job.id}",
+            'coalesced': shared
+        }), 202
+
+    except (QueueFullError, CircuitOpenError) as e:
+        log.warning(f"⚠️ {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 503
+
+    except Exception as e:
+        log.exception(f"❌ Text-to-3D error: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@api.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Report status, progress and result of a background job
+    (from the job table if another worker runs it)
+    """
+    job = current_services().job_queue.get(job_id)
+
+    if not job:
+        return jsonify({
+            'success': False,
+            'error': 'Job not found'
+        }), 404
+
+    return jsonify(job_payload(job.to_dict()))
+
+
+@api.route('/api/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """
+    Server-Sent Events stream of a job's status and progress changes.
+    Sends a 'progress' event per change and a final 'done' event, then closes.
+    """
+    services = current_services()
+    job_queue = services.job_queue
+    keepalive = services.config['SSE_KEEPALIVE_SECONDS']
+    shared_poll = services.config['SHARED_JOB_POLL_SECONDS']
+    job = job_queue.get(job_id)
+
+    if not job:
+        return jsonify({
+            'success': False,
+            'error': 'Job not found'
+        }), 404
+
+    def stream(job):
+        version, last_sent, sent = None, None, 0
+        idle_since = time.monotonic()
+        while True:
+            # A job run by another worker only changes in the job table, so
+            # that is re-read every shared_poll seconds instead of waited on
+            local = job_queue.is_local(job_id)
+            version, job_data = job.watch(version, timeout=keepalive if local else shared_poll)
+
+            if job_data == last_sent:
+                if time.monotonic() - idle_since >= keepalive:
+                    # Keep proxies from closing the idle connection
+                    yield ": keep-alive\n\n"
+                    idle_since = time.monotonic()
+                refreshed = job_queue.get(job_id)
+                if refreshed is not None and refreshed is not job:
+                    job, version = refreshed, refreshed.version
+                continue
+
+            last_sent, sent = job_data, sent + 1
+            idle_since = time.monotonic()
+            finished = job_data['status'] in ('succeeded', 'failed')
+            event = 'done' if finished else 'progress'
+            yield f"id: {sent}\nevent: {event}\ndata: {json.dumps(job_payload(job_data))}\n\n"
+
+            if finished:
+                return
+
+    return Response(stream(job), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
+@api.route('/api/webhooks/meshy', methods=['POST'])
+def meshy_webhook():
+    """
+    Status push for a Meshy task, signed with MESHY_WEBHOOK_SECRET
+    (X-Meshy-Signature: sha256=<HMAC-SHA256 of the body>). A final status
+    settles the task at once, so the GLB download starts without waiting
+    for the next poll. Unknown or finished tasks are acknowledged too, so
+    Meshy doesn't retry them.
+    """
+    services = current_services()
+    status_data, error = read_meshy_webhook(services.config, request.get_data(), request.headers.get(SIGNATURE_HEADER))
+
+    if error:
+        message, code = error
+        return jsonify({
+            'success': False,
+            'error': message
+        }), code
+
+    return jsonify({
+        'success': True,
+        'outcome': services.receive_meshy_status(status_data)
+    })
+
+
+@api.route('/api/health', methods=['GET'])
+def health_check():
+    """Health check endpoint"""
+    return jsonify(current_services().health_report())
+
+
+@api.route('/api/images/<filename>', methods=['GET'])
+def get_image(filename):
+    """
+    A generated image resized for display: ?w= picks the smallest derivative
+    at least that wide, and WebP is served to browsers that accept it.
+    Without Pillow the original file is served.
+    """
+    services = current_services()
+    image_derivatives = services.image_derivatives
+    image_path = services.asset_store.locate('generated_images', os.path.basename(filename))
+
+    if not image_path:
+        return jsonify({
+            'success': False,
+            'error': 'Image not found'
+        }), 404
+
+    try:
+        width = image_derivatives.pick_width(int(request.args.get('w', 0)))
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'w must be an integer'
+        }), 400
+
+    if 'image/webp' in request.headers.get('Accept', '') and webp_supported():
+        format_name = 'webp'
+    else:
+        format_name = 'jpeg' if width else None
+
+    derivative_path = None
+    if format_name and image_derivatives.available:
+        try:
+            derivative_path = image_derivatives.get(image_path, width, format_name)
+        except OSError as e:
+            log.warning(f"⚠️ Serving original, derivative failed: {e}", extra={'image': filename})
+
+    # The URL names the image, not the variant, so it is cached for a day rather than forever
+    if derivative_path:
+        return services.static_files.send(derivative_path, mimetype=FORMATS[format_name][1], max_age=86400, vary='Accept')
+    return services.static_files.send(image_path, max_age=86400, vary='Accept')
+
+
+@api.route('/api/models', methods=['GET'])
+def list_models():
+    """
+    Query the model index, newest first.
+    Optional filters: min_triangles, max_triangles, min_bytes, max_bytes; paging: limit, offset
+    """
+    model_index = current_services().model_index
+    try:
+        filters = {
+            name: int(request.args[name])
+            for name in ('min_triangles', 'max_triangles', 'min_bytes', 'max_bytes')
+            if request.args.get(name)
+        }
+        limit = min(int(request.args.get('limit', 50)), 500)
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'Filters and paging parameters must be integers'
+        }), 400
+
+    return jsonify({
+        'success': True,
+        'models': model_index.query(limit=limit, offset=offset, **filters),
+        'totals': model_index.totals()
+    })
+
+
+@api.route('/api/models/<model_id>', methods=['GET'])
+def get_model(model_id):
+    """
+    Stats of one indexed model (id = GLB file name without extension)
+    """
+    model = current_services().model_index.get(model_id)
+
+    if not model:
+        return jsonify({
+            'success': False,
+            'error': 'Model not found'
+        }), 404
+
+    return jsonify({'success': True, 'model': model})
+
+
+def parse_time(value):
+    """
+    Epoch seconds from a query parameter: a number, or an ISO date / datetime
+    (naive values are local time)
+    """
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+@api.route('/api/generations', methods=['GET'])
+def list_generations():
+    """
+    Generation history, newest first, one page at a time.
+    Optional filters: q (prompt text), since / until (ISO date or epoch seconds);
+    paging: limit, cursor (the next_cursor of the previous page)
+    """
+    services = current_services()
+    try:
+        limit = min(max(int(request.args.get('limit', 20)), 1), services.config['MAX_HISTORY_PAGE'])
+        since = parse_time(request.args['since']) if request.args.get('since') else None
+        until = parse_time(request.args['until']) if request.args.get('until') else None
+    except ValueError:
+        return jsonify({
+            'success': False,
+            'error': 'limit must be an integer, since / until ISO dates or epoch seconds'
+        }), 400
+
+    try:
+        generations, next_cursor = services.history.page(
+            cursor=request.args.get('cursor') or None,
+            limit=limit,
+            since=since,
+            until=until,
+            query=request.args.get('q')
+        )
+    except InvalidCursor as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+    for generation in generations:
+        generation['thumbnail_url'] = thumbnail_url(generation['image_url'])
+        generation['timestamp'] = datetime.fromtimestamp(generation.pop('created_at')).isoformat()
+
+    return jsonify({
+        'success': True,
+        'generations': generations,
+        'next_cursor': next_cursor
+    })
+
+
+@api.before_app_request
+def start_request_timer():
+    request.environ['metrics.started'] = time.monotonic()
+
+
+@api.after_app_request
+def record_request_metrics(response):
+    # The route pattern, not the path, so ids don't explode the label set
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    HTTP_REQUESTS.inc(method=request.method, route=route, status=response.status_code)
+    started = request.environ.get('metrics.started')
+    if started is not None:
+        HTTP_SECONDS.observe(time.monotonic() - started, method=request.method, route=route)
+    return response
+
+
+@api.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus scrape endpoint (the figures of every worker process, summed)"""
+    return Response(current_services().render_metrics(), content_type=CONTENT_TYPE)
+
+
+# Serve static files
+@api.route('/static/<path:path>')
+def serve_static(path):
+    services = current_services()
+    # Counts as an access for LRU eviction; evicted local copies are fetched back from the backend
+    if services.asset_store.ensure_local(path):
+        services.asset_store.touch(path)
+    return services.static_files.serve(path)
+
+
+def serve_page():
+    """Browser frontend: the generator page, the 3D viewer and their assets"""
+    return send_from_directory(PAGES_FOLDER, request.path.lstrip('/'))
+
+
+for filename in PAGE_FILES:
+    pages.add_url_rule(f'/{filename}', view_func=serve_page)
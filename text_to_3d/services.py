@@ -0,0 +1,1204 @@
+"""
+Run-time state of the backend and the generation / conversion pipeline
+- Services holds the upstream clients, stores, caches, job queue and poller
+  built from one config dict, and the pipeline steps that use them
+- Nothing is created before start(), which a multi-process server calls in
+  each worker after forking (or the first request does)
+- Durable state (jobs, caches, indexes, history, assets) lives in SQLite /
+  storage under DATA_FOLDER, shared by every worker process
+- Metrics are process-wide, so they are defined once here; with several
+  workers /metrics sums the figures all of them leave under DATA_FOLDER
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from downloads import stream_download
+from glb import GLBError, inspect_glb_file
+from glb_postprocess import build_lods, manifest_path
+from history import GenerationHistory
+from http_clients import client_from_env
+from image_cache import PromptImageCache, cache_key
+from image_derivatives import DerivativeStore
+from image_upload import Base64JsonBody, SourceUrlRegistry
+from job_store import JobStore, worker_id
+from jobs import DuplicateJobError, Job, JobQueue
+from meshy_poller import MeshyPoller
+from metrics import REGISTRY, Counter, Gauge, Histogram, SharedMetrics
+from model_cache import ConversionCache, conversion_key, file_sha256
+from model_index import ModelIndex
+from rate_limit import RateLimiter, RateLimitTimeout, parse_limits
+from singleflight import SingleFlight
+from static_files import StaticFiles
+from storage import AssetStore, LocalBackend, S3Backend
+
+log = logging.getLogger('backend')
+
+# Metrics served on /metrics (upstream calls and Meshy task times are
+# recorded in http_clients.py and meshy_poller.py)
+HTTP_REQUESTS = Counter('http_requests_total', 'API requests by method, route and status', ['method', 'route', 'status'])
+HTTP_SECONDS = Histogram(
+    'http_request_seconds',
+    'Time to produce a response (to the first byte for streamed responses)',
+    ['method', 'route']
+)
+STAGE_SECONDS = Histogram('pipeline_stage_seconds', 'Duration of each generation / conversion stage', ['stage'])
+BYTES_WRITTEN = Counter('bytes_written_total', 'Bytes of assets written to storage, by kind', ['kind'])
+JOBS = Gauge('jobs', 'Background jobs held by the queue, by status', ['status'])
+QUEUE_DEPTH = Gauge('job_queue_depth', 'Conversion jobs waiting for a worker')
+MESHY_IN_FLIGHT = Gauge('meshy_tasks_in_flight', 'Meshy tasks currently being polled')
+CIRCUIT_OPEN = Gauge('circuit_open', 'Whether an upstream circuit breaker is open (1) or not (0)', ['upstream'])
+MESHY_WEBHOOKS = Counter(
+    'meshy_webhooks_total',
+    'Meshy status callbacks by outcome (applied here, relayed to another worker, ignored, rejected)',
+    ['outcome']
+)
+
+
+def thumbnail_url(image_url, width=256):
+    return f"/api/images/{os.path.basename(image_url)}?w={width}"
+
+
+def model_id(model_path):
+    return os.path.splitext(os.path.basename(model_path))[0]
+
+
+def meshy_poll_intervals(config):
+    """
+    (min, max) seconds between status polls of a Meshy task: progress-adaptive,
+    or a slow safety net for lost callbacks when Meshy pushes to the webhook
+    """
+    if config['MESHY_WEBHOOK_SECRET']:
+        return config['MESHY_WEBHOOK_POLL_INTERVAL'], config['MESHY_WEBHOOK_POLL_INTERVAL']
+    return config['MESHY_POLL_MIN_INTERVAL'], config['MESHY_POLL_MAX_INTERVAL']
+
+
+@contextmanager
+def image_generation_errors():
+    """
+    Around an image generation: circuit / rate limit errors keep their type
+    (routes answer 503 for them), anything else becomes "Image generation failed"
+    """
+    try:
+        yield
+    except (CircuitOpenError, RateLimitTimeout):
+        raise
+    except Exception as e:
+        log.error(f"❌ Error generating image: {e}")
+        raise Exception(f"Image generation failed: {str(e)}")
+
+
+def job_payload(job_data):
+    """
+    Public JSON form of a job: its fields plus success and, once done, the result
+    """
+    payload = dict(job_data)
+    payload['success'] = job_data['status'] != 'failed'
+
+    if job_data['status'] == 'succeeded' and job_data['result']:
+        payload.update(job_data['result'])
+
+    return payload
+
+
+class PipelineResult:
+    """
+    Result of a text-to-3D job as it builds up: the fields of each finished
+    stage plus timings (seconds per stage), published on the job as they
+    arrive so clients see the image before the model. Stages may finish on
+    different threads.
+    """
+
+    def __init__(self, job):
+        self.job = job
+        # A resumed job keeps what its earlier run had found out
+        self.fields = dict(job.result or {})
+        self.timings = dict(self.fields.pop('timings', {}))
+        self._lock = threading.Lock()
+
+    def record(self, stage, started, **fields):
+        """
+        Note that stage (begun at time.monotonic() value started) is done
+        """
+        with self._lock:
+            self.timings[stage] = round(time.monotonic() - started, 3)
+            self.fields.update(fields)
+            result = self._result()
+        self.job.update(result=result)
+
+    def get(self, field, default=None):
+        with self._lock:
+            return self.fields.get(field, default)
+
+    def final(self):
+        """
+        The finished result, with the end-to-end time since the job was queued
+        """
+        total = (datetime.now() - datetime.fromisoformat(self.job.created_at)).total_seconds()
+        STAGE_SECONDS.observe(total, stage='text_to_3d')
+        with self._lock:
+            self.timings['total'] = round(total, 3)
+            return self._result()
+
+    def _result(self):
+        return dict(self.fields, timings=dict(self.timings))
+
+
+class Services:
+    """
+    Everything the routes need at run time, built from a config dict
+    (see config.load_config). Attributes exist once start() has run.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.started = False
+        self._lock = threading.Lock()
+
+    def start(self, background=True):
+        """
+        Create folders, stores, clients and worker pools; once per process, so
+        call it after a server forks its workers. With background, also take
+        over unfinished conversions and keep this worker's job leases alive.
+        """
+        if self.started:
+            return self
+
+        with self._lock:
+            if self.started:
+                return self
+            self._build()
+            self.started = True
+
+        if background:
+            self._start_background_work()
+        return self
+
+    def _build(self):
+        config = self.config
+
+        # Outbound rate limits are for the whole server: each worker gets its share
+        workers = max(1, config['WORKERS'])
+        self.rate_limiter = RateLimiter(
+            {
+                name: (rate / workers, max(1.0, burst / workers))
+                for name, (rate, burst) in parse_limits(config['RATE_LIMITS']).items()
+            },
+            max_wait=config['RATE_LIMIT_MAX_WAIT']
+        )
+
+        self.openai_breaker = CircuitBreaker("OpenAI", slow_call_seconds=45, **config['CIRCUIT_SETTINGS'])
+        self.meshy_breaker = CircuitBreaker("Meshy AI", slow_call_seconds=15, **config['CIRCUIT_SETTINGS'])
+        self.asset_breaker = CircuitBreaker("Asset downloads", slow_call_seconds=30, **config['CIRCUIT_SETTINGS'])
+        self.circuit_breakers = {
+            "openai": self.openai_breaker,
+            "meshy": self.meshy_breaker,
+            "assets": self.asset_breaker
+        }
+
+        # Pooled keep-alive HTTP clients (one per upstream; see http_clients.py for env overrides)
+        self.openai_client = client_from_env(
+            "openai", config['OPENAI_API_URL'], timeout=60,
+            rate_limiter=self.rate_limiter, circuit_breaker=self.openai_breaker
+        )
+        self.meshy_client = client_from_env(
+            "meshy", config['MESHY_API_URL'], timeout=30,
+            rate_limiter=self.rate_limiter, circuit_breaker=self.meshy_breaker
+        )
+        self.asset_client = client_from_env(
+            "assets", timeout=60,
+            rate_limiter=self.rate_limiter, circuit_breaker=self.asset_breaker
+        )
+
+        os.makedirs(config['UPLOAD_FOLDER'], exist_ok=True)
+        os.makedirs(config['MODELS_FOLDER'], exist_ok=True)
+
+        self.image_derivatives = DerivativeStore(config['DERIVATIVES_FOLDER'], widths=config['IMAGE_DERIVATIVE_WIDTHS'])
+        self.derivative_executor = ThreadPoolExecutor(
+            max_workers=config['DERIVATIVE_WORKERS'],
+            thread_name_prefix='derivative-worker'
+        )
+
+        static_folder = config['STATIC_FOLDER']
+        self.static_files = StaticFiles(
+            static_folder,
+            immutable_prefixes=('generated_images/', '3d_models/', 'derivatives/'),
+            sendfile_mode=config['STATIC_SENDFILE'],
+            accel_prefix=config['STATIC_ACCEL_PREFIX']
+        )
+
+        data_folder = config['DATA_FOLDER']
+        if config['STORAGE_BACKEND'] == 's3':
+            storage_backend = S3Backend(
+                static_folder,
+                bucket=config['S3_BUCKET'],
+                prefix=config['S3_PREFIX'],
+                endpoint_url=config['S3_ENDPOINT_URL'],
+                region=config['S3_REGION']
+            )
+        else:
+            storage_backend = LocalBackend(static_folder)
+        self.asset_store = AssetStore(
+            os.path.join(data_folder, "assets.db"),
+            storage_backend,
+            quota_bytes=config['STORAGE_QUOTA_BYTES'],
+            ttl=config['STORAGE_TTL_SECONDS'],
+            on_evict=self.forget_asset
+        )
+
+        # Named after this process, so the name differs in every forked worker
+        self.job_store = JobStore(os.path.join(data_folder, "jobs.db"), owner=worker_id())
+        # A scrape reaches one worker at random: each one writes its figures
+        # (at every heartbeat) next to the others' and answers with the sum
+        self.shared_metrics = None
+        if config['WORKERS'] > 1:
+            self.shared_metrics = SharedMetrics(
+                os.path.join(data_folder, "metrics"),
+                gauge_max_age=3 * config['JOB_HEARTBEAT_SECONDS']
+            )
+        self.job_queue = JobQueue(
+            max_workers=config['CONVERSION_WORKERS'],
+            max_pending=config['MAX_PENDING_JOBS'],
+            store=self.job_store
+        )
+
+        self.batch_executor = ThreadPoolExecutor(
+            max_workers=config['BATCH_CONCURRENCY'], thread_name_prefix='batch-worker'
+        )
+
+        # Saves text-to-3D images while their job thread starts the Meshy task
+        self.pipeline_executor = ThreadPoolExecutor(
+            max_workers=config['CONVERSION_WORKERS'], thread_name_prefix='pipeline-worker'
+        )
+
+        self.image_cache = PromptImageCache(
+            os.path.join(data_folder, "cache.db"),
+            ttl=config['IMAGE_CACHE_TTL'],
+            max_entries=config['IMAGE_CACHE_MAX_ENTRIES']
+        ) if config['IMAGE_CACHE_ENABLED'] else None
+
+        # Image hash -> GLB cache of finished conversions
+        self.model_cache = ConversionCache(os.path.join(data_folder, "cache.db"))
+
+        # Validated GLBs and their stats (counts, textures, bounding box)
+        self.model_index = ModelIndex(os.path.join(data_folder, "models.db"))
+
+        # Every generation (fresh or reused) for the gallery, searchable by prompt
+        self.history = GenerationHistory(os.path.join(data_folder, "history.db"))
+
+        # Coalesce identical concurrent generations / conversions into one upstream
+        # call (within this process; the job table dedupes conversions across workers)
+        self.image_flight = SingleFlight()
+        self.conversion_flight = SingleFlight()
+        self.pipeline_flight = SingleFlight()
+
+        # Upstream URLs of images generated by this process, reused for Meshy while still valid
+        self.image_sources = SourceUrlRegistry()
+
+        min_interval, max_interval = meshy_poll_intervals(config)
+        self.meshy_poller = MeshyPoller(
+            self.fetch_meshy_status,
+            min_interval=min_interval,
+            max_interval=max_interval,
+            timeout=config['MESHY_POLL_TIMEOUT'],
+            fetch_workers=config['MESHY_STATUS_WORKERS']
+        )
+
+        JOBS.set_function(lambda: self.job_queue.stats()['jobs'])
+        QUEUE_DEPTH.set_function(lambda: self.job_queue.stats()['jobs'].get('queued', 0))
+        MESHY_IN_FLIGHT.set_function(lambda: self.meshy_poller.in_flight())
+        CIRCUIT_OPEN.set_function(lambda: {
+            name: int(breaker.stats()['state'] != 'closed') for name, breaker in self.circuit_breakers.items()
+        })
+
+    def _start_background_work(self):
+        # Alone on the data folder, every unfinished job is ours to resume;
+        # next to other workers, only those whose lease has run out
+        stale_after = 0 if self.config['WORKERS'] <= 1 else self.config['JOB_LEASE_SECONDS']
+        self.resume_unfinished_jobs(stale_after)
+        self.asset_store.evict()
+        threading.Thread(target=self._keep_leases, name='job-leases', daemon=True).start()
+        if self.config['MESHY_WEBHOOK_SECRET'] and self.config['WORKERS'] > 1:
+            threading.Thread(target=self._apply_relayed_statuses, name='meshy-relay', daemon=True).start()
+
+    def _keep_leases(self):
+        while True:
+            time.sleep(self.config['JOB_HEARTBEAT_SECONDS'])
+            try:
+                self.job_store.heartbeat()
+                self.resume_unfinished_jobs(self.config['JOB_LEASE_SECONDS'])
+                if self.shared_metrics:
+                    self.shared_metrics.dump()
+            except Exception as e:
+                log.warning(f"⚠️ Job lease upkeep failed: {e}")
+
+    def _apply_relayed_statuses(self):
+        # Webhooks for this worker's tasks that another worker received
+        while True:
+            time.sleep(self.config['SHARED_JOB_POLL_SECONDS'])
+            try:
+                for task_id, status_data in self.job_store.take_pushed():
+                    self.meshy_poller.push(task_id, status_data)
+            except Exception as e:
+                log.warning(f"⚠️ Could not apply relayed Meshy statuses: {e}")
+
+    # ==================== HELPER FUNCTIONS ====================
+
+    def render_metrics(self):
+        """
+        /metrics page: this process's figures, or with several workers all of theirs summed
+        """
+        if self.shared_metrics:
+            return self.shared_metrics.render()
+        return REGISTRY.render()
+
+    def public_image_url(self, image_path):
+        """
+        Public URL of a generated image, if this server is reachable from the internet
+        """
+        if not self.config['PUBLIC_BASE_URL']:
+            return None
+
+        upload_folder = os.path.abspath(self.config['UPLOAD_FOLDER'])
+        absolute_path = os.path.abspath(image_path)
+        if not absolute_path.startswith(upload_folder + os.sep):
+            return None
+
+        return f"{self.config['PUBLIC_BASE_URL']}/static/{self.asset_store.key_for_path(absolute_path)}"
+
+    def static_path(self, url):
+        """
+        Local path of a /static/... URL
+        """
+        return self.asset_store.path(url[len('/static/'):])
+
+    def image_url_for(self, image_path):
+        """
+        /static/... URL of a stored image
+        """
+        return f"/static/{self.asset_store.key_for_path(image_path)}"
+
+    def forget_asset(self, key, kind):
+        """
+        Drop index entries of an evicted asset (caches notice the missing file themselves)
+        """
+        if kind == 'model':
+            self.model_index.remove(model_id(key))
+            self.history.forget_model(f"/static/{key}")
+        elif kind == 'image':
+            self.history.forget_image(f"/static/{key}")
+
+    def local_image_path(self, image_path):
+        """
+        File path of an image given as a /static/... URL or a path, fetched back
+        from the storage backend if only a remote copy is left; None if the
+        path leads (through '..' or a symlink) outside UPLOAD_FOLDER and the
+        asset store, as the file would be uploaded to Meshy
+        """
+        # Convert relative URL to file path if needed
+        if image_path.startswith('/static/'):
+            image_path = image_path.replace('/static/', 'static/')
+
+        # Handle Windows backslashes
+        image_path = image_path.replace('\\', '/')
+
+        # With a remote storage backend the local copy may have to be fetched first
+        if not os.path.isfile(image_path) and image_path.startswith('static/'):
+            image_path = self.asset_store.ensure_local(image_path[len('static/'):]) or image_path
+
+        real_path = os.path.realpath(image_path)
+        for folder in (self.config['UPLOAD_FOLDER'], self.asset_store.backend.root):
+            if real_path.startswith(os.path.join(os.path.realpath(folder), '')):
+                return image_path
+
+        log.warning("🚫 Image path outside the asset folders", extra={'image_path': image_path})
+        return None
+
+    def meshy_headers(self):
+        return {
+            "Authorization": f"Bearer {self.config['MESHY_API_KEY']}",
+            "Content-Type": "application/json"
+        }
+
+    # The pieces of each upstream call that don't depend on how it is sent:
+    # *_request() builds it, a parser reads the reply. The Flask app's methods
+    # below and text_to_3d.aio's coroutines both send them.
+
+    def dalle_request(self, prompt):
+        """
+        (path, request kwargs) asking DALL-E 3 for an image of prompt
+        """
+        log.info("📸 Generating image with DALL-E 3", extra={'prompt': prompt})
+
+        headers = {
+            "Authorization": f"Bearer {self.config['OPENAI_API_KEY']}",
+            "Content-Type": "application/json"
+        }
+
+        payload = {
+            "prompt": prompt,
+            "n": 1,
+            **self.config['DALLE_PARAMS']
+        }
+
+        return "/v1/images/generations", {'json': payload, 'headers': headers, 'rate_class': "generation"}
+
+    def dalle_image_url(self, response):
+        """
+        The (temporary) upstream URL of the image in a DALL-E reply
+        """
+        if response.status_code != 200:
+            error_msg = response.json().get('error', {}).get('message', 'Unknown error')
+            raise Exception(f"OpenAI API error: {error_msg}")
+
+        data = response.json()
+        image_url = data['data'][0]['url']
+
+        log.debug("✅ Image generated", extra={'upstream_url': image_url})
+
+        return image_url
+
+    def meshy_create_request(self, image_path, image_url=None):
+        """
+        (path, JSON payload, body) starting a Meshy AI image-to-3D task for a
+        saved image (or one only known by its image_url so far).
+        Passes a fetchable URL for the image in the payload when one is known
+        (body is None); otherwise body is a Base64JsonBody that streams the
+        file as a base64 data URL (/openapi/v1/image-to-3d accepts both)
+        """
+        log.info("🎭 Starting 3D conversion with Meshy AI", extra={'image_path': image_path or image_url})
+
+        # Create 3D conversion task - CORRECT ENDPOINT
+        url = "/openapi/v1/image-to-3d"
+
+        payload = dict(self.config['MESHY_PARAMS'])
+
+        # Prefer a URL Meshy can fetch itself over uploading the bytes
+        image_reference = image_url or self.image_sources.lookup(image_path) or self.public_image_url(image_path)
+
+        if image_reference:
+            log.debug("🔗 Passing image by URL", extra={'image_reference': image_reference})
+            payload["image_url"] = image_reference
+            return url, payload, None
+
+        log.debug("📤 Streaming image as base64 data URL")
+        return url, payload, Base64JsonBody(payload, "image_url", image_path)
+
+    def meshy_task_id(self, response):
+        """
+        The task id in Meshy's reply to a create request
+        """
+        log.debug("Meshy create response", extra={'status_code': response.status_code, 'body': response.text})
+
+        if response.status_code not in [200, 201, 202]:
+            error_msg = response.text
+            raise Exception(f"Meshy API error ({response.status_code}): {error_msg}")
+
+        result = response.json()
+
+        # Extract task ID
+        task_id = result.get('result')
+
+        if not task_id:
+            raise Exception(f"No task ID in response. Got: {result}")
+
+        log.info("✅ Meshy task created", extra={'task_id': task_id})
+
+        return task_id
+
+    def meshy_status_request(self, task_id):
+        """
+        (path, request kwargs) fetching a Meshy task's status. A throttled
+        fetch raises RateLimitTimeout at once; the poller backs off.
+        """
+        return f"/openapi/v1/image-to-3d/{task_id}", {
+            'headers': self.meshy_headers(),
+            'rate_class': "status",
+            'rate_limit_wait': self.config['MESHY_STATUS_RATE_LIMIT_WAIT']
+        }
+
+    def meshy_status_data(self, response):
+        """
+        The status JSON in Meshy's reply to a status request
+        """
+        if response.status_code not in (200, 202):
+            raise Exception(f"Meshy status error ({response.status_code}): {response.text}")
+
+        return response.json()
+
+    def image_destination(self):
+        """
+        (storage key, local path) for a new generated image
+        """
+        return self.asset_store.allocate('generated_images', f"{uuid.uuid4()}.png")
+
+    def model_destination(self, status_data):
+        """
+        (GLB URL, storage key, local path) to download a finished Meshy task's model
+        """
+        # Get model download URL
+        model_urls = status_data.get('model_urls', {})
+        glb_url = model_urls.get('glb')
+
+        if not glb_url:
+            raise Exception(f"No GLB model URL in response: {status_data}")
+
+        log.debug("✅ 3D model ready, downloading", extra={'upstream_url': glb_url})
+
+        model_key, model_path = self.asset_store.allocate('3d_models', f"{uuid.uuid4()}.glb")
+        return glb_url, model_key, model_path
+
+    def request_dalle_image(self, prompt):
+        """
+        Ask DALL-E 3 for an image; returns its (temporary) upstream URL
+        """
+        url, kwargs = self.dalle_request(prompt)
+        with STAGE_SECONDS.time(stage='dalle_generate'):
+            response = self.openai_client.post(url, **kwargs)
+
+        return self.dalle_image_url(response)
+
+    def download_image(self, source_url):
+        """
+        Download a generated image and save it locally (streamed straight to disk)
+        Returns (image_url, image_path, sha256)
+        """
+        image_key, image_path = self.image_destination()
+        with STAGE_SECONDS.time(stage='image_download'):
+            download = stream_download(self.asset_client, source_url, image_path, rate_class="download")
+
+        return self.save_image(image_key, image_path, source_url, download), image_path, download['sha256']
+
+    def generate_image_dalle(self, prompt):
+        """
+        Generate image using OpenAI DALL-E 3
+        """
+        with image_generation_errors():
+            image_url, image_path, _ = self.download_image(self.request_dalle_image(prompt))
+        return image_url, image_path
+
+    def save_image(self, image_key, image_path, source_url, download):
+        """
+        Register a freshly downloaded image (storage, ETag, Meshy hand-off URL,
+        derivatives); returns its /static/... URL
+        """
+        BYTES_WRITTEN.inc(download['size'], kind='image')
+        self.image_sources.remember(image_path, source_url)
+        self.static_files.remember_hash(image_path, download['sha256'])
+        self.asset_store.add(image_key, 'image')
+
+        local_url = f"/static/{image_key}"
+        log.info("💾 Image saved", extra={'image_url': local_url, 'bytes': download['size']})
+
+        self.schedule_derivatives(image_path, download['sha256'])
+
+        return local_url
+
+    def schedule_derivatives(self, image_path, sha256=None):
+        """
+        Render thumbnails / WebP copies of a saved image off the request thread
+        """
+        if not self.image_derivatives.available:
+            return
+
+        def render():
+            try:
+                with STAGE_SECONDS.time(stage='image_derivatives'):
+                    created = self.image_derivatives.create_all(image_path, sha256)
+                written = self.asset_store.attach(self.asset_store.key_for_path(image_path), created.values())
+                BYTES_WRITTEN.inc(written, kind='derivative')
+                log.debug(f"🖼️ {len(created)} derivatives ready", extra={'image': os.path.basename(image_path)})
+            except Exception as e:
+                log.warning(f"⚠️ Could not create derivatives: {e}", extra={'image_path': image_path})
+
+        self.derivative_executor.submit(render)
+
+    def create_meshy_task(self, image_path, image_url=None):
+        """
+        Start a Meshy AI image-to-3D task (see meshy_create_request)
+        Returns the Meshy task id
+        """
+        url, payload, body = self.meshy_create_request(image_path, image_url)
+
+        with STAGE_SECONDS.time(stage='meshy_create'):
+            if body is None:
+                response = self.meshy_client.post(url, headers=self.meshy_headers(), json=payload, rate_class="create")
+            else:
+                response = self.meshy_client.post(url, headers=self.meshy_headers(), data=body, rate_class="create")
+        if body is not None:
+            STAGE_SECONDS.observe(body.encode_seconds, stage='base64_encode')
+
+        return self.meshy_task_id(response)
+
+    def fetch_meshy_status(self, task_id):
+        """
+        Fetch the current status JSON of a Meshy task (called by the shared poller)
+        """
+        url, kwargs = self.meshy_status_request(task_id)
+        return self.meshy_status_data(self.meshy_client.get(url, **kwargs))
+
+    def receive_meshy_status(self, status_data):
+        """
+        Apply a status from the Meshy webhook: at once if this process polls
+        the task, else through the job table for the worker that does.
+        Returns the outcome ('applied', 'relayed' or 'ignored').
+        """
+        task_id = status_data['id']
+        if self.meshy_poller.push(task_id, status_data):
+            outcome = 'applied'
+        elif self.relay_meshy_status(task_id, status_data):
+            outcome = 'relayed'
+        else:
+            outcome = 'ignored'
+
+        return self.note_meshy_webhook(status_data, outcome)
+
+    def note_meshy_webhook(self, status_data, outcome):
+        """
+        Count and log a handled webhook; returns outcome
+        """
+        MESHY_WEBHOOKS.inc(outcome=outcome)
+        log.info("📨 Meshy webhook", extra={
+            'task_id': status_data['id'], 'status': status_data.get('status'), 'outcome': outcome
+        })
+        return outcome
+
+    def relay_meshy_status(self, task_id, status_data):
+        """
+        Leave a webhook status for another worker's job on the task; False if
+        there is no such job (finished, unknown, or no other workers)
+        """
+        if self.config['WORKERS'] <= 1:
+            return False
+        return self.job_store.push_status(task_id, status_data) > 0
+
+    def download_meshy_model(self, status_data):
+        """
+        Download the GLB of a finished Meshy task into MODELS_FOLDER
+        """
+        glb_url, model_key, model_path = self.model_destination(status_data)
+
+        # Download 3D model (streamed straight to disk)
+        with STAGE_SECONDS.time(stage='glb_download'):
+            download = stream_download(self.asset_client, glb_url, model_path, rate_class="download")
+
+        return self.save_model(model_key, model_path, download)
+
+    def save_model(self, model_key, model_path, download):
+        """
+        Validate, index, post-process and store a freshly downloaded GLB;
+        returns its /static/... URL
+        """
+        BYTES_WRITTEN.inc(download['size'], kind='model')
+        log.info("📦 GLB downloaded", extra={'bytes': download['size'], 'sha256': download['sha256'][:12]})
+        self.static_files.remember_hash(model_path, download['sha256'])
+
+        local_model_url = f"/static/{model_key}"
+        info = self.ingest_model(model_path, local_model_url, download['sha256'])
+
+        model_files = [model_path]
+        if self.config['GLB_LODS_ENABLED']:
+            manifest = self.build_model_lods(model_path, info)
+            if manifest:
+                self.model_index.update_info(model_id(model_path), lods=manifest['lods'])
+                model_files += [os.path.join(os.path.dirname(model_path), lod['file']) for lod in manifest['lods']]
+
+        if self.config['PRECOMPRESS_MODELS']:
+            for path in model_files:
+                encodings = self.static_files.precompress(path)
+                if encodings:
+                    BYTES_WRITTEN.inc(sum(
+                        os.path.getsize(path + suffix) for encoding, suffix in (('br', '.br'), ('gzip', '.gz'))
+                        if encoding in encodings
+                    ), kind='precompressed')
+                    log.debug("🗜️ Precompressed", extra={'file': os.path.basename(path), 'encodings': ','.join(encodings)})
+
+        # The GLB, its LODs, manifest and compressed copies are stored and evicted together
+        self.asset_store.add(model_key, 'model', extra_paths=[
+            *model_files[1:],
+            manifest_path(model_path),
+            *(path + suffix for path in model_files for suffix in ('.gz', '.br'))
+        ])
+
+        log.info("💾 3D model saved", extra={'model_url': local_model_url})
+
+        return local_model_url
+
+    def ingest_model(self, model_path, model_url, sha256=None):
+        """
+        Validate a downloaded GLB and record its stats in the model index.
+        A truncated or corrupt file is deleted and the conversion fails with
+        GLBError, so it never reaches the viewer. The file is memory-mapped,
+        not read into memory.
+        """
+        try:
+            info = inspect_glb_file(model_path)
+        except GLBError as e:
+            # inspect_glb_file has closed its mapping by now
+            os.remove(model_path)
+            raise GLBError(f"Meshy returned an invalid GLB model: {e}") from None
+
+        self.model_index.put(model_id(model_path), model_url, model_path, info, sha256=sha256)
+        log.info("🔎 Model indexed", extra={
+            'model_id': model_id(model_path),
+            'vertices': info['vertices'],
+            'triangles': info['triangles'],
+            'textures': len(info['textures'])
+        })
+        return info
+
+    def build_model_lods(self, model_path, info):
+        """
+        Write optimized LOD variants of a model. Best effort: the original GLB
+        is always kept and served, so a failure here never fails the conversion.
+        """
+        ratios = [
+            ratio for ratio in self.config['GLB_LOD_RATIOS']
+            if ratio >= 1.0 or info['triangles'] * ratio >= self.config['GLB_LOD_MIN_TRIANGLES']
+        ]
+        try:
+            with STAGE_SECONDS.time(stage='glb_postprocess'):
+                manifest = build_lods(
+                    model_path, ratios=ratios, quantize=self.config['GLB_QUANTIZE'],
+                    recompress_textures=self.config['GLB_RECOMPRESS_TEXTURES'],
+                    texture_max_size=self.config['GLB_TEXTURE_MAX_SIZE']
+                )
+            BYTES_WRITTEN.inc(sum(lod['bytes'] for lod in manifest['lods']), kind='lod')
+            sizes = ', '.join(f"{lod['file']} {lod['bytes']}B/{lod['triangles']} tris" for lod in manifest['lods'])
+            log.info("🗜️ LODs written", extra={'model': os.path.basename(model_path), 'bytes': manifest['bytes'], 'lods': sizes})
+            return manifest
+        except Exception as e:
+            log.warning(f"⚠️ GLB post-processing skipped: {e}", extra={'model_path': model_path})
+            return None
+
+    def convert_to_3d_meshy(self, image_path):
+        """
+        Convert image to 3D model using Meshy AI, blocking until it is done.
+        Runs through the same cache, coalescing and job queue as /api/convert-to-3d.
+        """
+        try:
+            image_hash = file_sha256(image_path)
+            cached = self.model_cache.get(image_hash, **self.config['MESHY_PARAMS'])
+            if cached:
+                log.info("♻️ Conversion cache hit", extra={'model_url': cached['model_url']})
+                return cached['model_url']
+
+            job, _ = self.submit_conversion(image_path, image_hash)
+            job.wait()
+            job.check_lease()
+
+            if job.status == 'failed':
+                raise Exception(job.error)
+            return job.result['model_url']
+
+        except Exception as e:
+            log.exception(f"❌ 3D conversion error: {e}")
+            raise Exception(f"3D conversion failed: {str(e)}")
+
+    def remember_model(self, image_hash, model_url, image_path):
+        """
+        Record a finished conversion so the same image + params is never converted
+        twice, and show the model next to the image in the history
+        """
+        self.model_cache.put(image_hash, model_url, self.static_path(model_url), **self.config['MESHY_PARAMS'])
+        self.history.set_model(self.image_url_for(image_path), model_url)
+
+    # ==================== PIPELINE ====================
+
+    # The job functions below have coroutine twins in text_to_3d.aio, which
+    # differ only in awaiting the upstream calls. Everything else they decide
+    # (cache and dedupe keys, job claiming, what a finished job records) is
+    # in the helpers here that both call. The submit / resume methods take
+    # the runner that owns the job queue, flights and job functions: self,
+    # or an AsyncPipeline.
+
+    def prompt_cache_params(self, variant=0):
+        """
+        Prompt cache parameters of a generation. Variants > 0 are cached
+        separately so a batch asking for several variations of one prompt
+        gets distinct images.
+        """
+        dalle_params = self.config['DALLE_PARAMS']
+        return dict(dalle_params, variant=variant) if variant else dalle_params
+
+    def cached_generation(self, prompt, cache_params, fresh=False):
+        """
+        (image_url, image_path, True) of an earlier generation of the prompt,
+        or None if there is none or a fresh one was asked for
+        """
+        if not self.image_cache or fresh:
+            return None
+
+        cached = self.image_cache.get(prompt, **cache_params)
+        if not cached:
+            return None
+
+        log.info("♻️ Prompt cache hit", extra={'image_url': cached['image_url']})
+        return cached['image_url'], cached['image_path'], True
+
+    def cache_generation(self, prompt, image_url, image_path, cache_params):
+        """
+        Record a freshly generated image in the prompt cache
+        """
+        if self.image_cache:
+            self.image_cache.put(prompt, image_url, image_path, **cache_params)
+
+    def generate_and_cache(self, prompt, cache_params):
+        """
+        Generate an image with DALL-E and record it in the prompt cache
+        """
+        image_url, image_path = self.generate_image_dalle(prompt)
+        self.cache_generation(prompt, image_url, image_path, cache_params)
+        return image_url, image_path
+
+    def generate_or_reuse(self, prompt, fresh=False, variant=0):
+        """
+        Return (image_url, image_path, cached) for a prompt, reusing an earlier
+        generation unless fresh is set
+        """
+        cache_params = self.prompt_cache_params(variant)
+        cached = self.cached_generation(prompt, cache_params, fresh)
+        if cached:
+            return cached
+
+        # Generate image directly with user's prompt; identical prompts
+        # arriving while this one is in flight share its result
+        key = cache_key(prompt, **cache_params)
+        (image_url, image_path), shared = self.image_flight.do(key, self.generate_and_cache, prompt, cache_params)
+        if shared:
+            log.info("🔗 Shared in-flight generation", extra={'image_url': image_url})
+
+        return image_url, image_path, False
+
+    def resumed_task_id(self, job, message, **extra):
+        """
+        The Meshy task id a job recovered after a restart already has (it
+        goes back to polling it), or None for a job starting out, which is
+        logged with message
+        """
+        if job.task_id:
+            log.info("🔁 Resuming Meshy task", extra={'job_id': job.id, 'task_id': job.task_id})
+            return job.task_id
+
+        log.info(message, extra={'job_id': job.id, **extra})
+        return None
+
+    def track_job_task(self, poller, job, task_id):
+        """
+        Hand a job's Meshy task to poller, reporting progress on the job;
+        returns the poller's future for the final status
+        """
+        return poller.track(task_id, on_progress=lambda progress: job.update(progress=progress))
+
+    def finish_conversion(self, job, image_hash, image_path, model_url):
+        """
+        Record a conversion job's model; returns the job result
+        """
+        self.remember_model(image_hash, model_url, image_path)
+        log.info("✨ Conversion job complete", extra={'job_id': job.id, 'model_url': model_url})
+        return {'model_url': model_url}
+
+    def run_conversion_job(self, job, image_path, image_hash):
+        """
+        Worker entry point: start one Meshy task and hand it to the shared poller.
+        The worker thread is released as soon as the task is created; the GLB
+        download runs on the pool once the poller sees SUCCEEDED.
+        """
+        task_id = self.resumed_task_id(job, "🎭 Conversion job started", image_path=image_path)
+        if not task_id:
+            task_id = self.create_meshy_task(image_path)
+            job.update(task_id=task_id)
+
+        status_future = self.track_job_task(self.meshy_poller, job, task_id)
+
+        def finish(status_data):
+            job.check_lease()
+            model_url = self.download_meshy_model(status_data)
+            return self.finish_conversion(job, image_hash, image_path, model_url)
+
+        return self.job_queue.then(status_future, finish)
+
+    def submit_job(self, flight, key, submit):
+        """
+        Run submit() (which queues a job with dedupe_key key) unless a job for
+        key is already running, in this process (joined through flight) or in
+        another worker (found through the job table)
+        Returns (job, shared)
+        """
+        try:
+            return flight.share(key, submit)
+        except DuplicateJobError as e:
+            return Job.from_dict(e.job_data), True
+
+    def submit_conversion(self, image_path, image_hash, prompt=None, runner=None):
+        """
+        Queue a conversion job, or join the identical one that is already
+        running, here or in another worker process
+        Returns (job, shared)
+        """
+        runner = runner or self
+        key = conversion_key(image_hash, **self.config['MESHY_PARAMS'])
+        return self.submit_job(runner.conversion_flight, key, lambda: runner.job_queue.submit(
+            'convert-to-3d',
+            runner.run_conversion_job,
+            image_path,
+            image_hash,
+            params={'image_path': image_path, 'image_hash': image_hash, 'prompt': prompt},
+            dedupe_key=key
+        ))
+
+    def prepare_conversion(self, image_path):
+        """
+        First step of /api/convert-to-3d: returns (local path, image hash,
+        cached conversion or None); the hash is None if the image doesn't exist
+        or lies outside the asset folders.
+        A cached model is shown next to the image in the history.
+        """
+        local_path = self.local_image_path(image_path)
+
+        if local_path is None or not os.path.isfile(local_path):
+            return image_path, None, None
+        image_path = local_path
+
+        # Same image bytes + same params were converted before: answer right away
+        image_hash = file_sha256(image_path)
+        cached = self.model_cache.get(image_hash, **self.config['MESHY_PARAMS'])
+        if cached:
+            self.history.set_model(self.image_url_for(image_path), cached['model_url'])
+
+        return image_path, image_hash, cached
+
+    def reuse_generation(self, prompt):
+        """
+        First step of a text-to-3D job for a prompt that was generated before:
+        the cached image's result fields, with its model_url if that image was
+        converted too; None if the prompt isn't cached
+        """
+        if not self.image_cache:
+            return None
+
+        cached = self.image_cache.get(prompt, **self.config['DALLE_PARAMS'])
+        if not cached:
+            return None
+
+        image_url, image_path = cached['image_url'], cached['image_path']
+        image_hash = file_sha256(image_path)
+        image_id = str(uuid.uuid4())
+        self.history.add(image_id, prompt, image_url, image_path, cached=True)
+        log.info("♻️ Prompt cache hit", extra={'image_url': image_url})
+
+        fields = {
+            'image_id': image_id,
+            'image_url': image_url,
+            'thumbnail_url': thumbnail_url(image_url),
+            'image_path': image_path,
+            'image_hash': image_hash,
+            'cached': True
+        }
+
+        model = self.model_cache.get(image_hash, **self.config['MESHY_PARAMS'])
+        if model:
+            log.info("♻️ Conversion cache hit", extra={'model_url': model['model_url']})
+            self.history.set_model(image_url, model['model_url'])
+            fields['model_url'] = model['model_url']
+
+        return fields
+
+    def record_generation(self, prompt, image_url, image_path):
+        """
+        Prompt cache and history entries of a freshly generated text-to-3D image;
+        returns its result fields
+        """
+        if self.image_cache:
+            self.image_cache.put(prompt, image_url, image_path, **self.config['DALLE_PARAMS'])
+
+        image_id = str(uuid.uuid4())
+        self.history.add(image_id, prompt, image_url, image_path, cached=False)
+
+        return {
+            'image_id': image_id,
+            'image_url': image_url,
+            'thumbnail_url': thumbnail_url(image_url),
+            'image_path': image_path,
+            'cached': False
+        }
+
+    def record_pipeline_image(self, result, prompt, started, image_url, image_path, sha256):
+        """
+        Index a downloaded text-to-3D image and record the image_save stage
+        """
+        fields = self.record_generation(prompt, image_url, image_path)
+        result.record('image_save', started, image_hash=sha256, **fields)
+
+    def save_pipeline_image(self, result, prompt, source_url):
+        """
+        Download, store and index a text-to-3D image (derivatives are rendered
+        on their own pool), recording the image_save stage
+        """
+        started = time.monotonic()
+        image_url, image_path, sha256 = self.download_image(source_url)
+        self.record_pipeline_image(result, prompt, started, image_url, image_path, sha256)
+
+    def finish_pipeline(self, job, result, model_url):
+        """
+        Record a text-to-3D job's model; returns the final job result
+        """
+        if result.get('image_hash'):
+            self.remember_model(result.get('image_hash'), model_url, result.get('image_path'))
+        log.info("✨ Text-to-3D job complete", extra={'job_id': job.id, 'model_url': model_url})
+        return result.final()
+
+    def run_pipeline_job(self, job, prompt, fresh=False):
+        """
+        Worker entry point of /api/text-to-3d. As soon as DALL-E answers, its
+        image URL goes to Meshy while the pipeline pool saves the image, so the
+        Meshy task never waits for our copy. The job thread is released once
+        the task is created; the GLB download runs on the pool once the poller
+        sees SUCCEEDED.
+        """
+        result = PipelineResult(job)
+        image_saved = None
+
+        task_id = self.resumed_task_id(job, "🚀 Text-to-3D job started", prompt=prompt)
+        if not task_id:
+            started = time.monotonic()
+            reused = None if fresh else self.reuse_generation(prompt)
+
+            if reused:
+                result.record('image', started, **reused)
+                if 'model_url' in reused:
+                    return result.final()
+                image_path, source_url = reused['image_path'], None
+            else:
+                source_url = self.request_dalle_image(prompt)
+                result.record('dalle_generate', started)
+                image_path = None
+                image_saved = self.pipeline_executor.submit(self.save_pipeline_image, result, prompt, source_url)
+
+            started = time.monotonic()
+            task_id = self.create_meshy_task(image_path, image_url=source_url)
+            job.update(task_id=task_id)
+            result.record('meshy_create', started)
+
+        started = time.monotonic()
+        status_future = self.track_job_task(self.meshy_poller, job, task_id)
+
+        def finish(status_data):
+            job.check_lease()
+            result.record('meshy_task', started)
+            if image_saved:
+                # Long done in practice; raises if the image could not be saved
+                image_saved.result()
+
+            model_started = time.monotonic()
+            model_url = self.download_meshy_model(status_data)
+            result.record('model_save', model_started, model_url=model_url)
+            return self.finish_pipeline(job, result, model_url)
+
+        return self.job_queue.then(status_future, finish)
+
+    def submit_text_to_3d(self, prompt, fresh=False, runner=None):
+        """
+        Queue a text-to-3D job, or join the one already running for the same
+        prompt (unless fresh), here or in another worker process
+        Returns (job, shared)
+        """
+        runner = runner or self
+
+        def start(dedupe_key=None):
+            return runner.job_queue.submit(
+                'text-to-3d',
+                runner.run_pipeline_job,
+                prompt,
+                fresh,
+                params={'prompt': prompt, 'fresh': fresh},
+                dedupe_key=dedupe_key
+            )
+
+        if fresh:
+            return start(), False
+
+        key = 'text-to-3d:' + cache_key(prompt, **self.config['DALLE_PARAMS'])
+        return self.submit_job(runner.pipeline_flight, key, lambda: start(key))
+
+    def claim_unfinished_jobs(self, store, stale_after=0):
+        """
+        Claim the jobs left unfinished by a stopped server or a worker whose
+        lease ran out (no heartbeat for stale_after seconds), of every kind
+        restore_jobs() knows. With several workers a lease is required:
+        stale_after=0 would take jobs from live workers too.
+        """
+        if self.config['WORKERS'] > 1 and stale_after <= 0:
+            raise ValueError(f"Claiming jobs with {self.config['WORKERS']} workers needs a positive lease, got {stale_after}")
+        return [
+            job_data
+            for kind in ('convert-to-3d', 'text-to-3d')
+            for job_data in store.claim(kind=kind, stale_after=stale_after)
+        ]
+
+    def restore_jobs(self, claimed, runner=None):
+        """
+        Put claimed jobs back on runner's queue. Jobs with a Meshy task id
+        resume polling it instead of paying for a new task.
+        Returns how many were restored.
+        """
+        runner = runner or self
+
+        for job_data in claimed:
+            params = job_data['params']
+            if job_data['kind'] == 'convert-to-3d':
+                key = conversion_key(params['image_hash'], **self.config['MESHY_PARAMS'])
+                runner.conversion_flight.share(key, lambda: runner.job_queue.restore(
+                    job_data,
+                    runner.run_conversion_job,
+                    params['image_path'],
+                    params['image_hash']
+                ))
+            else:
+                runner.job_queue.restore(job_data, runner.run_pipeline_job, params['prompt'], params['fresh'])
+
+        if claimed:
+            log.info(f"🔁 Resumed {len(claimed)} unfinished job(s)")
+
+        return len(claimed)
+
+    def resume_unfinished_jobs(self, stale_after=0):
+        """
+        Take over jobs left unfinished by a stopped server or a worker whose lease ran out
+        """
+        return self.restore_jobs(self.claim_unfinished_jobs(self.job_store, stale_after))
+
+    def health_report(self, queue=None, poller=None):
+        """
+        Body of /api/health, for this process's job queue and Meshy poller
+        unless others are given
+        """
+        queue = queue or self.job_queue
+        poller = poller or self.meshy_poller
+        circuits = {name: breaker.stats() for name, breaker in self.circuit_breakers.items()}
+        degraded = any(circuit['state'] != 'closed' for circuit in circuits.values())
+
+        return {
+            'status': 'degraded' if degraded else 'healthy',
+            'openai_configured': bool(self.config['OPENAI_API_KEY']),
+            'meshy_configured': bool(self.config['MESHY_API_KEY']),
+            'circuits': circuits,
+            'jobs': queue.stats(),
+            'image_cache': self.image_cache.stats() if self.image_cache else None,
+            'model_cache': self.model_cache.stats(),
+            'models': self.model_index.totals(),
+            'history': self.history.stats(),
+            'storage': self.asset_store.stats(),
+            'meshy_tasks_in_flight': poller.in_flight(),
+            'meshy_webhooks': bool(self.config['MESHY_WEBHOOK_SECRET']),
+            'rate_limits': self.rate_limiter.stats(),
+            'worker': self.job_store.owner,
+            'timestamp': datetime.now().isoformat()
+        }
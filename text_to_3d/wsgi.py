@@ -0,0 +1,9 @@
+"""
+WSGI entry point for production servers
+
+    gunicorn -c gunicorn.conf.py text_to_3d.wsgi:app
+"""
+
+from . import create_app
+
+app = create_app()
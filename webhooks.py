@@ -0,0 +1,31 @@
+"""
+Signed webhook payloads (HMAC-SHA256 of the raw request body)
+- sign() produces the signature header value, "sha256=<hex digest>"
+- verify() checks one in constant time, with or without the "sha256=" prefix
+- Used by the Meshy callback endpoint and by fake_upstream.py, which sends them
+"""
+
+import hashlib
+import hmac
+
+SIGNATURE_HEADER = 'X-Meshy-Signature'
+
+
+def sign(secret, body):
+    """
+    Signature header value for a raw body (bytes) under a shared secret
+    """
+    digest = hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+    return f"sha256={digest}"
+
+
+def verify(secret, body, signature):
+    """
+    Whether signature (the header value, may be None) was made for body with secret
+    """
+    if not secret or not signature:
+        return False
+    expected = sign(secret, body)
+    if not signature.startswith('sha256='):
+        signature = f"sha256={signature}"
+    return hmac.compare_digest(expected, signature.strip())